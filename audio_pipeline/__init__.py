@@ -0,0 +1,4 @@
+from .ring_buffer import *
+from .vad import *
+from .coalescer import *
+from .playback import *
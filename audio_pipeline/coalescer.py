@@ -0,0 +1,107 @@
+import asyncio
+
+
+class AudioCoalescer:
+    """Batches queued audio chunks into fewer, larger audioInput events.
+
+    Chunks are merged until the batch holds ``target_ms`` of audio. A partial batch
+    is flushed once the oldest chunk in it has waited ``max_latency_ms``, and no
+    batch is ever larger than ``max_bytes``; anything beyond that is carried over to
+    the next batch. A ``target_ms`` of 0 sends every chunk as soon as it is queued.
+    """
+
+    def __init__(self, target_ms: int = 40, max_latency_ms: int = 60, max_bytes: int = 32000,
+                 sample_rate: int = 16000, sample_width: int = 2, channels: int = 1):
+        """Initialize the coalescer.
+
+        Args:
+            target_ms: Audio duration at which a batch is sent
+            max_latency_ms: Longest time a partial batch is held back
+            max_bytes: Upper bound on the size of one batch
+            sample_rate: Sample rate of the queued audio
+            sample_width: Bytes per sample
+            channels: Number of interleaved channels
+        """
+        frame_bytes = sample_width * channels
+        self.target_bytes = sample_rate * frame_bytes * target_ms // 1000
+        self.max_latency = max_latency_ms / 1000
+        self.max_bytes = max(frame_bytes, max_bytes - max_bytes % frame_bytes)
+        self._carry = b""
+
+        # Counters
+        self.batches = 0
+        self.chunks = 0
+        self.bytes = 0
+        self.flushes_on_target = 0
+        self.flushes_on_latency = 0
+        self.flushes_on_size = 0
+
+    async def next_batch(self, queue: asyncio.Queue) -> bytes:
+        """Wait for audio on the queue and return the next batch to send."""
+        if self._carry:
+            parts = [self._carry]
+            size = len(self._carry)
+            self._carry = b""
+        else:
+            first = await queue.get()
+            self.chunks += 1
+            parts = [first]
+            size = len(first)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_latency
+        reason = "target"
+        while size < self.target_bytes and size < self.max_bytes:
+            try:
+                chunk = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                chunk = await self._get_until(queue, deadline - loop.time())
+                if chunk is None:
+                    reason = "latency"
+                    break
+            self.chunks += 1
+            if chunk:
+                parts.append(chunk)
+                size += len(chunk)
+
+        batch = parts[0] if len(parts) == 1 else b"".join(parts)
+        if len(batch) > self.max_bytes:
+            batch, self._carry = batch[:self.max_bytes], batch[self.max_bytes:]
+            reason = "size"
+
+        self.batches += 1
+        self.bytes += len(batch)
+        if reason == "target":
+            self.flushes_on_target += 1
+        elif reason == "latency":
+            self.flushes_on_latency += 1
+        else:
+            self.flushes_on_size += 1
+        return batch
+
+    @staticmethod
+    async def _get_until(queue, timeout):
+        """Get the next chunk, or None if nothing arrives within timeout."""
+        if timeout <= 0:
+            return None
+        getter = asyncio.ensure_future(queue.get())
+        done, _ = await asyncio.wait((getter,), timeout=timeout)
+        if done:
+            return getter.result()
+        # cancel() fails only if the getter finished in the meantime; a cancelled
+        # Queue.get leaves its item in the queue
+        if not getter.cancel():
+            return getter.result()
+        return None
+
+    def stats(self) -> dict:
+        """Return batching counters."""
+        return {
+            "batches": self.batches,
+            "chunks": self.chunks,
+            "bytes": self.bytes,
+            "chunks_per_batch": self.chunks / self.batches if self.batches else 0.0,
+            "flushes_on_target": self.flushes_on_target,
+            "flushes_on_latency": self.flushes_on_latency,
+            "flushes_on_size": self.flushes_on_size,
+        }
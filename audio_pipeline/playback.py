@@ -0,0 +1,286 @@
+import asyncio
+import threading
+import time
+from collections import deque
+
+
+class JitterBuffer:
+    """Bounded PCM FIFO between the event loop and the audio output callback.
+
+    Playback starts once ``prebuffer_bytes`` are queued (or the current content has
+    ended), and restarts the same way after the buffer runs dry. Running dry before
+    the end of the content counts as an underrun; a write that finds the buffer full
+    counts as an overrun and waits for the callback to make room. ``clear`` bumps
+    ``generation`` so writes still waiting for room are abandoned rather than
+    queueing stale audio.
+    """
+
+    def __init__(self, capacity_bytes: int, prebuffer_bytes: int):
+        """Initialize the jitter buffer.
+
+        Args:
+            capacity_bytes: Maximum number of bytes held
+            prebuffer_bytes: Watermark that must be reached before playback starts
+        """
+        self.capacity = capacity_bytes
+        self.prebuffer = min(prebuffer_bytes, capacity_bytes)
+        self._chunks = deque()
+        self._head = 0  # Bytes of _chunks[0] already played
+        self._size = 0
+        self._lock = threading.Lock()
+        self._playing = False
+        self._ended = False
+        self._loop = None
+        self._space_waiter = None
+        self.generation = 0
+
+        # Counters
+        self.underruns = 0
+        self.overruns = 0
+        self.bytes_played = 0
+
+    @property
+    def buffered(self) -> int:
+        """Number of bytes waiting to be played."""
+        return self._size
+
+    def put(self, data: bytes) -> bool:
+        """Queue audio if it fits. Returns False when the buffer is full."""
+        with self._lock:
+            if self._size + len(data) > self.capacity and self._size:
+                return False
+            self._chunks.append(data)
+            self._size += len(data)
+            self._ended = False
+            return True
+
+    async def write(self, data: bytes) -> bool:
+        """Queue audio, waiting for the output callback to make room if needed.
+
+        Returns:
+            False if the buffer was cleared while the write was waiting
+        """
+        if self.put(data):
+            return True
+        self.overruns += 1
+        generation = self.generation
+        while True:
+            self._loop = asyncio.get_running_loop()
+            waiter = self._loop.create_future()
+            self._space_waiter = waiter
+            if generation != self.generation:
+                self._space_waiter = None
+                return False
+            if self.put(data):
+                self._space_waiter = None
+                return True
+            try:
+                await waiter
+            finally:
+                self._space_waiter = None
+
+    def end(self):
+        """Mark the end of the current content so its tail plays below the watermark."""
+        with self._lock:
+            self._ended = True
+
+    def clear(self) -> int:
+        """Discard all queued audio. Returns the number of bytes dropped."""
+        with self._lock:
+            self.generation += 1
+            dropped = self._size
+            # Swapping the deque keeps this O(1) on the caller's side
+            self._chunks = deque()
+            self._head = 0
+            self._size = 0
+            self._playing = False
+            self._ended = False
+        self._wake_writer()
+        return dropped
+
+    def read_into(self, out, nbytes: int) -> int:
+        """Fill ``out[:nbytes]`` for the output callback, padding with silence.
+
+        Returns:
+            Number of bytes of real audio copied
+        """
+        copied = 0
+        with self._lock:
+            if not self._playing and (self._size >= self.prebuffer or (self._ended and self._size)):
+                self._playing = True
+            if self._playing:
+                chunks = self._chunks
+                while copied < nbytes and chunks:
+                    chunk = chunks[0]
+                    n = min(nbytes - copied, len(chunk) - self._head)
+                    out[copied:copied + n] = chunk[self._head:self._head + n]
+                    copied += n
+                    self._head += n
+                    if self._head == len(chunk):
+                        chunks.popleft()
+                        self._head = 0
+                self._size -= copied
+                if not self._size:
+                    # Wait for the watermark again before resuming
+                    self._playing = False
+                    if copied < nbytes and not self._ended:
+                        self.underruns += 1
+        if copied < nbytes:
+            out[copied:nbytes] = bytes(nbytes - copied)
+        self.bytes_played += copied
+        if copied:
+            self._wake_writer()
+        return copied
+
+    def _wake_writer(self):
+        waiter = self._space_waiter
+        if waiter is not None:
+            self._space_waiter = None
+            self._loop.call_soon_threadsafe(_set_waiter, waiter)
+
+
+def _set_waiter(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class PlaybackEngine:
+    """Plays 16-bit PCM through a sounddevice output stream fed by a JitterBuffer.
+
+    The output stream's callback runs on PortAudio's own thread and pulls audio
+    from the jitter buffer, so the event loop only has to queue whole responses.
+    ``interrupt`` implements barge-in: it drops queued audio, aborts the stream to
+    discard what the device has already buffered, and measures how long it took
+    until silence reaches the DAC.
+    """
+
+    def __init__(self, sample_rate: int = 24000, channels: int = 1, blocksize: int = 1024,
+                 buffer_ms: int = 2000, prebuffer_ms: int = 100, device=None):
+        """Initialize the playback engine.
+
+        Args:
+            sample_rate: Output sample rate
+            channels: Number of output channels
+            blocksize: Frames requested per output callback
+            buffer_ms: Capacity of the jitter buffer
+            prebuffer_ms: Audio queued before playback starts or resumes
+            device: Optional sounddevice output device
+        """
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.blocksize = blocksize
+        self.device = device
+        self.frame_bytes = 2 * channels
+        bytes_per_ms = sample_rate * self.frame_bytes / 1000
+        self.buffer = JitterBuffer(
+            capacity_bytes=int(buffer_ms * bytes_per_ms) // self.frame_bytes * self.frame_bytes,
+            prebuffer_bytes=int(prebuffer_ms * bytes_per_ms) // self.frame_bytes * self.frame_bytes
+        )
+        self.stream = None
+        self.device_underflows = 0
+        self.callbacks = 0
+        self.last_callback_time = None
+
+        # Barge-in measurements
+        self._interrupt_started = None
+        self.interrupts = 0
+        self.interrupt_bytes_dropped = 0
+        self.last_interrupt_latency = None
+        self.max_interrupt_latency = 0.0
+        self.total_interrupt_latency = 0.0
+        self.measured_interrupts = 0
+
+    def start(self):
+        """Open and start the output stream."""
+        if self.stream is not None:
+            return
+        # Imported here so the rest of the pipeline works on hosts without PortAudio
+        import sounddevice
+        self.stream = sounddevice.RawOutputStream(
+            samplerate=self.sample_rate,
+            channels=self.channels,
+            dtype='int16',
+            blocksize=self.blocksize,
+            device=self.device,
+            callback=self._callback
+        )
+        self.stream.start()
+
+    def _callback(self, outdata, frames, time_info, status):
+        """Output callback running on the PortAudio thread."""
+        if status.output_underflow:
+            self.device_underflows += 1
+        self.callbacks += 1
+        now = time.perf_counter()
+        self.last_callback_time = now
+        self.buffer.read_into(outdata, frames * self.frame_bytes)
+        started = self._interrupt_started
+        if started is not None:
+            # First block written after an interrupt; include the device's output latency
+            self._interrupt_started = None
+            dac_delay = max(0.0, time_info.outputBufferDacTime - time_info.currentTime)
+            self._record_interrupt_latency(now - started + dac_delay)
+
+    def _record_interrupt_latency(self, latency):
+        self.last_interrupt_latency = latency
+        self.max_interrupt_latency = max(self.max_interrupt_latency, latency)
+        self.total_interrupt_latency += latency
+        self.measured_interrupts += 1
+
+    async def write(self, data: bytes):
+        """Queue audio for playback."""
+        await self.buffer.write(data)
+
+    def end_of_content(self):
+        """Let the tail of the current content play out."""
+        self.buffer.end()
+
+    def flush(self) -> int:
+        """Discard queued audio. Returns the number of bytes dropped."""
+        return self.buffer.clear()
+
+    def interrupt(self, started: float = None) -> int:
+        """Silence playback immediately for a barge-in.
+
+        Args:
+            started: perf_counter() timestamp of when the barge-in was detected
+
+        Returns:
+            Number of queued bytes dropped
+        """
+        if started is None:
+            started = time.perf_counter()
+        dropped = self.buffer.clear()
+        self.interrupts += 1
+        self.interrupt_bytes_dropped += dropped
+        if self.stream is None:
+            self._record_interrupt_latency(time.perf_counter() - started)
+            return dropped
+        # abort() discards audio already handed to the device instead of draining it
+        self.stream.abort()
+        self._interrupt_started = started
+        self.stream.start()
+        return dropped
+
+    def close(self):
+        """Stop and close the output stream."""
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def stats(self) -> dict:
+        """Return playback counters."""
+        return {
+            "buffered_bytes": self.buffer.buffered,
+            "bytes_played": self.buffer.bytes_played,
+            "underruns": self.buffer.underruns,
+            "overruns": self.buffer.overruns,
+            "device_underflows": self.device_underflows,
+            "callbacks": self.callbacks,
+            "interrupts": self.interrupts,
+            "interrupt_bytes_dropped": self.interrupt_bytes_dropped,
+            "last_interrupt_latency_ms": None if self.last_interrupt_latency is None else self.last_interrupt_latency * 1000,
+            "avg_interrupt_latency_ms": self.total_interrupt_latency / self.measured_interrupts * 1000 if self.measured_interrupts else None,
+            "max_interrupt_latency_ms": self.max_interrupt_latency * 1000,
+        }
@@ -0,0 +1,138 @@
+import asyncio
+
+
+class AudioRingBuffer:
+    """Preallocated single-producer/single-consumer byte ring for captured audio.
+
+    The PortAudio callback thread is the only writer and a single asyncio task is
+    the only reader, so no lock is taken: the writer only advances ``_write_pos``
+    and the reader only advances ``_read_pos``. Positions grow monotonically and
+    are reduced modulo the capacity when indexing into the buffer.
+    """
+
+    def __init__(self, capacity_bytes: int, frame_bytes: int = 2):
+        """Initialize the ring buffer.
+
+        Args:
+            capacity_bytes: Size of the preallocated buffer, rounded down to whole frames
+            frame_bytes: Bytes per audio frame (sample width * channels)
+        """
+        capacity_bytes -= capacity_bytes % frame_bytes
+        if capacity_bytes <= 0:
+            raise ValueError("capacity_bytes must hold at least one frame")
+        self.capacity = capacity_bytes
+        self.frame_bytes = frame_bytes
+        self._buffer = bytearray(capacity_bytes)
+        self._view = memoryview(self._buffer)
+        self._write_pos = 0
+        self._read_pos = 0
+        self._loop = None
+        self._waiter = None
+
+        # Counters
+        self.writes = 0
+        self.reads = 0
+        self.overruns = 0
+        self.dropped_frames = 0
+
+    @property
+    def available(self) -> int:
+        """Number of buffered bytes waiting to be read."""
+        return self._write_pos - self._read_pos
+
+    def write(self, data) -> int:
+        """Copy captured audio into the ring. Called from the PortAudio thread.
+
+        When the consumer falls behind, whatever does not fit is dropped and counted
+        as an overrun instead of blocking the audio callback.
+
+        Returns:
+            Number of bytes written
+        """
+        n = len(data)
+        free = self.capacity - (self._write_pos - self._read_pos)
+        if n > free:
+            self.overruns += 1
+            keep = free - free % self.frame_bytes
+            self.dropped_frames += (n - keep) // self.frame_bytes
+            n = keep
+        if n:
+            src = memoryview(data)
+            start = self._write_pos % self.capacity
+            first = min(n, self.capacity - start)
+            self._view[start:start + first] = src[:first]
+            if first < n:
+                self._view[:n - first] = src[first:n]
+            # Publish only after the copy is complete
+            self._write_pos += n
+            self.writes += 1
+        self._wake_reader()
+        return n
+
+    def _wake_reader(self):
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            self._loop.call_soon_threadsafe(_set_waiter, waiter)
+
+    def read(self, max_bytes: int = None) -> bytes:
+        """Drain buffered audio in one piece. Called from the consumer task.
+
+        Args:
+            max_bytes: Optional upper bound on the number of bytes returned
+
+        Returns:
+            Whole frames of buffered audio, or b"" when the buffer is empty
+        """
+        n = self._write_pos - self._read_pos
+        if max_bytes is not None:
+            n = min(n, max_bytes)
+        n -= n % self.frame_bytes
+        if n <= 0:
+            return b""
+        start = self._read_pos % self.capacity
+        first = min(n, self.capacity - start)
+        if first == n:
+            data = bytes(self._view[start:start + n])
+        else:
+            data = b"".join((self._view[start:], self._view[:n - first]))
+        self._read_pos += n
+        self.reads += 1
+        return data
+
+    async def wait_readable(self):
+        """Wait until the producer has written at least one frame."""
+        if self.available >= self.frame_bytes:
+            return
+        self._loop = asyncio.get_running_loop()
+        waiter = self._loop.create_future()
+        self._waiter = waiter
+        # Re-check after arming so a write that raced with us is not missed
+        if self.available >= self.frame_bytes:
+            self._waiter = None
+            return
+        try:
+            await waiter
+        finally:
+            self._waiter = None
+
+    async def read_async(self, max_bytes: int = None) -> bytes:
+        """Wait for audio and drain everything that is buffered."""
+        await self.wait_readable()
+        return self.read(max_bytes)
+
+    def stats(self) -> dict:
+        """Return capture counters for diagnostics."""
+        return {
+            "capacity_bytes": self.capacity,
+            "buffered_bytes": self.available,
+            "writes": self.writes,
+            "reads": self.reads,
+            "overruns": self.overruns,
+            "dropped_frames": self.dropped_frames,
+        }
+
+
+def _set_waiter(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,157 @@
+from collections import deque
+
+import numpy as np
+
+
+class VoiceActivityGate:
+    """Energy/zero-crossing voice activity gate for 16-bit mono PCM.
+
+    Audio is split into fixed frames and classified in one vectorized pass per
+    call. A frame counts as speech when its level is above ``energy_threshold_db``,
+    or when it is within ``fricative_margin_db`` of the threshold and has a high
+    zero-crossing rate (unvoiced consonants such as "s" or "f"). The gate stays
+    open for ``hangover_ms`` after the last speech frame so trailing silence still
+    reaches Nova Sonic for end-of-turn detection, and the last ``preroll_ms`` of
+    suppressed audio is replayed when it opens again so word onsets are not clipped.
+    """
+
+    MODES = ("drop", "keepalive")
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 20,
+                 energy_threshold_db: float = -45.0, fricative_margin_db: float = 10.0,
+                 fricative_zcr: float = 0.25, hangover_ms: int = 1000, preroll_ms: int = 200,
+                 mode: str = "drop", keepalive_interval_ms: int = 1000, keepalive_ms: int = 10):
+        """Initialize the gate.
+
+        Args:
+            sample_rate: Sample rate of the incoming audio
+            frame_ms: Analysis frame length
+            energy_threshold_db: RMS level in dBFS above which a frame is speech
+            fricative_margin_db: How far below the threshold a high-ZCR frame may be
+            fricative_zcr: Zero-crossing rate (crossings per sample) that marks a fricative
+            hangover_ms: How long the gate stays open after the last speech frame
+            preroll_ms: How much suppressed audio is replayed when the gate opens
+            mode: "drop" discards silence, "keepalive" replaces it with short silent frames
+            keepalive_interval_ms: Suppressed audio between two keep-alive frames
+            keepalive_ms: Length of each keep-alive frame
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}, got {mode!r}")
+        self.mode = mode
+        self.frame_samples = max(1, sample_rate * frame_ms // 1000)
+        self.frame_bytes = self.frame_samples * 2
+        self.energy_threshold_db = energy_threshold_db
+        self.fricative_threshold_db = energy_threshold_db - fricative_margin_db
+        self.fricative_zcr = fricative_zcr
+        self.hangover_frames = hangover_ms // frame_ms
+        self.keepalive_interval_frames = max(1, keepalive_interval_ms // frame_ms)
+        self.keepalive_frame = bytes(max(2, sample_rate * keepalive_ms // 1000 * 2))
+
+        self._pending = b""
+        self._preroll = deque(maxlen=preroll_ms // frame_ms)
+        # Frames since the last speech frame; starts closed
+        self._since_voice = self.hangover_frames + 1
+        self._since_keepalive = 0
+
+        # Per-session statistics
+        self.bytes_in = 0
+        self.bytes_sent = 0
+        self.bytes_suppressed = 0
+        self.frames_voiced = 0
+        self.frames_suppressed = 0
+        self.keepalives_sent = 0
+
+    @property
+    def is_open(self) -> bool:
+        """Whether the most recent frame was passed through."""
+        return self._since_voice <= self.hangover_frames
+
+    def _classify(self, samples):
+        """Return a boolean speech mask with one entry per frame."""
+        frames = samples.reshape(-1, self.frame_samples).astype(np.float32)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        level_db = 20.0 * np.log10(rms / 32768.0 + 1e-10)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.frame_samples
+        return (level_db >= self.energy_threshold_db) | (
+            (level_db >= self.fricative_threshold_db) & (zcr >= self.fricative_zcr))
+
+    def _open_mask(self, voiced):
+        """Apply hangover: frames within hangover_frames of speech stay open."""
+        n = len(voiced)
+        index = np.arange(n)
+        # Index of the most recent speech frame, carrying state in from the last call
+        last = np.where(voiced, index, -1 - self._since_voice)
+        last = np.maximum.accumulate(last)
+        since = index - last
+        self._since_voice = min(int(since[-1]), self.hangover_frames + 1)
+        return since <= self.hangover_frames
+
+    def process(self, audio_bytes: bytes) -> list:
+        """Gate a chunk of audio.
+
+        Args:
+            audio_bytes: 16-bit little-endian mono PCM of any length
+
+        Returns:
+            List of byte segments to send upstream, possibly empty
+        """
+        self.bytes_in += len(audio_bytes)
+        data = self._pending + audio_bytes if self._pending else audio_bytes
+        usable = len(data) - len(data) % self.frame_bytes
+        self._pending = data[usable:]
+        if not usable:
+            return []
+
+        samples = np.frombuffer(data, dtype="<i2", count=usable // 2)
+        voiced = self._classify(samples)
+        is_open = self._open_mask(voiced)
+        self.frames_voiced += int(np.count_nonzero(voiced))
+
+        # Walk runs of open/closed frames rather than individual frames
+        edges = np.flatnonzero(is_open[1:] != is_open[:-1]) + 1
+        bounds = [0] + edges.tolist() + [len(is_open)]
+        segments = []
+        view = memoryview(data)
+        fb = self.frame_bytes
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if is_open[start]:
+                run = view[start * fb:end * fb]
+                if self._preroll:
+                    # Gate is opening: replay the buffered pre-roll first
+                    preroll = b"".join(self._preroll)
+                    self.bytes_suppressed -= len(preroll)
+                    self.frames_suppressed -= len(self._preroll)
+                    self._preroll.clear()
+                    segments.append(preroll + run)
+                else:
+                    segments.append(bytes(run))
+                self._since_keepalive = 0
+                continue
+
+            count = end - start
+            self.bytes_suppressed += count * fb
+            self.frames_suppressed += count
+            for i in range(max(start, end - self._preroll.maxlen), end):
+                self._preroll.append(bytes(view[i * fb:(i + 1) * fb]))
+            if self.mode == "keepalive":
+                self._since_keepalive += count
+                while self._since_keepalive >= self.keepalive_interval_frames:
+                    self._since_keepalive -= self.keepalive_interval_frames
+                    segments.append(self.keepalive_frame)
+                    self.keepalives_sent += 1
+
+        self.bytes_sent += sum(len(segment) for segment in segments)
+        return segments
+
+    def stats(self) -> dict:
+        """Return suppression statistics for this session."""
+        return {
+            "mode": self.mode,
+            "bytes_in": self.bytes_in,
+            "bytes_sent": self.bytes_sent,
+            "bytes_suppressed": self.bytes_suppressed,
+            "frames_voiced": self.frames_voiced,
+            "frames_suppressed": self.frames_suppressed,
+            "keepalives_sent": self.keepalives_sent,
+        }
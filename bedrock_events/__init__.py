@@ -0,0 +1,2 @@
+from .encoder import *
+from .decoder import *
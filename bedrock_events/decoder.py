@@ -0,0 +1,94 @@
+import base64
+import inspect
+import json
+
+try:
+    import orjson
+except ImportError:  # Optional faster JSON backend
+    orjson = None
+
+
+class EventDecoder:
+    """Parses inbound Nova Sonic events and dispatches them by event type.
+
+    Handlers are registered per event type (``contentStart``, ``audioOutput``, ...)
+    and receive the event body. Parsing uses orjson when it is installed and the
+    standard library otherwise. Audio is left base64-encoded; ``audio_pcm`` decodes
+    an ``audioOutput`` body on demand and remembers the result, so a chunk is
+    decoded at most once no matter how many consumers need PCM.
+    """
+
+    PCM_KEY = "_pcm"
+
+    def __init__(self, backend: str = None):
+        """Initialize the decoder.
+
+        Args:
+            backend: "orjson" or "json"; defaults to orjson when available
+        """
+        if backend is None:
+            backend = "orjson" if orjson is not None else "json"
+        if backend == "orjson":
+            if orjson is None:
+                raise ValueError("orjson backend requested but orjson is not installed")
+            self._loads = orjson.loads
+        elif backend == "json":
+            self._loads = json.loads
+        else:
+            raise ValueError(f"Unknown JSON backend: {backend}")
+        self.backend = backend
+        self._handlers = {}
+
+    def register(self, event_type: str, handler):
+        """Register a handler called with the body of each event of this type.
+
+        Handlers may be plain functions or coroutines functions.
+        """
+        self._handlers[event_type] = (handler, inspect.iscoroutinefunction(handler))
+
+    def decode(self, raw):
+        """Parse a raw event.
+
+        Returns:
+            Tuple of (event_type, body, json_data); event_type and body are None
+            when the payload is not a Nova Sonic event
+
+        Raises:
+            ValueError: If the payload is not valid JSON
+        """
+        json_data = self._loads(raw)
+        event = json_data.get("event") if isinstance(json_data, dict) else None
+        if not event:
+            return None, None, json_data
+        # Every event object has exactly one key naming its type
+        event_type = next(iter(event))
+        return event_type, event[event_type], json_data
+
+    async def handle(self, event_type: str, body):
+        """Run the handler registered for event_type, if any, and return its result."""
+        entry = self._handlers.get(event_type)
+        if entry is None:
+            return None
+        handler, is_async = entry
+        result = handler(body)
+        if is_async:
+            result = await result
+        return result
+
+    async def dispatch(self, raw):
+        """Parse a raw event and run its handler.
+
+        Returns:
+            Tuple of (event_type, json_data, handler_result)
+        """
+        event_type, body, json_data = self.decode(raw)
+        return event_type, json_data, await self.handle(event_type, body)
+
+    @classmethod
+    def audio_pcm(cls, body: dict) -> bytes:
+        """Return the PCM bytes of an audioOutput body, decoding at most once."""
+        pcm = body.get(cls.PCM_KEY)
+        if pcm is None:
+            pcm = base64.b64decode(body["content"])
+            body[cls.PCM_KEY] = pcm
+        return pcm
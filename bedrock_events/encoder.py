@@ -0,0 +1,152 @@
+import binascii
+import json
+
+
+def _json_bytes(value) -> bytes:
+    """Serialize a value as compact UTF-8 JSON."""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class EventEncoder:
+    """Builds outbound Nova Sonic events as compact UTF-8 JSON bytes.
+
+    Everything that is fixed for a session (prompt name, audio content name,
+    configuration blocks) is serialized once in the constructor and split around
+    the variable fields, so encoding an audio frame is a single base64 pass and a
+    join of three byte strings. Text fields go through the JSON serializer so
+    quotes, backslashes and control characters are escaped correctly.
+    """
+
+    INFERENCE_CONFIGURATION = {
+        "maxTokens": 1024,
+        "topP": 0.9,
+        "temperature": 0.7
+    }
+
+    def __init__(self, prompt_name: str, audio_content_name: str, input_sample_rate: int = 16000):
+        """Initialize the encoder for one session.
+
+        Args:
+            prompt_name: promptName shared by all events of the session
+            audio_content_name: contentName of the microphone audio content
+            input_sample_rate: Sample rate of the microphone audio
+        """
+        self.prompt_name = prompt_name
+        self.audio_content_name = audio_content_name
+        self._prompt = _json_bytes(prompt_name)
+
+        self._audio_prefix = (b'{"event":{"audioInput":{"promptName":' + self._prompt +
+                              b',"contentName":' + _json_bytes(audio_content_name) + b',"content":"')
+        self._audio_suffix = b'"}}}'
+
+        self._session_start = self.event("sessionStart", {
+            "inferenceConfiguration": self.INFERENCE_CONFIGURATION
+        })
+        self._audio_content_start = self.event("contentStart", {
+            "promptName": prompt_name,
+            "contentName": audio_content_name,
+            "type": "AUDIO",
+            "interactive": True,
+            "role": "USER",
+            "audioInputConfiguration": {
+                "mediaType": "audio/lpcm",
+                "sampleRateHertz": input_sample_rate,
+                "sampleSizeBits": 16,
+                "channelCount": 1,
+                "audioType": "SPEECH",
+                "encoding": "base64"
+            }
+        })
+        self._audio_content_end = self.content_end(audio_content_name)
+        self._prompt_end = self.event("promptEnd", {"promptName": prompt_name})
+        self._session_end = self.event("sessionEnd", {})
+
+    @staticmethod
+    def event(event_type: str, body) -> bytes:
+        """Wrap an event body as {"event": {event_type: body}}."""
+        return b'{"event":{"' + event_type.encode('ascii') + b'":' + _json_bytes(body) + b'}}'
+
+    def audio_input(self, audio_bytes) -> bytes:
+        """Encode a chunk of PCM audio as an audioInput event."""
+        # binascii cannot encode into an existing buffer, and each queued event must own
+        # its bytes, so a reused buffer would still need the base64 pass plus a copy
+        return b"".join((self._audio_prefix, binascii.b2a_base64(audio_bytes, newline=False), self._audio_suffix))
+
+    def session_start(self) -> bytes:
+        """Return the sessionStart event."""
+        return self._session_start
+
+    def prompt_start(self, prompt_start: dict) -> bytes:
+        """Encode a promptStart body; the prompt name is filled in."""
+        return self.event("promptStart", dict(prompt_start, promptName=self.prompt_name))
+
+    def audio_content_start(self) -> bytes:
+        """Return the contentStart event for the microphone audio."""
+        return self._audio_content_start
+
+    def audio_content_end(self) -> bytes:
+        """Return the contentEnd event for the microphone audio."""
+        return self._audio_content_end
+
+    def text_content_start(self, content_name: str, role: str) -> bytes:
+        """Encode a contentStart event for a text content."""
+        return self.event("contentStart", {
+            "promptName": self.prompt_name,
+            "contentName": content_name,
+            "type": "TEXT",
+            "role": role,
+            "interactive": True,
+            "textInputConfiguration": {
+                "mediaType": "text/plain"
+            }
+        })
+
+    def text_input(self, content_name: str, text: str) -> bytes:
+        """Encode a textInput event, escaping the text."""
+        return self.event("textInput", {
+            "promptName": self.prompt_name,
+            "contentName": content_name,
+            "content": text
+        })
+
+    def content_end(self, content_name: str) -> bytes:
+        """Encode a contentEnd event."""
+        return self.event("contentEnd", {
+            "promptName": self.prompt_name,
+            "contentName": content_name
+        })
+
+    def tool_content_start(self, content_name: str, tool_use_id: str) -> bytes:
+        """Encode a contentStart event for a tool result."""
+        return self.event("contentStart", {
+            "promptName": self.prompt_name,
+            "contentName": content_name,
+            "interactive": False,
+            "type": "TOOL",
+            "role": "TOOL",
+            "toolResultInputConfiguration": {
+                "toolUseId": tool_use_id,
+                "type": "TEXT",
+                "textInputConfiguration": {
+                    "mediaType": "text/plain"
+                }
+            }
+        })
+
+    def tool_result(self, content_name: str, content) -> bytes:
+        """Encode a toolResult event; dict results are serialized to a JSON string."""
+        if isinstance(content, dict):
+            content = json.dumps(content)
+        return self.event("toolResult", {
+            "promptName": self.prompt_name,
+            "contentName": content_name,
+            "content": content
+        })
+
+    def prompt_end(self) -> bytes:
+        """Return the promptEnd event."""
+        return self._prompt_end
+
+    def session_end(self) -> bytes:
+        """Return the sessionEnd event."""
+        return self._session_end
@@ -0,0 +1 @@
+from .bounded_queue import *
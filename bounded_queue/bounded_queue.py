@@ -0,0 +1,95 @@
+import asyncio
+
+
+class QueueOverflow(Exception):
+    """Raised when a queue with the disconnect policy overflows; the session should be dropped."""
+
+
+# Placed in an overflowed queue so its consumer raises QueueOverflow
+_OVERFLOWED = object()
+
+
+class BoundedQueue(asyncio.Queue):
+    """asyncio.Queue with a size limit and an explicit policy for when it is full.
+
+    Policies:
+        drop_oldest: Discard the oldest item that ``droppable`` accepts (the oldest
+            item if none does) to make room; the producer never waits.
+        block: put() waits for room, so a slow consumer slows the producer down.
+        disconnect: The queue is emptied, and both the producer's put() and the
+            consumer's next get() raise QueueOverflow.
+
+    The deepest the queue has been (``high_water``) and the number of dropped
+    items are kept for reporting.
+    """
+
+    POLICIES = ("drop_oldest", "block", "disconnect")
+
+    def __init__(self, maxsize: int, policy: str = "drop_oldest", droppable=None):
+        """Initialize the queue.
+
+        Args:
+            maxsize: Maximum number of queued items; must be positive
+            policy: One of POLICIES
+            droppable: Optional predicate choosing which items drop_oldest may discard
+        """
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive, got {maxsize}")
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}, got {policy!r}")
+        super().__init__(maxsize)
+        self.policy = policy
+        self.droppable = droppable
+        self.high_water = 0
+        self.dropped = 0
+        self.overflowed = False
+
+    def _put(self, item):
+        super()._put(item)
+        if len(self._queue) > self.high_water:
+            self.high_water = len(self._queue)
+
+    def _get(self):
+        item = super()._get()
+        if item is _OVERFLOWED:
+            raise QueueOverflow(f"Queue overflowed its {self.maxsize} items")
+        return item
+
+    def _drop_oldest(self):
+        if self.droppable is not None:
+            for index, item in enumerate(self._queue):
+                if self.droppable(item):
+                    del self._queue[index]
+                    return
+        self._queue.popleft()
+
+    def put_nowait(self, item):
+        if self.overflowed:
+            raise QueueOverflow(f"Queue overflowed its {self.maxsize} items")
+        if self.full():
+            if self.policy == "drop_oldest":
+                self._drop_oldest()
+                self.dropped += 1
+            elif self.policy == "disconnect":
+                self.dropped += len(self._queue)
+                self._queue.clear()
+                self.overflowed = True
+                super().put_nowait(_OVERFLOWED)
+                raise QueueOverflow(f"Queue overflowed its {self.maxsize} items")
+        super().put_nowait(item)
+
+    async def put(self, item):
+        if self.policy == "block":
+            await super().put(item)
+        else:
+            self.put_nowait(item)
+
+    def stats(self) -> dict:
+        """Return the current depth, limit, high-water mark and dropped item count."""
+        return {
+            "depth": self.qsize(),
+            "maxsize": self.maxsize,
+            "high_water": self.high_water,
+            "dropped": self.dropped,
+            "policy": self.policy,
+        }
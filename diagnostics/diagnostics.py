@@ -0,0 +1,140 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+# Components log under "voice.<component>", e.g. voice.stream or voice.audio
+ROOT_LOGGER = "voice"
+
+# LogRecord attributes that are not structured fields passed through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+def get_logger(component: str) -> logging.Logger:
+    """Return the logger of a component, e.g. get_logger("stream")."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{component}")
+
+
+class SessionLogger(logging.LoggerAdapter):
+    """Component logger bound to one session.
+
+    Adds the session id to every record and can have its own level, so one
+    session can be traced at DEBUG while the rest of the process stays quiet.
+    Disabled calls cost one level comparison; messages use %-style arguments and
+    are only formatted if the record is emitted.
+    """
+
+    def __init__(self, logger: logging.Logger, session_id: str, level=None):
+        super().__init__(logger, {"session": session_id})
+        self.level = None if level is None else logging._checkLevel(level)
+
+    def setLevel(self, level):
+        """Set this session's level; None falls back to the component's level."""
+        self.level = None if level is None else logging._checkLevel(level)
+
+    def isEnabledFor(self, level) -> bool:
+        if self.level is not None:
+            return level >= self.level
+        return self.logger.isEnabledFor(level)
+
+    def process(self, msg, kwargs):
+        extra = kwargs.get("extra")
+        kwargs["extra"] = dict(self.extra, **extra) if extra else self.extra
+        return msg, kwargs
+
+    def log(self, level, msg, *args, **kwargs):
+        if self.isEnabledFor(level):
+            msg, kwargs = self.process(msg, kwargs)
+            # Attribute the record to our caller rather than to this method
+            kwargs.setdefault("stacklevel", 2)
+            # Skip the component logger's own level check; this session's level already passed
+            self.logger._log(level, msg, args, **kwargs)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as JSON lines, including fields passed through extra=."""
+
+    def format(self, record) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _FieldsFormatter(logging.Formatter):
+    """Text format that appends structured fields as key=value."""
+
+    def format(self, record) -> str:
+        text = super().format(record)
+        fields = " ".join(f"{key}={value}" for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        return f"{text} {fields}" if fields else text
+
+
+def parse_levels(spec: str) -> dict:
+    """Parse "stream=DEBUG,tools=INFO" into {"stream": "DEBUG", "tools": "INFO"}."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        component, _, level = item.partition("=")
+        levels[component.strip()] = level.strip().upper()
+    return levels
+
+
+def configure(level="WARNING", levels: dict = None, structured: bool = False, stream=None):
+    """Route all logging through a queue to a background thread that writes it out.
+
+    Callers only enqueue records, so logging never blocks on the output stream.
+
+    Args:
+        level: Level of the root logger, which also applies to third-party libraries
+        levels: Levels per component; "all" sets every voice component
+        structured: Write JSON lines instead of text
+        stream: Output stream; defaults to stderr
+
+    Returns:
+        logging.handlers.QueueListener: The running listener
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    if structured:
+        handler.setFormatter(StructuredFormatter())
+    else:
+        handler.setFormatter(_FieldsFormatter("%(asctime)s %(levelname)s %(name)s %(funcName)s %(message)s"))
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(records)]
+    root.setLevel(logging._checkLevel(level.upper() if isinstance(level, str) else level))
+
+    for component, component_level in (levels or {}).items():
+        name = ROOT_LOGGER if component == "all" else f"{ROOT_LOGGER}.{component}"
+        logging.getLogger(name).setLevel(component_level)
+
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown():
+    """Flush queued records and stop the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
@@ -0,0 +1,140 @@
+import asyncio
+import functools
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+class HttpClient:
+    """Shared keep-alive HTTP client for tool calls.
+
+    Wraps a requests.Session whose adapter keeps a bounded pool of connections
+    per host, so repeated calls skip TCP and TLS setup. Every request gets connect
+    and read timeouts. Connection errors, timeouts and retryable statuses are
+    retried a bounded number of times with full-jitter exponential backoff.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, pool_connections: int = 10, pool_maxsize: int = 10, connect_timeout: float = 3.05,
+                 read_timeout: float = 10, retries: int = 2, backoff: float = 0.25, max_backoff: float = 2):
+        """Initialize the client.
+
+        Args:
+            pool_connections: Number of hosts whose connection pools are kept
+            pool_maxsize: Maximum connections per host; further requests wait for one to free up
+            connect_timeout: Seconds to wait for a connection
+            read_timeout: Seconds to wait between bytes of the response
+            retries: Retries after the first attempt
+            backoff: Base delay in seconds; attempt n sleeps up to backoff * 2**n
+            max_backoff: Upper bound of a single delay in seconds
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        self.session = requests.Session()
+        self.session.mount("http://", self._adapter)
+        self.session.mount("https://", self._adapter)
+        self._lock = threading.Lock()
+
+        # Counters
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide client, creating it on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def request(self, method: str, url: str, retries: int = None, **kwargs) -> requests.Response:
+        """Send a request, retrying transient failures.
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            retries: Overrides the client's retry count for this call
+            **kwargs: Passed to requests.Session.request; timeout defaults to the client's
+
+        Returns:
+            requests.Response: The last response, which may still carry a retryable status
+
+        Raises:
+            requests.RequestException: If the last attempt failed to connect or timed out
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        retries = self.retries if retries is None else retries
+        attempt = 0
+        while True:
+            with self._lock:
+                self.requests += 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                response.close()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= retries:
+                    with self._lock:
+                        self.failures += 1
+                    raise
+            with self._lock:
+                self.retried += 1
+            time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+            attempt += 1
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request."""
+        return self.request("POST", url, **kwargs)
+
+    async def request_async(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request from the event loop without blocking it."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.request, method, url, **kwargs))
+
+    async def get_async(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request from the event loop."""
+        return await self.request_async("GET", url, **kwargs)
+
+    async def post_async(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request from the event loop."""
+        return await self.request_async("POST", url, **kwargs)
+
+    def stats(self) -> dict:
+        """Return request, retry and connection reuse counts."""
+        pools = self._adapter.poolmanager.pools
+        connections = 0
+        pooled_requests = 0
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                pooled_requests += pool.num_requests
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retried": self.retried,
+                "failures": self.failures,
+                "connections_opened": connections,
+                "connections_reused": max(pooled_requests - connections, 0),
+                "reuse_rate": 1 - connections / pooled_requests if pooled_requests else None,
+            }
+
+    def close(self):
+        """Close all pooled connections."""
+        self.session.close()
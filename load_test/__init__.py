@@ -0,0 +1,2 @@
+from .stub_bedrock import *
+from .load_test import *
@@ -0,0 +1,313 @@
+import asyncio
+import base64
+import json
+import math
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from array import array
+
+import websockets
+
+from web_server.protocol import SUBPROTOCOL, MIC_AUDIO, pack_audio
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def tone_chunk(chunk_ms: int = 20, sample_rate: int = 16000, frequency: float = 220.0) -> bytes:
+    """Return chunk_ms of a quiet 16-bit mono sine tone, loud enough to pass a VAD gate."""
+    samples = int(sample_rate * chunk_ms / 1000)
+    return array("h", (int(3000 * math.sin(2 * math.pi * frequency * i / sample_rate))
+                       for i in range(samples))).tobytes()
+
+
+def percentiles(values: list) -> dict:
+    """Return count, p50, p95, p99 and max of values."""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+def parse_metrics(text: str) -> dict:
+    """Parse the Prometheus text format into {'name{labels}': value}."""
+    samples = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, _, value = line.rpartition(" ")
+        try:
+            samples[name] = float(value)
+        except ValueError:
+            continue
+    return samples
+
+
+def metric_total(samples: dict, name: str) -> float:
+    """Sum a metric over all its label sets, e.g. over the workers of a --workers server."""
+    return sum(value for key, value in samples.items() if key == name or key.startswith(name + "{"))
+
+
+def histogram_quantile(before: dict, after: dict, name: str, q: float):
+    """Estimate the q-quantile of a histogram over the observations made between two scrapes.
+
+    Buckets with the same bound are summed over all other labels, e.g. over workers.
+
+    Args:
+        before: parse_metrics() of the first scrape
+        after: parse_metrics() of the second scrape
+        name: Histogram name without the _bucket suffix
+        q: Quantile between 0 and 1
+
+    Returns:
+        float: Estimate interpolated within its bucket, or None without observations
+    """
+    counts = {}
+    for key, value in after.items():
+        if key.startswith(f"{name}_bucket{{"):
+            bound = re.search(r'le="([^"]+)"', key).group(1)
+            bound = math.inf if bound == "+Inf" else float(bound)
+            counts[bound] = counts.get(bound, 0.0) + value - before.get(key, 0.0)
+    buckets = sorted(counts.items())
+    if not buckets or not buckets[-1][1]:
+        return None
+    rank = q * buckets[-1][1]
+    lower, previous = 0.0, 0.0
+    for bound, cumulative in buckets:
+        if cumulative >= rank and cumulative > previous:
+            if math.isinf(bound):
+                return lower
+            return lower + (bound - lower) * (rank - previous) / (cumulative - previous)
+        lower, previous = bound, cumulative
+    return lower
+
+
+class SessionResult:
+    """Timings of one synthetic client."""
+
+    def __init__(self):
+        self.transcript_latency = []
+        self.first_audio_latency = []
+        self.turns_sent = 0
+        self.audio_messages = 0
+        self.error = None
+
+
+async def run_session(url: str, duration: float, turn_seconds: float, chunk_ms: int = 20,
+                      sample_rate: int = 16000, delay: float = 0, binary: bool = True) -> SessionResult:
+    """Run one client: start, stream PCM in real time for duration seconds, stop.
+
+    A turn ends every turn_seconds of audio sent, when the stub Bedrock stream
+    answers with a transcript, a tool call and audio. Latencies are measured from
+    the last byte of a turn to the transcript and to the first audio message that
+    follows it.
+
+    Args:
+        url: WebSocket URL of the server
+        duration: Seconds of audio to stream
+        turn_seconds: Audio per turn; must match the server's STUB_TURN_SECONDS
+        chunk_ms: Audio per message, like a browser's audio callback
+        sample_rate: Sample rate of the 16-bit mono audio
+        delay: Seconds to wait before connecting, to stagger session starts
+        binary: Offer the binary audio protocol instead of JSON with base64 audio
+
+    Returns:
+        SessionResult: Latencies and counts of this session
+    """
+    result = SessionResult()
+    chunk = tone_chunk(chunk_ms, sample_rate)
+    message = json.dumps({"type": "audio", "data": base64.b64encode(chunk).decode("ascii")})
+    turn_bytes = int(turn_seconds * sample_rate) * 2
+    turn_ends = []
+
+    async def receive(websocket):
+        awaiting_audio = None
+        async for response in websocket:
+            now = time.perf_counter()
+            kind = "audio" if isinstance(response, bytes) else json.loads(response).get("type")
+            if kind == "text" and turn_ends:
+                # Each turn starts with exactly one user transcript
+                turn_end = turn_ends.pop(0)
+                result.transcript_latency.append(now - turn_end)
+                awaiting_audio = turn_end
+            elif kind == "audio":
+                result.audio_messages += 1
+                if awaiting_audio is not None:
+                    result.first_audio_latency.append(now - awaiting_audio)
+                    awaiting_audio = None
+
+    await asyncio.sleep(delay)
+    try:
+        async with websockets.connect(url, max_size=None,
+                                      subprotocols=[SUBPROTOCOL] if binary else None) as websocket:
+            binary = websocket.subprotocol == SUBPROTOCOL
+            receiver = asyncio.ensure_future(receive(websocket))
+            await websocket.send(json.dumps({"type": "start"}))
+            started = time.perf_counter()
+            sent = 0
+            for index in range(int(duration * 1000 / chunk_ms)):
+                # Absolute schedule, so a slow send does not slow the stream down
+                await asyncio.sleep(max(0.0, started + index * chunk_ms / 1000 - time.perf_counter()))
+                await websocket.send(pack_audio(MIC_AUDIO, index, chunk) if binary else message)
+                sent += len(chunk)
+                if sent >= turn_bytes:
+                    sent -= turn_bytes
+                    result.turns_sent += 1
+                    turn_ends.append(time.perf_counter())
+            # Give the last turn time to be answered
+            await asyncio.sleep(turn_seconds)
+            await websocket.send(json.dumps({"type": "stop"}))
+            receiver.cancel()
+    except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException) as e:
+        result.error = f"{type(e).__name__}: {e}"
+    return result
+
+
+def scrape(metrics_url: str) -> dict:
+    """Fetch and parse the server's /metrics."""
+    with urllib.request.urlopen(metrics_url, timeout=10) as response:
+        return parse_metrics(response.read().decode("utf-8"))
+
+
+async def run_step(url: str, metrics_url: str, sessions: int, duration: float, turn_seconds: float,
+                   ramp: float = 1.0, chunk_ms: int = 20, binary: bool = True) -> dict:
+    """Run sessions concurrent clients and report their latencies and the server's load.
+
+    Returns:
+        dict: Latency percentiles over all turns, the worst session's p95, turn
+        counts, errors, event loop lag, CPU utilization and resident memory
+    """
+    loop = asyncio.get_running_loop()
+    before = await loop.run_in_executor(None, scrape, metrics_url)
+    started = time.perf_counter()
+    results = await asyncio.gather(*(
+        run_session(url, duration, turn_seconds, chunk_ms=chunk_ms, delay=ramp * index / sessions, binary=binary)
+        for index in range(sessions)))
+    elapsed = time.perf_counter() - started
+    after = await loop.run_in_executor(None, scrape, metrics_url)
+
+    first_audio = [latency for result in results for latency in result.first_audio_latency]
+    session_p95 = [percentiles(result.first_audio_latency).get("p95") for result in results]
+    cpu = metric_total(after, "process_cpu_seconds_total") - metric_total(before, "process_cpu_seconds_total")
+    lag = "voice_event_loop_lag_seconds"
+    return {
+        "sessions": sessions,
+        "errors": [result.error for result in results if result.error],
+        "turns_sent": sum(result.turns_sent for result in results),
+        "turns_answered": len(first_audio),
+        "transcript_latency": percentiles([latency for result in results for latency in result.transcript_latency]),
+        "first_audio_latency": percentiles(first_audio),
+        "worst_session_p95": max((p95 for p95 in session_p95 if p95 is not None), default=None),
+        "loop_lag_p50": histogram_quantile(before, after, lag, 0.5),
+        "loop_lag_p99": histogram_quantile(before, after, lag, 0.99),
+        "cpu_percent": 100 * cpu / elapsed,
+        "rss_mb": metric_total(after, "process_resident_memory_bytes") / 2 ** 20,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def spawn_server(ws_port: int, http_port: int, turn_seconds: float, response_seconds: float,
+                 tool_delay: float, log_path: str = None, workers: int = 1) -> subprocess.Popen:
+    """Start web_server/server.py with the stub Bedrock backend on localhost."""
+    env = dict(os.environ, HOST="127.0.0.1", WS_PORT=str(ws_port), HTTP_PORT=str(http_port),
+               PYTHONPATH=REPO_ROOT, LOGLEVEL=os.environ.get("LOGLEVEL", "WARNING"),
+               STUB_TURN_SECONDS=str(turn_seconds), STUB_RESPONSE_SECONDS=str(response_seconds),
+               STUB_TOOL_DELAY=str(tool_delay), WORKERS=str(workers), DRAIN_TIMEOUT="5")
+    output = open(log_path, "ab") if log_path else subprocess.DEVNULL
+    return subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "web_server", "server.py"), "--stub-bedrock"],
+                            env=env, cwd=REPO_ROOT, stdout=output, stderr=output)
+
+
+def wait_ready(health_url: str, process: subprocess.Popen = None, timeout: float = 60):
+    """Poll health_url until it answers; raises RuntimeError if the server exits or times out."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            with urllib.request.urlopen(health_url, timeout=2):
+                return
+        except OSError:
+            time.sleep(0.25)
+    raise RuntimeError(f"Server not ready after {timeout} s")
+
+
+def format_row(row: dict) -> str:
+    def ms(value):
+        return "-" if value is None else f"{value * 1000:.0f}"
+    first_audio = row["first_audio_latency"]
+    return (f"{row['sessions']:>8} {row['turns_answered']:>4}/{row['turns_sent']:<4} "
+            f"{ms(first_audio.get('p50')):>7} {ms(first_audio.get('p95')):>7} {ms(first_audio.get('p99')):>7} "
+            f"{ms(row['worst_session_p95']):>7} {ms(row['loop_lag_p50']):>7} {ms(row['loop_lag_p99']):>7} "
+            f"{row['cpu_percent']:>6.1f} {row['rss_mb']:>7.1f} {len(row['errors']):>6}")
+
+
+HEADER = (f"{'sessions':>8} {'turns':>9} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'worst95':>7} "
+          f"{'lag p50':>7} {'lag p99':>7} {'cpu %':>6} {'rss MB':>7} {'errors':>6}")
+
+
+async def main(steps, duration, turn_seconds, response_seconds, tool_delay, ramp, url=None, metrics_url=None,
+               server_log=None, binary=True, workers=1):
+    """Run each step in turn against url, or against a spawned stub server if url is None."""
+    process = None
+    if url is None:
+        ws_port, http_port = free_port(), free_port()
+        url = f"ws://127.0.0.1:{ws_port}"
+        metrics_url = f"http://127.0.0.1:{http_port}/metrics"
+        process = spawn_server(ws_port, http_port, turn_seconds, response_seconds, tool_delay, server_log, workers)
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            None, wait_ready, metrics_url.rsplit("/", 1)[0] + "/health", process)
+        print(HEADER)
+        rows = []
+        for sessions in steps:
+            row = await run_step(url, metrics_url, sessions, duration, turn_seconds, ramp, binary=binary)
+            rows.append(row)
+            print(format_row(row), flush=True)
+        return rows
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Load test the web server with concurrent synthetic voice sessions')
+    parser.add_argument('--sessions', default="1,5,10,25,50",
+                        help='Comma-separated numbers of concurrent sessions, one step each')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of audio each session streams')
+    parser.add_argument('--turn-seconds', type=float, default=3, help='Audio per user turn')
+    parser.add_argument('--response-seconds', type=float, default=2, help='Assistant audio per turn')
+    parser.add_argument('--tool-delay', type=float, default=0.2, help='Seconds the stub tool takes')
+    parser.add_argument('--ramp', type=float, default=1, help='Seconds over which sessions of a step connect')
+    parser.add_argument('--url', help='WebSocket URL of a running server started with --stub-bedrock '
+                                      '(default: spawn one)')
+    parser.add_argument('--metrics-url', help='/metrics URL of that server')
+    parser.add_argument('--server-log', help='File to append the spawned server\'s output to')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes of the spawned server')
+    parser.add_argument('--json-audio', action='store_true', help='Send audio as base64 in JSON like old clients')
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+    if args.url and not args.metrics_url:
+        parser.error("--metrics-url is required with --url")
+
+    steps = [int(step) for step in args.sessions.split(",") if step.strip()]
+    rows = asyncio.run(main(steps, args.duration, args.turn_seconds, args.response_seconds, args.tool_delay,
+                            args.ramp, args.url, args.metrics_url, args.server_log, not args.json_audio,
+                            args.workers))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
@@ -0,0 +1,171 @@
+import asyncio
+import base64
+import itertools
+import json
+import time
+import uuid
+from types import SimpleNamespace
+
+
+def _event(name: str, body: dict) -> bytes:
+    return json.dumps({"event": {name: body}}, separators=(",", ":")).encode("utf-8")
+
+
+class ScriptedBedrockClient:
+    """Offline stand-in for BedrockRuntimeClient that plays a scripted voice turn.
+
+    Every turn_audio_seconds of microphone audio received on a stream triggers a
+    turn: a final user transcript, a toolUse, and, once the tool result arrives,
+    response_audio_seconds of assistant audio paced in real time. No network or
+    credentials are needed.
+    """
+
+    def __init__(self, transcript: str = "What's the weather in Seattle?", tool_name: str = "weather",
+                 tool_input: dict = None, turn_audio_seconds: float = 3.0, response_audio_seconds: float = 2.0,
+                 input_sample_rate: int = 16000, output_sample_rate: int = 24000, chunk_ms: int = 40):
+        """Initialize the script.
+
+        Args:
+            transcript: User transcript emitted for every turn
+            tool_name: Tool requested in every turn
+            tool_input: Tool input, sent as the toolUse content
+            turn_audio_seconds: Microphone audio that makes up one user turn
+            response_audio_seconds: Assistant audio returned per turn
+            input_sample_rate: Sample rate of the 16-bit mono microphone audio
+            output_sample_rate: Sample rate of the 16-bit mono assistant audio
+            chunk_ms: Duration of each audioOutput event
+        """
+        self.transcript = transcript
+        self.tool_name = tool_name
+        self.tool_input = tool_input if tool_input is not None else {"lat": 47.61, "lon": -122.33}
+        self.turn_bytes = int(turn_audio_seconds * input_sample_rate) * 2
+        self.response_chunks = max(1, int(response_audio_seconds * 1000 / chunk_ms))
+        self.chunk_seconds = chunk_ms / 1000
+        silence = bytes(int(output_sample_rate * chunk_ms / 1000) * 2)
+        self.audio_chunk = base64.b64encode(silence).decode("ascii")
+        self.streams = 0
+
+    async def invoke_model_with_bidirectional_stream(self, *args, **kwargs):
+        self.streams += 1
+        return ScriptedStream(self)
+
+
+class _ScriptedInput:
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def send(self, chunk):
+        self._stream._on_input(chunk.value.bytes_)
+
+    async def close(self):
+        self._stream._end()
+
+
+class ScriptedStream:
+    """One scripted bidirectional stream; see ScriptedBedrockClient."""
+
+    _tool_ids = itertools.count(1)
+
+    def __init__(self, script: ScriptedBedrockClient):
+        self.script = script
+        self.input_stream = _ScriptedInput(self)
+        self._events = asyncio.Queue()
+        self._output = SimpleNamespace(receive=self._receive)
+        self._audio_bytes = 0
+        self._tool_results = asyncio.Queue()
+        self._turns = []
+        self.turns_started = 0
+        self.closed = False
+
+    async def await_output(self):
+        return None, self._output
+
+    async def _receive(self):
+        data = await self._events.get()
+        if data is None:
+            raise StopAsyncIteration
+        return SimpleNamespace(value=SimpleNamespace(bytes_=data))
+
+    def _on_input(self, data: bytes):
+        if b'"audioInput"' in data:
+            content = json.loads(data)["event"]["audioInput"]["content"]
+            self._audio_bytes += len(content) * 3 // 4 - content.count("=", -2)
+            while self._audio_bytes >= self.script.turn_bytes:
+                self._audio_bytes -= self.script.turn_bytes
+                self.turns_started += 1
+                self._turns.append(asyncio.ensure_future(self._turn()))
+        elif b'"toolResult"' in data:
+            self._tool_results.put_nowait(time.perf_counter())
+        elif b'"sessionEnd"' in data:
+            self._end()
+
+    def _end(self):
+        if not self.closed:
+            self.closed = True
+            for turn in self._turns:
+                turn.cancel()
+            self._events.put_nowait(None)
+
+    def _put(self, name, body):
+        if not self.closed:
+            self._events.put_nowait(_event(name, body))
+
+    async def _turn(self):
+        script = self.script
+        user_content = str(uuid.uuid4())
+        self._put("contentStart", {"type": "TEXT", "role": "USER", "contentId": user_content,
+                                   "additionalModelFields": json.dumps({"generationStage": "FINAL"})})
+        self._put("textOutput", {"role": "USER", "content": script.transcript, "contentId": user_content})
+        self._put("contentEnd", {"type": "TEXT", "stopReason": "END_TURN", "contentId": user_content})
+
+        tool_content = str(uuid.uuid4())
+        tool_use_id = f"tool-{next(self._tool_ids)}"
+        self._put("contentStart", {"type": "TOOL", "role": "TOOL", "contentId": tool_content})
+        self._put("toolUse", {"toolName": script.tool_name, "toolUseId": tool_use_id, "contentId": tool_content,
+                              "content": json.dumps(script.tool_input)})
+        self._put("contentEnd", {"type": "TOOL", "stopReason": "TOOL_USE", "contentId": tool_content})
+        await self._tool_results.get()
+
+        audio_content = str(uuid.uuid4())
+        self._put("contentStart", {"type": "AUDIO", "role": "ASSISTANT", "contentId": audio_content})
+        started = time.perf_counter()
+        for index in range(script.response_chunks):
+            self._put("audioOutput", {"role": "ASSISTANT", "content": script.audio_chunk, "contentId": audio_content})
+            # Paced like real speech synthesis, on an absolute schedule so lag does not accumulate
+            await asyncio.sleep(max(0.0, started + (index + 1) * script.chunk_seconds - time.perf_counter()))
+        self._put("contentEnd", {"type": "AUDIO", "stopReason": "END_TURN", "contentId": audio_content})
+
+
+class ScriptedAgent:
+    """Offline stand-in for StrandsAgent returning a fixed tool result after a delay."""
+
+    def __init__(self, tool_names=("weather",), result: str = '{"temperature": 12.5, "weathercode": 3}',
+                 delay: float = 0.2):
+        self.tool_names = list(tool_names)
+        self.result = result
+        self.delay = delay
+
+    def tool_specs(self):
+        return [{"name": name, "description": "Scripted tool", "inputSchema": {"json": {"type": "object"}}}
+                for name in self.tool_names]
+
+    def call_tool(self, tool_name, input):
+        # Runs on a tool worker thread, like a real HTTP-bound tool
+        time.sleep(self.delay)
+        return self.result
+
+    def query(self, input):
+        time.sleep(self.delay)
+        return self.result
+
+    def fork(self):
+        return self
+
+    def adopt(self, forked):
+        pass
+
+    def record_tool_call(self, tool_name, input, output):
+        pass
+
+    def close(self):
+        pass
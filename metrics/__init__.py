@@ -0,0 +1,3 @@
+from .metrics import *
+from .tracer import *
+from .process import *
@@ -0,0 +1,301 @@
+import bisect
+import math
+import threading
+
+# Latency buckets in seconds, from a fast cache hit to a slow agent turn
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _numeric_items(prefix, values):
+    """Flatten a stats dict into (name, value) pairs, skipping non-numeric entries."""
+    for key, value in values.items():
+        name = f"{prefix}_{key}"
+        if isinstance(value, dict):
+            yield from _numeric_items(name, value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Base class for metrics with optional labels."""
+
+    type = None
+
+    def __init__(self, name: str, help: str, labels=(), registry=None):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        """Return the child metric for the given label values."""
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _samples(self):
+        """Yield (suffix, label values, extra label pairs, value) for every sample."""
+        for values, child in list(self._children.items()):
+            for suffix, extra, value in child.samples():
+                yield suffix, values, extra, value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        for suffix, values, extra, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.label_names, values, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self):
+        yield "", (), self.function() if self.function else self.value
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, e.g. bytes sent."""
+
+    type = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        """Increment the unlabelled counter."""
+        self.labels().inc(amount)
+
+    def set_function(self, function):
+        """Read the unlabelled counter from function(), which must never decrease, when metrics are rendered."""
+        self.labels().set_function(function)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        self.function = function
+
+    def samples(self):
+        yield "", (), self.function() if self.function else self.value
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, set directly or read from a function at scrape time."""
+
+    type = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        """Set the unlabelled gauge."""
+        self.labels().set(value)
+
+    def set_function(self, function):
+        """Read the unlabelled gauge from function() whenever metrics are rendered."""
+        self.labels().set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q):
+        """Estimate the q-quantile by interpolating within its bucket."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return None
+        rank = q * count
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                if index == len(self.buckets):
+                    # Beyond the last bucket there is no upper bound to interpolate to
+                    return lower
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+    def samples(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            cumulative += bucket_count
+            yield "_bucket", (f'le="{_format_value(bound)}"',), cumulative
+        yield "_sum", (), total
+        yield "_count", (), count
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, e.g. latencies, in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        """Record a value in the unlabelled histogram."""
+        self.labels().observe(value)
+
+    def percentiles(self) -> dict:
+        """Return p50/p95/p99 estimates and counts for every label set."""
+        result = {}
+        for values, child in list(self._children.items()):
+            key = ",".join(values) or self.name
+            result[key] = {
+                "count": child.count,
+                "p50": child.quantile(0.5),
+                "p95": child.quantile(0.95),
+                "p99": child.quantile(0.99),
+            }
+        return result
+
+
+class MetricsRegistry:
+    """A set of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric; names must be unique."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def register_stats(self, prefix: str, stats):
+        """Expose the numeric entries of a stats() dict as gauges named prefix_<key>.
+
+        Args:
+            prefix: Metric name prefix
+            stats: Function returning a dict, called at render time
+        """
+        with self._lock:
+            self._collectors[prefix] = stats
+
+    def get(self, name: str):
+        """Return a registered metric by name."""
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        parts = [metric.render() for metric in metrics]
+        for prefix, stats in collectors:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            for name, value in _numeric_items(prefix, values):
+                parts.append(f"# TYPE {name} gauge\n{name} {_format_value(value)}")
+        return "\n".join(parts) + "\n"
+
+    def percentiles(self) -> dict:
+        """Return p50/p95/p99 estimates for every histogram."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.percentiles() for metric in metrics if isinstance(metric, Histogram)}
+
+
+# Process-wide registry served on /metrics
+REGISTRY = MetricsRegistry()
+
+
+def _add_label(sample: str, label: str) -> str:
+    """Insert a label into a sample line such as 'name{a="b"} 1' or 'name 1'."""
+    name, brace, rest = sample.partition("{")
+    if brace:
+        return f"{name}{{{label},{rest}"
+    name, _, value = sample.partition(" ")
+    return f"{name}{{{label}}} {value}"
+
+
+def merge_expositions(expositions: dict, label: str = "worker") -> str:
+    """Merge the text expositions of several processes into one, labelling each sample with its source.
+
+    Metric families stay grouped under a single HELP/TYPE header, as the format
+    requires, so the result can be scraped like one process's /metrics.
+
+    Args:
+        expositions: Rendered /metrics text by source, e.g. {"0": text, "1": text}
+        label: Label name carrying the source key
+
+    Returns:
+        str: Combined Prometheus text exposition
+    """
+    headers = {}
+    samples = {}
+    for source, text in expositions.items():
+        family = None
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# "):
+                family = line.split(" ", 3)[2]
+                lines = headers.setdefault(family, [])
+                if line not in lines:
+                    lines.append(line)
+                samples.setdefault(family, [])
+            elif family is not None:
+                samples[family].append(_add_label(line, f'{label}="{source}"'))
+    parts = ["\n".join(headers[family] + samples[family]) for family in headers]
+    return "\n".join(parts) + "\n"
@@ -0,0 +1,46 @@
+import asyncio
+import os
+
+from .metrics import Counter, Gauge, Histogram
+
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+LOOP_LAG = Histogram("voice_event_loop_lag_seconds", "How late the event loop ran a timer that was due",
+                     buckets=LOOP_LAG_BUCKETS)
+PROCESS_CPU = Counter("process_cpu_seconds_total", "User and system CPU time of the process")
+PROCESS_RSS = Gauge("process_resident_memory_bytes", "Resident memory of the process")
+
+
+def cpu_seconds() -> float:
+    """Return the user and system CPU time this process has used, in seconds."""
+    times = os.times()
+    return times.user + times.system
+
+
+def resident_memory() -> int:
+    """Return the current resident set size in bytes, or the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Reported in kilobytes on Linux and in bytes on macOS
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+PROCESS_CPU.set_function(cpu_seconds)
+PROCESS_RSS.set_function(resident_memory)
+
+
+async def monitor_event_loop(interval: float = 0.1):
+    """Observe how late the running event loop wakes from a sleep of interval, until cancelled.
+
+    Lag is time the loop spent running other callbacks past the timer's due
+    time, so it grows when handlers block or the loop is saturated.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        due = loop.time() + interval
+        await asyncio.sleep(interval)
+        LOOP_LAG.observe(max(0.0, loop.time() - due))
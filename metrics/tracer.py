@@ -0,0 +1,104 @@
+import time
+
+from .metrics import Counter, Gauge, Histogram
+
+FIRST_TRANSCRIPT = Histogram("voice_first_transcript_seconds",
+                             "Time from the session's first microphone byte to its first user transcript")
+TOOL_REQUEST = Histogram("voice_tool_request_seconds",
+                         "Time from the user transcript to Nova Sonic's toolUse")
+TOOL_DURATION = Histogram("voice_tool_duration_seconds",
+                          "Time from toolUse to the tool result being sent", labels=("tool",))
+FIRST_AUDIO = Histogram("voice_first_audio_seconds",
+                        "Time from the user transcript to the first assistant audio of the turn")
+BARGE_IN = Histogram("voice_barge_in_seconds",
+                     "Time from the first assistant audio of a turn to the user interrupting it")
+TURNS = Counter("voice_turns_total", "User turns transcribed")
+BARGE_INS = Counter("voice_barge_ins_total", "Assistant responses interrupted by the user")
+MIC_BYTES = Counter("voice_mic_bytes_total", "Microphone audio bytes received")
+EVENT_BYTES = Counter("voice_event_bytes_sent_total", "Bytes of events sent to Bedrock", labels=("event",))
+AUDIO_OUT_BYTES = Counter("voice_audio_output_bytes_total", "Base64 audio bytes received from Bedrock")
+QUEUE_DEPTH = Gauge("voice_queue_depth", "Items waiting in session queues, summed over sessions", labels=("queue",))
+QUEUE_HIGH_WATER = Histogram("voice_queue_high_water", "Deepest each session's queue got, observed when it closes",
+                             labels=("queue",), buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024))
+QUEUE_DROPPED = Counter("voice_queue_dropped_total", "Items dropped from full session queues", labels=("queue",))
+
+
+class TurnTracer:
+    """Records the timeline of each voice turn and feeds the latency histograms.
+
+    A turn starts with a user transcript. Each mark stores its offset from the
+    start of the turn in ``spans``; the previous turn's spans are kept in
+    ``last_turn``. Marks are a clock read and a dict write, cheap enough for
+    per-event paths.
+    """
+
+    def __init__(self, session_id: str = None):
+        self.session_id = session_id
+        self.session_started = time.perf_counter()
+        self.mic_first_byte = None
+        self.turn_started = None
+        self.first_audio = None
+        self.tool_started = {}
+        self.spans = {}
+        self.last_turn = None
+        self.turns = 0
+
+    def _mark(self, name, now):
+        if self.turn_started is not None:
+            self.spans.setdefault(name, now - self.turn_started)
+
+    def mic_audio(self, nbytes: int):
+        """Count microphone audio; the first call marks the session's first byte."""
+        MIC_BYTES.inc(nbytes)
+        if self.mic_first_byte is None:
+            self.mic_first_byte = time.perf_counter()
+
+    def transcript(self):
+        """Start a new turn at a user transcript."""
+        now = time.perf_counter()
+        if self.turns == 0 and self.mic_first_byte is not None:
+            FIRST_TRANSCRIPT.observe(now - self.mic_first_byte)
+        if self.turn_started is not None:
+            self.last_turn = self.spans
+        self.turns += 1
+        TURNS.inc()
+        self.turn_started = now
+        self.first_audio = None
+        self.spans = {"transcript": 0.0}
+
+    def tool_use(self, tool_use_id: str):
+        """Mark the model's request for a tool."""
+        now = time.perf_counter()
+        self.tool_started[tool_use_id] = now
+        if self.turn_started is not None and "tool_use" not in self.spans:
+            TOOL_REQUEST.observe(now - self.turn_started)
+        self._mark("tool_use", now)
+
+    def tool_done(self, tool_use_id: str, tool_name: str):
+        """Mark a tool result as sent."""
+        now = time.perf_counter()
+        started = self.tool_started.pop(tool_use_id, None)
+        if started is not None:
+            TOOL_DURATION.labels(tool_name).observe(now - started)
+        self._mark("tool_done", now)
+
+    def audio_out(self, nbytes: int):
+        """Count assistant audio; the first chunk of a turn marks its first audio."""
+        AUDIO_OUT_BYTES.inc(nbytes)
+        if self.first_audio is None:
+            now = self.first_audio = time.perf_counter()
+            if self.turn_started is not None:
+                FIRST_AUDIO.observe(now - self.turn_started)
+            self._mark("first_audio", now)
+
+    def barge_in(self):
+        """Mark the user interrupting the assistant."""
+        now = time.perf_counter()
+        BARGE_INS.inc()
+        if self.first_audio is not None:
+            BARGE_IN.observe(now - self.first_audio)
+        self._mark("barge_in", now)
+
+    def event_sent(self, event_type: str, nbytes: int):
+        """Count bytes of an event sent to Bedrock."""
+        EVENT_BYTES.labels(event_type).inc(nbytes)
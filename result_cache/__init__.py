@@ -0,0 +1,3 @@
+from .result_cache import *
+from .spatial_cache import *
+from .single_flight import *
@@ -0,0 +1,219 @@
+import functools
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .single_flight import SingleFlight
+
+# Words ASR inserts or users say that do not change what is being asked
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "uhm", "er", "erm", "ah", "hmm", "mm", "please"}
+
+# Sentence punctuation ASR adds after a word; symbols like "C++" or "C#" are kept
+_TRAILING_PUNCTUATION = ".,!?;:"
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a spoken query so that ASR variations map to the same cache key.
+
+    Lowercases, strips sentence punctuation from the end of words, drops filler
+    words and collapses whitespace.
+    """
+    words = (word.rstrip(_TRAILING_PUNCTUATION) for word in text.lower().split())
+    return " ".join(word for word in words if word and word not in FILLER_WORDS)
+
+
+class TieredCache:
+    """Thread-safe LRU cache with per-entry TTLs and an optional SQLite tier.
+
+    Entries live in memory, bounded by entry count and by the size of their JSON
+    encoding. If disk_path is set, JSON-serializable entries are also written to a
+    SQLite file so they survive restarts; a memory miss falls back to it and
+    promotes the entry back into memory.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024,
+                 default_ttl: float = 300, disk_path: str = None):
+        """Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept in memory
+            max_bytes: Maximum total size of in-memory entries, in bytes of JSON
+            default_ttl: Seconds an entry stays valid when set() gets no ttl
+            disk_path: Optional SQLite file for the persistent tier
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.disk_path = disk_path
+        self._entries = OrderedDict()  # key -> (value, expires, size)
+        self._lock = threading.Lock()
+        self.bytes = 0
+
+        self._disk = None
+        if disk_path:
+            directory = os.path.dirname(os.path.abspath(disk_path))
+            os.makedirs(directory, exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+            self._disk.execute("DELETE FROM entries WHERE expires <= ?", (time.time(),))
+            self._disk.commit()
+
+        # Counters
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide cache, configured from the environment on first use.
+
+        RESULT_CACHE_MAX_ENTRIES and RESULT_CACHE_MAX_BYTES bound the memory tier;
+        RESULT_CACHE_PATH enables the disk tier.
+        """
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(
+                    max_entries=int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "1024")),
+                    max_bytes=int(os.environ.get("RESULT_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+                    disk_path=os.environ.get("RESULT_CACHE_PATH") or None,
+                )
+            return cls._shared
+
+    def get(self, key: str, default=None):
+        """Return the cached value for key, or default if it is missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires, size = entry
+                if expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+                self.expirations += 1
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, expires FROM entries WHERE key = ? AND expires > ?", (key, now)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    self._store(key, value, row[1], len(row[0]))
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return default
+
+    def set(self, key: str, value, ttl: float = None):
+        """Cache value under key for ttl seconds."""
+        expires = time.time() + (self.default_ttl if ttl is None else ttl)
+        try:
+            encoded = json.dumps(value)
+        except (TypeError, ValueError):
+            # Still cached in memory; only the disk tier needs JSON
+            encoded = None
+        size = len(encoded) if encoded is not None else len(repr(value))
+        with self._lock:
+            self._store(key, value, expires, size)
+            if self._disk is not None and encoded is not None:
+                self._disk.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)", (key, encoded, expires))
+                self._disk.commit()
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM entries")
+                self._disk.commit()
+
+    def _store(self, key, value, expires, size):
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (value, expires, size)
+        self.bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self.bytes > self.max_bytes):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        value, expires, size = self._entries.pop(key)
+        self.bytes -= size
+
+    def stats(self) -> dict:
+        """Return hit/miss counts and memory usage."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+            if self._disk is not None:
+                stats["disk_entries"] = self._disk.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return stats
+
+    def close(self):
+        """Close the disk tier."""
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+
+def cache_key(namespace: str, *args, **kwargs) -> str:
+    """Build a cache key from a namespace and call arguments, normalizing strings."""
+    def normalize(value):
+        return normalize_query(value) if isinstance(value, str) else value
+    parts = [normalize(arg) for arg in args]
+    parts.append({name: normalize(value) for name, value in sorted(kwargs.items())})
+    return namespace + ":" + json.dumps(parts, sort_keys=True, default=str)
+
+
+def cached(namespace: str, ttl: float, cache: TieredCache = None, flight: SingleFlight = None):
+    """Cache a function's results under namespace for ttl seconds.
+
+    String arguments are normalized with normalize_query() before building the key.
+    Concurrent misses for the same key share one call. Exceptions are not cached.
+    The wrapper keeps the function's signature and docstring, so it can sit under
+    Strands' @tool decorator.
+
+    Args:
+        namespace: Key prefix separating this function's entries from others
+        ttl: Seconds a result stays valid
+        cache: TieredCache to use; defaults to the process-wide cache
+        flight: SingleFlight to coalesce misses with; defaults to the process-wide one
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            store = cache or TieredCache.shared()
+            key = cache_key(namespace, *args, **kwargs)
+            missing = object()
+            result = store.get(key, missing)
+            if result is missing:
+                def compute():
+                    value = func(*args, **kwargs)
+                    store.set(key, value, ttl)
+                    return value
+                result = (flight or SingleFlight.shared()).do(key, compute)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls made from worker threads.
+
+    The first caller for a key runs the function; callers arriving while it runs
+    wait for it and get the same result, or the same exception. Nothing is kept
+    once the call finishes, so a failure is not remembered for later callers.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self._calls = {}  # key -> Future of the running call
+        self._lock = threading.Lock()
+
+        # Counters
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide instance."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def do(self, key, func, *args, **kwargs):
+        """Return func(*args, **kwargs), sharing a running call for the same key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        if not leader:
+            return call.result()
+
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                del self._calls[key]
+                self.failures += 1
+            call.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        call.set_result(result)
+        return result
+
+    def stats(self) -> dict:
+        """Return how many calls ran and how many waiters shared them."""
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "failures": self.failures,
+                "in_flight": len(self._calls),
+            }
+
+
+class AsyncSingleFlight:
+    """Coalesces concurrent identical coroutine calls on one event loop.
+
+    Waiters share one task. A cancelled waiter only stops waiting; the shared
+    task is cancelled once every waiter has gone.
+    """
+
+    _shared = None
+
+    def __init__(self):
+        self._calls = {}  # key -> [task, waiters]
+
+        # Counters
+        self.executions = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide instance; only use it from one event loop."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    async def do(self, key, func, *args, **kwargs):
+        """Return await func(*args, **kwargs), sharing a running call for the same key."""
+        entry = self._calls.get(key)
+        if entry is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            entry = self._calls[key] = [task, 0]
+            task.add_done_callback(lambda task, key=key, entry=entry: self._finished(key, entry))
+            self.executions += 1
+
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                task.cancel()
+
+    def _finished(self, key, entry):
+        if self._calls.get(key) is entry:
+            del self._calls[key]
+        task = entry[0]
+        if not task.cancelled() and task.exception() is not None:
+            self.failures += 1
+
+    def stats(self) -> dict:
+        """Return how many calls ran and how many waiters shared them."""
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "in_flight": len(self._calls),
+        }
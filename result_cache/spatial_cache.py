@@ -0,0 +1,154 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from http_client import HttpClient
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+
+def snap_to_grid(lat: float, lon: float, grid: float) -> tuple:
+    """Return the center of the grid cell, grid degrees wide, containing lat/lon."""
+    return (round((math.floor(float(lat) / grid) + 0.5) * grid, 6),
+            round((math.floor(float(lon) / grid) + 0.5) * grid, 6))
+
+
+class SpatialWeatherCache:
+    """Current weather cached per lat/lon grid cell.
+
+    Coordinates are snapped to a grid (0.1 degrees is roughly 11 km), and a cell's
+    current_weather is served while it is fresher than the freshness window.
+    Concurrent misses are collected for batch_window seconds and fetched with a
+    single open-meteo request for all their cells; a cell already being fetched
+    is waited on instead of requested again.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, url: str = OPEN_METEO_URL, grid: float = 0.1, freshness: float = 600,
+                 batch_window: float = 0.05, max_batch: int = 50, max_cells: int = 10000, http: HttpClient = None):
+        """Initialize the cache.
+
+        Args:
+            url: open-meteo forecast endpoint
+            grid: Cell size in degrees
+            freshness: Seconds a cell's weather is served from the cache
+            batch_window: Seconds to wait for other misses before fetching
+            max_batch: Maximum cells per upstream request
+            max_cells: Maximum cells kept; the least recently fetched are dropped first
+            http: HttpClient to fetch with; defaults to the process-wide client
+        """
+        self.url = url
+        self.grid = grid
+        self.freshness = freshness
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_cells = max_cells
+        self.http = http
+        self._cells = {}  # cell -> (current_weather, fetched_at), oldest fetch first
+        self._inflight = {}  # cell -> Future, queued or being fetched
+        self._queued = []
+        self._lock = threading.Lock()
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.upstream_requests = 0
+        self.fetched_cells = 0
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide cache, configured from WEATHER_GRID and WEATHER_TTL."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(grid=float(os.environ.get("WEATHER_GRID", "0.1")),
+                                  freshness=float(os.environ.get("WEATHER_TTL", "600")))
+            return cls._shared
+
+    def current_weather(self, lat: float, lon: float) -> dict:
+        """Return open-meteo's current_weather for the grid cell containing lat/lon."""
+        cell = snap_to_grid(lat, lon, self.grid)
+        leader = False
+        with self._lock:
+            cached = self._cells.get(cell)
+            if cached is not None and time.time() - cached[1] < self.freshness:
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+            future = self._inflight.get(cell)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                future = Future()
+                self._inflight[cell] = future
+                self._queued.append(cell)
+                # The first miss of a batch fetches it for everyone queued behind it
+                leader = len(self._queued) == 1
+
+        if leader:
+            time.sleep(self.batch_window)
+            self._fetch_queued()
+        return future.result()
+
+    def _fetch_queued(self):
+        while True:
+            with self._lock:
+                batch, self._queued = self._queued[:self.max_batch], self._queued[self.max_batch:]
+            if not batch:
+                return
+            try:
+                results = self._fetch(batch)
+            except Exception as e:
+                with self._lock:
+                    futures = [self._inflight.pop(cell) for cell in batch]
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            fetched_at = time.time()
+            with self._lock:
+                futures = []
+                for cell, current in zip(batch, results):
+                    self._cells.pop(cell, None)
+                    self._cells[cell] = (current, fetched_at)
+                    futures.append(self._inflight.pop(cell))
+                while len(self._cells) > self.max_cells:
+                    del self._cells[next(iter(self._cells))]
+            for future, current in zip(futures, results):
+                future.set_result(current)
+
+    def _fetch(self, cells):
+        params = {
+            "latitude": ",".join(str(lat) for lat, lon in cells),
+            "longitude": ",".join(str(lon) for lat, lon in cells),
+            "current_weather": True,
+        }
+        response = (self.http or HttpClient.shared()).get(self.url, params=params)
+        response.raise_for_status()
+        data = response.json()
+        # open-meteo answers a single location with an object and several with a list
+        locations = data if isinstance(data, list) else [data]
+        if len(locations) != len(cells):
+            raise ValueError(f"Expected weather for {len(cells)} locations, got {len(locations)}")
+        with self._lock:
+            self.upstream_requests += 1
+            self.fetched_cells += len(cells)
+        return [location["current_weather"] for location in locations]
+
+    def stats(self) -> dict:
+        """Return hit/miss counts and how many cells each upstream request fetched."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "cells": len(self._cells),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "coalesced": self.coalesced,
+                "upstream_requests": self.upstream_requests,
+                "cells_per_request": self.fetched_cells / self.upstream_requests if self.upstream_requests else None,
+            }
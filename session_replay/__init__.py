@@ -0,0 +1 @@
+from .session_replay import *
@@ -0,0 +1,331 @@
+import asyncio
+import base64
+import gzip
+import itertools
+import json
+import os
+import time
+from types import SimpleNamespace
+
+INBOUND = "in"
+OUTBOUND = "out"
+
+
+class SessionRecorder:
+    """Writes a session's events and their time offsets to a gzip-compressed JSON lines file.
+
+    Each line is [seconds since the stream was opened, "in" or "out", event JSON].
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+        self.started = time.perf_counter()
+        self.events = 0
+
+    def record(self, direction: str, data: bytes):
+        """Append one event; ignored once the recorder is closed."""
+        if self._file is None:
+            return
+        offset = round(time.perf_counter() - self.started, 6)
+        self._file.write(json.dumps([offset, direction, data.decode("utf-8")], separators=(",", ":")) + "\n")
+        self.events += 1
+
+    def close(self):
+        """Flush and close the file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def load_recording(path: str) -> list:
+    """Read a recording as a list of (offset seconds, direction, event bytes)."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [(offset, direction, data.encode("utf-8"))
+                for offset, direction, data in (json.loads(line) for line in f if line.strip())]
+
+
+class _RecordingInput:
+    def __init__(self, input_stream, recorder):
+        self._input_stream = input_stream
+        self._recorder = recorder
+
+    async def send(self, chunk):
+        self._recorder.record(OUTBOUND, chunk.value.bytes_)
+        await self._input_stream.send(chunk)
+
+    async def close(self):
+        try:
+            await self._input_stream.close()
+        finally:
+            self._recorder.close()
+
+
+class _RecordingOutput:
+    def __init__(self, output_stream, recorder):
+        self._output_stream = output_stream
+        self._recorder = recorder
+
+    async def receive(self):
+        result = await self._output_stream.receive()
+        if result.value and result.value.bytes_:
+            self._recorder.record(INBOUND, result.value.bytes_)
+        return result
+
+
+class RecordingStream:
+    """Bidirectional stream wrapper that records every event passing through it."""
+
+    def __init__(self, stream, recorder: SessionRecorder):
+        self.stream = stream
+        self.recorder = recorder
+        self.input_stream = _RecordingInput(stream.input_stream, recorder)
+
+    async def await_output(self):
+        output = await self.stream.await_output()
+        return output[0], _RecordingOutput(output[1], self.recorder)
+
+
+class RecordingClient:
+    """Bedrock runtime client wrapper that records each bidirectional stream to a file in directory."""
+
+    _numbers = itertools.count(1)
+
+    def __init__(self, client, directory: str):
+        self.client = client
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    async def invoke_model_with_bidirectional_stream(self, *args, **kwargs):
+        stream = await self.client.invoke_model_with_bidirectional_stream(*args, **kwargs)
+        name = f"session-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._numbers)}.jsonl.gz"
+        return RecordingStream(stream, SessionRecorder(os.path.join(self.directory, name)))
+
+
+class _FakeInput:
+    def __init__(self, stream):
+        self._stream = stream
+        self.sent = []  # (time, event bytes)
+        self.closed = False
+
+    async def send(self, chunk):
+        data = chunk.value.bytes_
+        now = time.perf_counter()
+        self.sent.append((now, data))
+        if b'"audioInput"' in data:
+            self._stream.audio_received += len(base64.b64decode(json.loads(data)["event"]["audioInput"]["content"]))
+        elif b'"toolResult"' in data and self._stream.tool_uses_pending:
+            self._stream.tool_turnaround.append(now - self._stream.tool_uses_pending.pop(0))
+        self._stream.progress.set()
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeStream:
+    """Offline stand-in for a Bedrock bidirectional stream that plays back inbound events.
+
+    Events are delivered at their recorded offsets in real time, or back to back
+    otherwise. After the last one, the stream stays open until audio_bytes of
+    audioInput have been sent and every delivered toolUse has had its
+    toolResult; then receive() raises StopAsyncIteration like an ended stream.
+    The time between delivering an event and the next await_output() is how
+    long our code took to handle it.
+    """
+
+    def __init__(self, inbound: list, realtime: bool = False, audio_bytes: int = 0):
+        self.inbound = inbound
+        self.realtime = realtime
+        self.audio_bytes = audio_bytes
+        self.audio_received = 0
+        self.progress = asyncio.Event()
+        self.input_stream = _FakeInput(self)
+        self.started = time.perf_counter()
+        self.handling = []
+        self.tool_turnaround = []
+        self.tool_uses_pending = []
+        self._next = 0
+        self._delivered_at = None
+        self._output = SimpleNamespace(receive=self._receive)
+
+    async def await_output(self):
+        if self._delivered_at is not None:
+            self.handling.append(time.perf_counter() - self._delivered_at)
+            self._delivered_at = None
+        return None, self._output
+
+    async def _receive(self):
+        if self._next >= len(self.inbound):
+            while self.audio_received < self.audio_bytes or self.tool_uses_pending:
+                self.progress.clear()
+                await self.progress.wait()
+            raise StopAsyncIteration
+        offset, data = self.inbound[self._next]
+        self._next += 1
+        if self.realtime:
+            await asyncio.sleep(max(0.0, self.started + offset - time.perf_counter()))
+        self._delivered_at = time.perf_counter()
+        if b'"toolUse"' in data:
+            self.tool_uses_pending.append(self._delivered_at)
+        return SimpleNamespace(value=SimpleNamespace(bytes_=data))
+
+
+class FakeBedrockClient:
+    """Offline stand-in for BedrockRuntimeClient answering every stream with the same inbound events."""
+
+    def __init__(self, recording: list, realtime: bool = False):
+        self.inbound = [(offset, data) for offset, direction, data in recording if direction == INBOUND]
+        self.audio_bytes = sum(len(pcm) for offset, pcm in _recorded_audio(recording))
+        self.realtime = realtime
+        self.streams = []
+
+    async def invoke_model_with_bidirectional_stream(self, *args, **kwargs):
+        stream = FakeStream(self.inbound, self.realtime, self.audio_bytes)
+        self.streams.append(stream)
+        return stream
+
+
+class ReplayAgent:
+    """Stands in for StrandsAgent, answering tool calls with the recorded tool results in order."""
+
+    def __init__(self, recording: list):
+        self.tool_names = []
+        self.results = []
+        for offset, direction, data in recording:
+            event = json.loads(data).get("event", {})
+            if direction == INBOUND and "toolUse" in event:
+                name = event["toolUse"]["toolName"]
+                if name not in self.tool_names:
+                    self.tool_names.append(name)
+            elif direction == OUTBOUND and "toolResult" in event:
+                content = event["toolResult"]["content"]
+                try:
+                    content = json.loads(content).get("result", content)
+                except (ValueError, AttributeError):
+                    pass
+                self.results.append(content)
+        self._results = iter(self.results)
+
+    def tool_specs(self):
+        return [{"name": name, "description": "Recorded tool", "inputSchema": {"json": {"type": "object"}}}
+                for name in self.tool_names]
+
+    def _next_result(self):
+        return next(self._results, "No recorded result.")
+
+    def call_tool(self, tool_name, input):
+        return self._next_result()
+
+    def query(self, input):
+        return self._next_result()
+
+    def fork(self):
+        return self
+
+    def adopt(self, forked):
+        pass
+
+    def record_tool_call(self, tool_name, input, output):
+        pass
+
+    def close(self):
+        pass
+
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {"count": len(ordered), "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": ordered[-1]}
+
+
+def _recorded_audio(recording: list) -> list:
+    """Return (offset, PCM bytes) of every recorded audioInput event."""
+    audio = []
+    for offset, direction, data in recording:
+        if direction == OUTBOUND and b'"audioInput"' in data:
+            audio.append((offset, base64.b64decode(json.loads(data)["event"]["audioInput"]["content"])))
+    return audio
+
+
+async def replay(path: str, realtime: bool = False, local_audio: bool = True, timeout: float = 300) -> dict:
+    """Play a recording through BedrockStreamManager against a fake stream and report timings.
+
+    The recorded microphone audio is fed back through add_audio_chunk and the
+    recorded inbound events are answered by a FakeStream, so only our own code
+    path is measured. The replay ends once all of the audio has been sent and
+    every recorded toolUse has been answered.
+
+    Args:
+        path: Recording written by SessionRecorder
+        realtime: Keep the recorded pacing instead of replaying as fast as possible
+        local_audio: Decode output audio as the local client does
+        timeout: Seconds to wait for the replay to finish
+
+    Returns:
+        dict: Event counts, throughput and latency percentiles in seconds
+    """
+    # Imported here so recordings can be loaded without the audio and Bedrock dependencies
+    from voice_search_agent import BedrockStreamManager
+
+    recording = load_recording(path)
+    client = FakeBedrockClient(recording, realtime)
+    manager = BedrockStreamManager(bedrock_client=client, strands_agent=ReplayAgent(recording),
+                                   local_audio=local_audio)
+
+    async def drain(get_queue):
+        while True:
+            await get_queue().get()
+
+    started = time.perf_counter()
+    await manager.initialize_stream()
+    stream = client.streams[-1]
+    drains = [asyncio.create_task(drain(lambda: manager.output_queue)),
+              asyncio.create_task(drain(lambda: manager.audio_output_queue))]
+
+    audio = _recorded_audio(recording)
+    for offset, pcm in audio:
+        if realtime:
+            await asyncio.sleep(max(0.0, stream.started + offset - time.perf_counter()))
+        manager.add_audio_chunk(pcm)
+        if not realtime:
+            # Let the sender run between chunks as it would between microphone callbacks
+            await asyncio.sleep(0)
+
+    await asyncio.wait_for(manager.response_task, timeout)
+    if manager.tool_tasks:
+        await asyncio.wait_for(asyncio.gather(*manager.tool_tasks.values(), return_exceptions=True), timeout)
+    elapsed = time.perf_counter() - started
+
+    for task in drains + [manager.audio_input_task]:
+        task.cancel()
+    await manager.close()
+
+    sent = stream.input_stream.sent
+    return {
+        "inbound_events": stream._next,
+        "outbound_events": len(sent),
+        "outbound_bytes": sum(len(data) for sent_at, data in sent),
+        "audio_chunks_fed": len(audio),
+        "audio_bytes_sent": stream.audio_received,
+        "elapsed_seconds": elapsed,
+        "inbound_events_per_second": stream._next / elapsed if elapsed else None,
+        "stream_setup_seconds": manager.timings.get("initialize_stream"),
+        "event_handling_seconds": _percentiles(stream.handling),
+        "tool_turnaround_seconds": _percentiles(stream.tool_turnaround),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Replay a recorded Bedrock session against a local fake stream')
+    parser.add_argument('recording', help='Recording file written with --record')
+    parser.add_argument('--realtime', action='store_true', help='Keep the recorded pacing')
+    parser.add_argument('--no-local-audio', action='store_true', help='Skip decoding output audio')
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(args.recording, realtime=args.realtime, local_audio=not args.no_local_audio))
+    print(json.dumps(report, indent=2))
@@ -6,17 +6,27 @@ import boto3
 import os
 import json
 import requests
+import copy
+import hashlib
 import re
+import threading
+import time
 from PIL import Image
 from pathlib import Path
 from dotenv import load_dotenv
 from image_vectorizer import ImageVectorizer
+from result_cache import TieredCache, SpatialWeatherCache, SingleFlight, cache_key, cached
+from http_client import HttpClient
 
 load_dotenv("../.env")
 LANG_SEARCH_TOKEN = os.environ.get('LANG_SEARCH_TOKEN', '')
 IMAGES_DIR = os.environ.get('IMAGES_DIR', Path(__file__).parent.parent / "images")
 IMAGE_VECTORS = os.environ.get('IMAGE_VECTORS_DIR', (Path(__file__).parent.parent / "image_vectors").absolute().as_posix())
 
+# Seconds results stay in the result cache; 0 disables caching agent answers
+WEB_SEARCH_TTL = float(os.environ.get('WEB_SEARCH_TTL', '3600'))
+AGENT_ANSWER_TTL = float(os.environ.get('AGENT_ANSWER_TTL', '300'))
+
 print(IMAGES_DIR)
 print(IMAGE_VECTORS)
 
@@ -36,7 +46,9 @@ def vector_search_images(query: str) -> str:
         str: JSON string containing found images and their similarity scores
     """
     try:
-        results = image_vectorizer.search_images(query, n_results=1)
+        # Identical concurrent searches share one embedding and lookup
+        results = SingleFlight.shared().do(cache_key("vector_search_images", query),
+                                           image_vectorizer.search_images, query, n_results=1)
         
         print(f"Found {results} for query '{query}'")
         # Format results for display
@@ -111,14 +123,8 @@ def weather(lat, lon: float) -> str:
         lat: latitude of the location
         lon: logitude of the location
     """
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
-        "latitude": str(lat),
-        "longitude": str(lon),
-        "current_weather": True
-    }
-    response = requests.get(url, params=params)
-    return response.json()["current_weather"]
+    # Nearby lookups share a grid cell; see WEATHER_GRID and WEATHER_TTL
+    return SpatialWeatherCache.shared().current_weather(lat, lon)
 
 class BearerAuth(requests.auth.AuthBase):
     def __init__(self, token):
@@ -128,6 +134,7 @@ class BearerAuth(requests.auth.AuthBase):
         return r
     
 @tool
+@cached("web_search", ttl=WEB_SEARCH_TTL)
 def web_search(query: str) -> str:
     """Search the web for information about a given query. Cannot do image search.
 
@@ -143,7 +150,7 @@ def web_search(query: str) -> str:
         "count": 1
     }
     basic = BearerAuth(LANG_SEARCH_TOKEN)
-    response = requests.post(url, json=params, auth=basic)
+    response = HttpClient.shared().post(url, json=params, auth=basic)
     result = response.json()
     
     # Extract relevant information from the response
@@ -157,9 +164,21 @@ def web_search(query: str) -> str:
     print(f"Web search result for query '{query}': {abstract}")
     return abstract if abstract else "No relevant information found."
 
-class StrandsAgent:
+SYSTEM_PROMPT = "You are a helpful assistant that can do web searches and search for local images using semantic similarity. For semantic image search, use vector_search_images. Please include your response within the <response></response> tag."
+
+class StrandsRuntime:
+    """Process-wide resources shared by every StrandsAgent.
+
+    Starting the AWS Location MCP server, listing its tools and creating the Bedrock
+    model is expensive, so it happens once per process. Each session then builds a
+    lightweight Agent on top of it with its own conversation history.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
 
     def __init__(self):
+        started = time.perf_counter()
         # Launch AWS Location Service MCP Server and create a client object
         aws_profile = os.getenv("AWS_PROFILE")
         env = {"FASTMCP_LOG_LEVEL": "ERROR"}
@@ -179,21 +198,154 @@ class StrandsAgent:
             region_name='us-east-1',
         )
         # Specify Bedrock LLM for the Agent
-        bedrock_model = BedrockModel(
+        self.model = BedrockModel(
             model_id="amazon.nova-lite-v1:0",
             boto_session=session
         )
-        # Create a Strands Agent with web search capabilities
-        tools = self.aws_location_srv_tools
-        tools.extend([weather, web_search, vector_search_images])
-        self.agent = Agent(
-            tools=tools, 
-            model=bedrock_model,
-            system_prompt="You are a helpful assistant that can do web searches and search for local images using semantic similarity. For semantic image search, use vector_search_images. Please include your response within the <response></response> tag."
+        # Tools available to every agent: location tools plus web search capabilities
+        self.tools = list(self.aws_location_srv_tools)
+        self.tools.extend([weather, web_search, vector_search_images])
+        self.startup_seconds = time.perf_counter() - started
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide runtime, starting it on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def close_shared(cls):
+        """Shut down the process-wide runtime if it was started."""
+        with cls._shared_lock:
+            runtime, cls._shared = cls._shared, None
+        if runtime:
+            runtime.close()
+
+    def create_agent(self):
+        """Create an Agent with its own conversation state on the shared tools and model."""
+        return Agent(
+            tools=self.tools, 
+            model=self.model,
+            system_prompt=SYSTEM_PROMPT
         )
 
+    def close(self):
+        # Cleanup the MCP server context
+        self.aws_location_srv_client.__exit__(None, None, None)
+
+class StrandsAgent:
+    """Per-session conversation with the Strands agent."""
+
+    def __init__(self, runtime=None, messages=None):
+        """Create a session agent.
+
+        Args:
+            runtime: StrandsRuntime to use; defaults to the process-wide runtime
+            messages: History to continue; the Agent is then created on first use
+        """
+        started = time.perf_counter()
+        self.runtime = runtime or StrandsRuntime.shared()
+        # Forks are made on the event loop, so they leave creating their Agent to the worker that runs them
+        self._agent = self.runtime.create_agent() if messages is None else None
+        # The conversation so far; agent runs work on a copy and commit the turns they add
+        self.messages = [] if messages is None else messages
+        # Guards self.messages and is only held to copy or update it, never during a run
+        self._lock = threading.Lock()
+        # Agent runs and tool calls happen on worker threads, one at a time per conversation
+        self._run_lock = threading.Lock()
+        # Length of the parent's history when this agent was forked from it
+        self.fork_point = None
+        self.init_seconds = time.perf_counter() - started
+
+    @property
+    def agent(self):
+        """The Strands Agent driven by this conversation."""
+        if self._agent is None:
+            self._agent = self.runtime.create_agent()
+        return self._agent
+
+    def fork(self):
+        """Create an agent continuing a copy of this conversation.
+
+        The fork can answer a query speculatively without touching this session's
+        history; adopt() merges its new turns back if the answer is used. Neither
+        waits for a run of this conversation in progress, so both are safe to call
+        from the event loop.
+        """
+        with self._lock:
+            snapshot = list(self.messages)
+        forked = StrandsAgent(runtime=self.runtime, messages=copy.deepcopy(snapshot))
+        forked.fork_point = len(snapshot)
+        return forked
+
+    def adopt(self, forked):
+        """Append the turns a fork added since it was created to this conversation."""
+        with forked._lock:
+            turns = forked.messages[forked.fork_point:]
+        with self._lock:
+            self.messages.extend(turns)
+
     def query(self, input):
-        output = str(self.agent(input))
+        """Ask the agent, answering repeated questions from the result cache.
+
+        Answers are cached under the question and the conversation so far, so a
+        follow-up like "what's the weather there?" is only reused after the same
+        history. A cached answer is added to this session's history as a turn.
+        Concurrent identical questions with the same history share one agent run.
+        """
+        if AGENT_ANSWER_TTL <= 0:
+            return self._ask(input)
+        key = cache_key("agent", input, history=self._history_digest())
+        output = TieredCache.shared().get(key)
+        if output is not None:
+            self._remember(input, output)
+            return output
+
+        asked = []
+
+        def ask_and_cache():
+            asked.append(True)
+            output = self._ask(input)
+            TieredCache.shared().set(key, output, AGENT_ANSWER_TTL)
+            return output
+        output = SingleFlight.shared().do(key, ask_and_cache)
+        if not asked:
+            # Another session with the same history ran the agent
+            self._remember(input, output)
+        return output
+
+    def _history_digest(self):
+        with self._lock:
+            history = json.dumps(self.messages, sort_keys=True, default=str)
+        return hashlib.sha1(history.encode()).hexdigest()
+
+    def _remember(self, input, output):
+        with self._lock:
+            self.messages.append({"role": "user", "content": [{"text": input}]})
+            self.messages.append({"role": "assistant", "content": [{"text": output}]})
+
+    def _run(self, func):
+        """Return func(agent) run on a copy of the conversation, then commit the turns it added.
+
+        Only the copy and the commit hold self._lock, so the history can be read,
+        forked or extended while the model runs.
+        """
+        with self._run_lock:
+            with self._lock:
+                snapshot = list(self.messages)
+            start = len(snapshot)
+            self.agent.messages = snapshot
+            try:
+                return func(self.agent)
+            finally:
+                with self._lock:
+                    # The agent may have trimmed its copy; turns added meanwhile stay after it
+                    self.messages[:start] = self.agent.messages
+
+    def _ask(self, input):
+        output = str(self._run(lambda agent: agent(input)))
         if "<response>" in output and "</response>" in output:
             match = re.search(r"<response>(.*?)</response>", output, re.DOTALL)
             if match:
@@ -204,15 +356,50 @@ class StrandsAgent:
                 output = match.group(1)
         return output
 
+    def tool_specs(self):
+        """Return the specs (name, description, inputSchema) of the agent's tools."""
+        return self.agent.tool_registry.get_all_tool_specs()
+
     def call_tool(self, tool_name, input):
+        """Call a tool directly, without the agent loop, and return its text output.
+
+        Args:
+            tool_name: Name of a registered tool
+            input: Tool input as a dict or JSON string
+
+        Raises:
+            RuntimeError: If the tool reported an error
+        """
         if isinstance(input, str):
-            input = json.loads(input)
-        if "query" in input:
-            input = input.get("query")
+            input = json.loads(input) if input else {}
 
-        tool_func = getattr(self.agent.tool, tool_name)
-        return tool_func(query=input)
+        result = self._run(lambda agent: getattr(agent.tool, tool_name)(**input))
+        output = "\n".join(item["text"] if "text" in item else json.dumps(item.get("json"))
+                           for item in result.get("content", []))
+        if result.get("status") == "error":
+            raise RuntimeError(output)
+        return output
+
+    def record_tool_call(self, tool_name, input, output):
+        """Add a direct tool call another session ran for us to this conversation.
+
+        The turns match what call_tool leaves in the history, so the agent sees
+        the result on later questions either way.
+        """
+        if isinstance(input, str):
+            input = json.loads(input) if input else {}
+        with self._lock:
+            tool_use_id = f"tooluse_{tool_name}_{len(self.messages)}"
+            self.messages.extend([
+                {"role": "user", "content": [{"text": f"agent.tool.{tool_name} direct tool call.\n"
+                                                      f"Input parameters: {json.dumps(input)}\n"}]},
+                {"role": "assistant", "content": [{"toolUse": {"toolUseId": tool_use_id, "name": tool_name,
+                                                               "input": input}}]},
+                {"role": "user", "content": [{"toolResult": {"toolUseId": tool_use_id, "status": "success",
+                                                             "content": [{"text": output}]}}]},
+                {"role": "assistant", "content": [{"text": f"agent.tool.{tool_name} was called."}]},
+            ])
 
     def close(self):
-        # Cleanup the MCP server context
-        self.aws_location_srv_client.__exit__(None, None, None)
\ No newline at end of file
+        # The shared runtime outlives sessions; see StrandsRuntime.close_shared()
+        self._agent = None
\ No newline at end of file
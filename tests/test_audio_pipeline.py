@@ -0,0 +1,219 @@
+import asyncio
+import threading
+import unittest
+
+import numpy as np
+
+from audio_pipeline import AudioRingBuffer, VoiceActivityGate, AudioCoalescer, JitterBuffer, PlaybackEngine
+
+
+class TestAudioRingBuffer(unittest.TestCase):
+
+    def test_write_and_read_wraps_around(self):
+        """Test that reads return data in order across the end of the buffer."""
+        ring = AudioRingBuffer(8)
+        ring.write(b"abcdef")
+        self.assertEqual(ring.read(4), b"abcd")
+        ring.write(b"ghijkl")
+        self.assertEqual(ring.read(), b"efghijkl")
+        self.assertEqual(ring.available, 0)
+
+    def test_overrun_drops_frames(self):
+        """Test that a full buffer drops the overflow and counts it."""
+        ring = AudioRingBuffer(8, frame_bytes=2)
+        self.assertEqual(ring.write(b"\x00" * 6), 6)
+        self.assertEqual(ring.write(b"\x01" * 6), 2)
+        self.assertEqual(ring.overruns, 1)
+        self.assertEqual(ring.dropped_frames, 2)
+        self.assertEqual(ring.read(), b"\x00" * 6 + b"\x01" * 2)
+
+    def test_reads_whole_frames_only(self):
+        """Test that a partial frame stays buffered until it is complete."""
+        ring = AudioRingBuffer(8, frame_bytes=2)
+        ring.write(b"abc")
+        self.assertEqual(ring.read(), b"ab")
+        ring.write(b"d")
+        self.assertEqual(ring.read(), b"cd")
+
+    def test_read_async_wakes_on_threaded_write(self):
+        """Test that the consumer is woken by a write from another thread."""
+        async def run():
+            ring = AudioRingBuffer(64)
+            timer = threading.Timer(0.05, ring.write, args=(b"\x01\x02" * 4,))
+            timer.start()
+            data = await asyncio.wait_for(ring.read_async(), timeout=2)
+            timer.join()
+            return data
+
+        self.assertEqual(asyncio.run(run()), b"\x01\x02" * 4)
+
+
+def _tone(ms, amplitude=8000, sample_rate=16000):
+    t = np.arange(sample_rate * ms // 1000) / sample_rate
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype('<i2').tobytes()
+
+
+def _silence(ms, sample_rate=16000):
+    return bytes(sample_rate * ms // 1000 * 2)
+
+
+class TestVoiceActivityGate(unittest.TestCase):
+
+    def test_silence_is_dropped(self):
+        """Test that pure silence is suppressed and counted."""
+        gate = VoiceActivityGate(hangover_ms=100, preroll_ms=0)
+        self.assertEqual(gate.process(_silence(500)), [])
+        stats = gate.stats()
+        self.assertEqual(stats["bytes_sent"], 0)
+        self.assertEqual(stats["bytes_suppressed"], len(_silence(500)))
+
+    def test_speech_passes_with_preroll_and_hangover(self):
+        """Test that speech opens the gate, replays pre-roll and holds for the hangover."""
+        gate = VoiceActivityGate(frame_ms=20, hangover_ms=100, preroll_ms=40)
+        gate.process(_silence(200))
+        sent = b"".join(gate.process(_tone(100)))
+        # 40 ms pre-roll + 100 ms speech
+        self.assertEqual(len(sent), len(_silence(140)))
+        sent = b"".join(gate.process(_silence(400)))
+        self.assertEqual(len(sent), len(_silence(100)))
+        self.assertFalse(gate.is_open)
+
+    def test_state_carries_across_small_chunks(self):
+        """Test that odd-sized chunks give the same result as one large chunk."""
+        audio = _silence(100) + _tone(60) + _silence(300)
+        whole = VoiceActivityGate(hangover_ms=100, preroll_ms=40)
+        pieces = VoiceActivityGate(hangover_ms=100, preroll_ms=40)
+        expected = b"".join(whole.process(audio))
+        got = b"".join(b"".join(pieces.process(audio[i:i + 333])) for i in range(0, len(audio), 333))
+        self.assertEqual(got, expected)
+
+    def test_keepalive_mode_replaces_silence(self):
+        """Test that keepalive mode emits short silent frames while suppressed."""
+        gate = VoiceActivityGate(mode="keepalive", hangover_ms=0, preroll_ms=0,
+                                 keepalive_interval_ms=200, keepalive_ms=10)
+        segments = gate.process(_silence(1000))
+        self.assertEqual(len(segments), 5)
+        self.assertTrue(all(segment == _silence(10) for segment in segments))
+        self.assertEqual(gate.stats()["keepalives_sent"], 5)
+
+
+class TestAudioCoalescer(unittest.TestCase):
+
+    def test_merges_chunks_up_to_target(self):
+        """Test that queued chunks are merged until the target duration is reached."""
+        async def run():
+            queue = asyncio.Queue()
+            for i in range(5):
+                queue.put_nowait(bytes([i]) * 320)  # 10 ms each
+            coalescer = AudioCoalescer(target_ms=20, max_latency_ms=1000)
+            return [await coalescer.next_batch(queue) for _ in range(2)], coalescer
+
+        batches, coalescer = asyncio.run(run())
+        self.assertEqual(batches, [b"\x00" * 320 + b"\x01" * 320, b"\x02" * 320 + b"\x03" * 320])
+        self.assertEqual(coalescer.flushes_on_target, 2)
+
+    def test_partial_batch_flushed_after_latency_cap(self):
+        """Test that a partial batch is sent once the latency cap expires."""
+        async def run():
+            queue = asyncio.Queue()
+            queue.put_nowait(b"\x00" * 320)
+            coalescer = AudioCoalescer(target_ms=100, max_latency_ms=20)
+            batch = await asyncio.wait_for(coalescer.next_batch(queue), timeout=2)
+            # A chunk queued after the flush is not lost
+            queue.put_nowait(b"\x01" * 3200)
+            return batch, await coalescer.next_batch(queue), coalescer
+
+        first, second, coalescer = asyncio.run(run())
+        self.assertEqual(first, b"\x00" * 320)
+        self.assertEqual(second, b"\x01" * 3200)
+        self.assertEqual(coalescer.flushes_on_latency, 1)
+
+    def test_batches_are_capped_at_max_bytes(self):
+        """Test that oversized input is split and the remainder carried over."""
+        async def run():
+            queue = asyncio.Queue()
+            queue.put_nowait(b"\x00" * 1000)
+            coalescer = AudioCoalescer(target_ms=0, max_bytes=600)
+            return [await coalescer.next_batch(queue) for _ in range(2)]
+
+        self.assertEqual([len(batch) for batch in asyncio.run(run())], [600, 400])
+
+
+class TestJitterBuffer(unittest.TestCase):
+
+    def test_waits_for_prebuffer_watermark(self):
+        """Test that playback outputs silence until the watermark is reached."""
+        jitter = JitterBuffer(capacity_bytes=64, prebuffer_bytes=8)
+        out = bytearray(4)
+        jitter.put(b"\x01" * 4)
+        self.assertEqual(jitter.read_into(out, 4), 0)
+        self.assertEqual(out, bytearray(4))
+        jitter.put(b"\x02" * 4)
+        self.assertEqual(jitter.read_into(out, 4), 4)
+        self.assertEqual(out, bytearray(b"\x01" * 4))
+
+    def test_underrun_counted_only_before_end_of_content(self):
+        """Test that running dry mid-content is an underrun but the final tail is not."""
+        jitter = JitterBuffer(capacity_bytes=64, prebuffer_bytes=4)
+        out = bytearray(8)
+        jitter.put(b"\x01" * 6)
+        self.assertEqual(jitter.read_into(out, 8), 6)
+        self.assertEqual(out, bytearray(b"\x01" * 6 + b"\x00" * 2))
+        self.assertEqual(jitter.underruns, 1)
+
+        jitter.put(b"\x02" * 2)
+        jitter.end()
+        self.assertEqual(jitter.read_into(out, 8), 2)
+        self.assertEqual(jitter.underruns, 1)
+
+    def test_full_buffer_blocks_writer_until_space(self):
+        """Test that a write to a full buffer waits for the reader instead of dropping."""
+        async def run():
+            jitter = JitterBuffer(capacity_bytes=8, prebuffer_bytes=0)
+            await jitter.write(b"\x01" * 8)
+            timer = threading.Timer(0.05, jitter.read_into, args=(bytearray(8), 8))
+            timer.start()
+            await asyncio.wait_for(jitter.write(b"\x02" * 8), timeout=2)
+            timer.join()
+            return jitter
+
+        jitter = asyncio.run(run())
+        self.assertEqual(jitter.overruns, 1)
+        self.assertEqual(jitter.buffered, 8)
+
+    def test_clear_discards_queued_audio(self):
+        """Test that clear drops everything and reports the byte count."""
+        jitter = JitterBuffer(capacity_bytes=64, prebuffer_bytes=0)
+        jitter.put(b"\x01" * 10)
+        jitter.put(b"\x02" * 10)
+        self.assertEqual(jitter.clear(), 20)
+        self.assertEqual(jitter.buffered, 0)
+
+    def test_clear_abandons_waiting_write(self):
+        """Test that a write blocked on a full buffer is dropped when the buffer is cleared."""
+        async def run():
+            jitter = JitterBuffer(capacity_bytes=8, prebuffer_bytes=0)
+            await jitter.write(b"\x01" * 8)
+            pending = asyncio.ensure_future(jitter.write(b"\x02" * 8))
+            await asyncio.sleep(0.01)
+            jitter.clear()
+            return await asyncio.wait_for(pending, timeout=2), jitter.buffered
+
+        self.assertEqual(asyncio.run(run()), (False, 0))
+
+
+class TestPlaybackEngine(unittest.TestCase):
+
+    def test_interrupt_drops_queued_audio(self):
+        """Test that an interrupt without an open stream flushes and records latency."""
+        engine = PlaybackEngine(sample_rate=16000)
+        engine.buffer.put(b"\x01" * 3200)
+        self.assertEqual(engine.interrupt(), 3200)
+        stats = engine.stats()
+        self.assertEqual(stats["interrupts"], 1)
+        self.assertEqual(stats["buffered_bytes"], 0)
+        self.assertIsNotNone(stats["last_interrupt_latency_ms"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import base64
+import json
+import unittest
+
+from bedrock_events import EventEncoder, EventDecoder
+
+
+class TestEventEncoder(unittest.TestCase):
+
+    def setUp(self):
+        self.encoder = EventEncoder("prompt-1", "audio-1")
+
+    def test_audio_input_round_trips(self):
+        """Test that audio events carry the base64 audio and session names."""
+        audio = bytes(range(256)) * 4
+        event = json.loads(self.encoder.audio_input(audio))["event"]["audioInput"]
+        self.assertEqual(event["promptName"], "prompt-1")
+        self.assertEqual(event["contentName"], "audio-1")
+        self.assertEqual(base64.b64decode(event["content"]), audio)
+
+    def test_text_input_escapes_content(self):
+        """Test that quotes, backslashes and newlines survive encoding."""
+        text = 'He said "hi" \\ then\nleft – café'
+        event = json.loads(self.encoder.text_input("text-1", text))["event"]["textInput"]
+        self.assertEqual(event["content"], text)
+
+    def test_static_events_are_valid_json(self):
+        """Test that the precompiled session events parse to the expected shape."""
+        self.assertIn("sessionStart", json.loads(self.encoder.session_start())["event"])
+        content_start = json.loads(self.encoder.audio_content_start())["event"]["contentStart"]
+        self.assertEqual(content_start["type"], "AUDIO")
+        self.assertEqual(content_start["audioInputConfiguration"]["sampleRateHertz"], 16000)
+        self.assertEqual(json.loads(self.encoder.prompt_end()), {"event": {"promptEnd": {"promptName": "prompt-1"}}})
+        self.assertEqual(json.loads(self.encoder.session_end()), {"event": {"sessionEnd": {}}})
+
+    def test_tool_result_serializes_dict_content(self):
+        """Test that dict tool results are sent as a JSON string."""
+        event = json.loads(self.encoder.tool_result("tool-1", {"result": 'a "quoted" answer'}))
+        content = event["event"]["toolResult"]["content"]
+        self.assertEqual(json.loads(content), {"result": 'a "quoted" answer'})
+
+
+class TestEventDecoder(unittest.TestCase):
+
+    def test_dispatches_by_event_type(self):
+        """Test that sync and async handlers receive the event body."""
+        seen = []
+
+        async def on_audio(body):
+            seen.append(("audio", body["content"]))
+            return True
+
+        decoder = EventDecoder(backend="json")
+        decoder.register("textOutput", lambda body: seen.append(("text", body["content"])))
+        decoder.register("audioOutput", on_audio)
+
+        async def run():
+            results = []
+            for raw in (b'{"event":{"textOutput":{"content":"hi","role":"USER"}}}',
+                        b'{"event":{"audioOutput":{"content":"AAA="}}}',
+                        b'{"event":{"completionEnd":{}}}'):
+                results.append(await decoder.dispatch(raw))
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual(seen, [("text", "hi"), ("audio", "AAA=")])
+        self.assertEqual([(event_type, consumed) for event_type, _, consumed in results],
+                         [("textOutput", None), ("audioOutput", True), ("completionEnd", None)])
+
+    def test_audio_is_decoded_once(self):
+        """Test that audio_pcm memoizes the decoded audio on the body."""
+        body = {"content": base64.b64encode(b"\x01\x02").decode()}
+        first = EventDecoder.audio_pcm(body)
+        self.assertEqual(first, b"\x01\x02")
+        self.assertIs(EventDecoder.audio_pcm(body), first)
+
+    def test_invalid_json_raises_value_error(self):
+        """Test that malformed payloads raise ValueError for every backend."""
+        with self.assertRaises(ValueError):
+            EventDecoder(backend="json").decode(b"not json")
+        try:
+            decoder = EventDecoder(backend="orjson")
+        except ValueError:
+            self.skipTest("orjson not installed")
+        with self.assertRaises(ValueError):
+            decoder.decode(b"not json")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import asyncio
+import unittest
+
+from bounded_queue import BoundedQueue, QueueOverflow
+
+
+class TestBoundedQueue(unittest.TestCase):
+
+    def test_drop_oldest_prefers_droppable_items(self):
+        """Test that a full queue drops its oldest droppable item and keeps the rest in order."""
+        queue = BoundedQueue(3, droppable=lambda item: item.startswith("audio"))
+        for item in ("text", "audio1", "audio2", "audio3"):
+            queue.put_nowait(item)
+        self.assertEqual([queue.get_nowait() for _ in range(3)], ["text", "audio2", "audio3"])
+        self.assertEqual(queue.stats()["dropped"], 1)
+        self.assertEqual(queue.high_water, 3)
+
+    def test_drop_oldest_without_droppable_items(self):
+        """Test that the oldest item goes when none is droppable."""
+        queue = BoundedQueue(2, droppable=lambda item: False)
+        for item in range(4):
+            queue.put_nowait(item)
+        self.assertEqual([queue.get_nowait() for _ in range(2)], [2, 3])
+        self.assertEqual(queue.dropped, 2)
+
+    def test_block_waits_for_the_consumer(self):
+        """Test that put() waits for room with the block policy."""
+        async def run():
+            queue = BoundedQueue(1, policy="block")
+            await queue.put("first")
+            put = asyncio.ensure_future(queue.put("second"))
+            await asyncio.sleep(0.01)
+            waiting = not put.done()
+            self.assertEqual(await queue.get(), "first")
+            await put
+            return waiting, await queue.get(), queue.stats()
+
+        waiting, item, stats = asyncio.run(run())
+        self.assertTrue(waiting)
+        self.assertEqual(item, "second")
+        self.assertEqual(stats["dropped"], 0)
+
+    def test_disconnect_raises_on_both_sides(self):
+        """Test that overflow empties the queue and is raised to the producer and to a waiting consumer."""
+        async def run():
+            queue = BoundedQueue(2, policy="disconnect")
+            await queue.put(1)
+            await queue.put(2)
+            with self.assertRaises(QueueOverflow):
+                await queue.put(3)
+            with self.assertRaises(QueueOverflow):
+                queue.put_nowait(4)
+            with self.assertRaises(QueueOverflow):
+                await queue.get()
+            return queue.stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["dropped"], 2)
+        self.assertEqual(stats["high_water"], 2)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            BoundedQueue(0)
+        with self.assertRaises(ValueError):
+            BoundedQueue(1, policy="spill")
+
+
+if __name__ == '__main__':
+    unittest.main()
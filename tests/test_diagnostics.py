@@ -0,0 +1,91 @@
+import io
+import json
+import logging
+import unittest
+
+from diagnostics import SessionLogger, configure, get_logger, parse_levels, shutdown
+
+
+class CountingArg:
+    """Counts how often a log argument is formatted."""
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "value"
+
+
+class TestDiagnostics(unittest.TestCase):
+
+    def setUp(self):
+        self.output = io.StringIO()
+        self.root_handlers = logging.getLogger().handlers[:]
+
+    def tearDown(self):
+        shutdown()
+        logging.getLogger().handlers = self.root_handlers
+        for name in ("voice", "voice.stream", "voice.audio"):
+            logging.getLogger(name).setLevel(logging.NOTSET)
+
+    def records(self):
+        shutdown()
+        return [json.loads(line) for line in self.output.getvalue().splitlines()]
+
+    def test_parse_levels(self):
+        """Test parsing of per-component level settings."""
+        self.assertEqual(parse_levels("stream=debug, audio=INFO,"), {"stream": "DEBUG", "audio": "INFO"})
+        self.assertEqual(parse_levels(""), {})
+
+    def test_disabled_messages_are_not_formatted(self):
+        """Test that arguments of disabled calls are never formatted."""
+        configure(level="WARNING", stream=self.output, structured=True)
+        arg = CountingArg()
+        log = SessionLogger(get_logger("stream"), "session-1")
+        for _ in range(100):
+            log.debug("Sent %s", arg)
+        self.assertEqual(arg.formatted, 0)
+        self.assertEqual(self.records(), [])
+
+    def test_component_and_session_levels(self):
+        """Test that one component or one session can log at DEBUG alone."""
+        configure(level="WARNING", levels={"audio": "DEBUG"}, stream=self.output, structured=True)
+        get_logger("audio").debug("audio detail")
+        get_logger("stream").debug("stream detail")
+
+        quiet = SessionLogger(get_logger("stream"), "session-1")
+        traced = SessionLogger(get_logger("stream"), "session-2")
+        traced.setLevel("DEBUG")
+        quiet.debug("quiet session")
+        traced.debug("Sent %s", "audioInput", extra={"event_type": "audioInput", "bytes": 1280})
+
+        records = self.records()
+        self.assertEqual([record["message"] for record in records], ["audio detail", "Sent audioInput"])
+        self.assertEqual(records[1]["session"], "session-2")
+        self.assertEqual(records[1]["bytes"], 1280)
+        self.assertEqual(records[1]["logger"], "voice.stream")
+
+    def test_records_point_at_the_caller(self):
+        """Test that session records carry the calling function and line, not the adapter's."""
+        log = SessionLogger(get_logger("stream"), "session-4")
+        with self.assertLogs(get_logger("stream"), "DEBUG") as captured:
+            log.debug("through debug")
+            log.log(logging.INFO, "through log")
+        self.assertEqual([record.funcName for record in captured.records],
+                         ["test_records_point_at_the_caller"] * 2)
+        self.assertEqual(captured.records[1].lineno, captured.records[0].lineno + 1)
+
+    def test_text_format_appends_fields(self):
+        """Test that the text format includes structured fields."""
+        configure(level="INFO", stream=self.output)
+        SessionLogger(get_logger("stream"), "session-3").info("Turn spans", extra={"spans": {"tool_use": 0.5}})
+        shutdown()
+        line = self.output.getvalue().strip()
+        self.assertIn("voice.stream", line)
+        self.assertIn("session=session-3", line)
+        self.assertIn("spans={'tool_use': 0.5}", line)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import http.server
+import json
+import threading
+import time
+import unittest
+
+import requests
+
+from http_client import HttpClient
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Statuses to answer with before succeeding, shared by the test
+    failures = []
+    delay = 0
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        status = self.failures.pop(0) if self.failures else 200
+        body = json.dumps({"path": self.path}).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up waiting
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestHttpClient(unittest.TestCase):
+
+    def setUp(self):
+        StubHandler.failures = []
+        StubHandler.delay = 0
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = HttpClient(backoff=0.01)
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connections_are_reused(self):
+        """Test that sequential requests share one keep-alive connection."""
+        for i in range(3):
+            self.assertEqual(self.client.get(f"{self.url}/{i}").json(), {"path": f"/{i}"})
+        stats = self.client.stats()
+        self.assertEqual(stats["connections_opened"], 1)
+        self.assertEqual(stats["connections_reused"], 2)
+
+    def test_retries_retryable_status(self):
+        """Test that 503 responses are retried until one succeeds."""
+        StubHandler.failures = [503, 503]
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.stats()["retried"], 2)
+
+        StubHandler.failures = [503, 503, 503]
+        self.assertEqual(self.client.get(self.url).status_code, 503)
+
+    def test_read_timeout_is_bounded(self):
+        """Test that a slow upstream raises after the retries instead of hanging."""
+        StubHandler.delay = 0.5
+        client = HttpClient(read_timeout=0.1, retries=1, backoff=0.01)
+        started = time.perf_counter()
+        with self.assertRaises(requests.Timeout):
+            client.get(self.url)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(client.stats()["failures"], 1)
+        client.close()
+
+    def test_async_requests(self):
+        """Test that the async variant runs requests off the event loop."""
+        async def run():
+            return await asyncio.gather(*(self.client.get_async(f"{self.url}/{i}") for i in range(4)))
+
+        responses = asyncio.run(run())
+        self.assertEqual([response.json()["path"] for response in responses], ["/0", "/1", "/2", "/3"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import asyncio
+import base64
+import json
+import unittest
+from types import SimpleNamespace
+
+import websockets
+
+from load_test import (ScriptedAgent, ScriptedBedrockClient, histogram_quantile, metric_total, parse_metrics,
+                       percentiles, run_session)
+from metrics import Histogram, MetricsRegistry, merge_expositions
+from web_server.protocol import SUBPROTOCOL, ASSISTANT_AUDIO, pack_audio, select_subprotocol, unpack_audio
+
+
+def chunk(name, body):
+    return SimpleNamespace(value=SimpleNamespace(bytes_=json.dumps({"event": {name: body}}).encode("utf-8")))
+
+
+def audio_input(pcm):
+    return chunk("audioInput", {"content": base64.b64encode(pcm).decode("ascii")})
+
+
+class TestScriptedBedrock(unittest.TestCase):
+
+    def test_turn_is_triggered_by_audio(self):
+        """Test that a turn's worth of audio produces a transcript, a toolUse and paced audio."""
+        client = ScriptedBedrockClient(turn_audio_seconds=0.1, response_audio_seconds=0.08, chunk_ms=40)
+
+        async def run():
+            stream = await client.invoke_model_with_bidirectional_stream(None)
+            output = (await stream.await_output())[1]
+            # 0.1 s at 16 kHz is 3200 bytes; the first 3000 must not start a turn
+            await stream.input_stream.send(audio_input(bytes(3000)))
+            self.assertEqual(stream.turns_started, 0)
+            await stream.input_stream.send(audio_input(bytes(400)))
+            self.assertEqual(stream.turns_started, 1)
+
+            events = []
+            while True:
+                event = json.loads((await output.receive()).value.bytes_)["event"]
+                name = next(iter(event))
+                events.append(name)
+                if name == "toolUse":
+                    self.assertEqual(json.loads(event["toolUse"]["content"]), client.tool_input)
+                    await stream.input_stream.send(chunk("toolResult", {"content": "{}"}))
+                if name == "contentEnd" and event["contentEnd"]["type"] == "AUDIO":
+                    break
+            await stream.input_stream.close()
+            with self.assertRaises(StopAsyncIteration):
+                await output.receive()
+            return events
+
+        events = asyncio.run(run())
+        self.assertEqual(events, ["contentStart", "textOutput", "contentEnd",
+                                  "contentStart", "toolUse", "contentEnd",
+                                  "contentStart", "audioOutput", "audioOutput", "contentEnd"])
+
+    def test_scripted_agent(self):
+        """Test that the stand-in agent exposes its tools and answers with its result."""
+        agent = ScriptedAgent(result="sunny", delay=0)
+        self.assertEqual([spec["name"] for spec in agent.tool_specs()], ["weather"])
+        self.assertEqual(agent.call_tool("weather", "{}"), "sunny")
+
+
+class TestLoadTest(unittest.TestCase):
+
+    def test_histogram_quantile_between_scrapes(self):
+        """Test that quantiles only cover observations made between two scrapes."""
+        registry = MetricsRegistry()
+        lag = Histogram("lag_seconds", "Lag", buckets=(0.01, 0.1, 1), registry=registry)
+        for _ in range(100):
+            lag.observe(0.5)
+        before = parse_metrics(registry.render())
+        for _ in range(100):
+            lag.observe(0.005)
+        after = parse_metrics(registry.render())
+
+        self.assertEqual(after['lag_seconds_bucket{le="+Inf"}'], 200)
+        self.assertLessEqual(histogram_quantile(before, after, "lag_seconds", 0.99), 0.01)
+        self.assertIsNone(histogram_quantile(after, after, "lag_seconds", 0.99))
+
+    def test_totals_over_workers(self):
+        """Test that samples and buckets labelled by worker are summed."""
+        registry = MetricsRegistry()
+        lag = Histogram("lag_seconds", "Lag", buckets=(0.01, 0.1, 1), registry=registry)
+        lag.observe(0.5)
+        merged = parse_metrics(merge_expositions({"0": registry.render(), "1": registry.render()}))
+        self.assertEqual(metric_total(merged, "lag_seconds_count"), 2)
+        self.assertGreater(histogram_quantile({}, merged, "lag_seconds", 0.5), 0.1)
+
+    def test_percentiles(self):
+        self.assertEqual(percentiles([]), {"count": 0})
+        self.assertEqual(percentiles([3, 1, 2])["p50"], 2)
+
+    def run_session_against_stub(self, binary):
+        """Run a synthetic session against a server answering each turn with a transcript and audio."""
+        turn_bytes = int(0.1 * 16000) * 2
+        received = []
+
+        async def handler(websocket):
+            audio = 0
+            async for message in websocket:
+                if isinstance(message, bytes):
+                    received.append("binary")
+                    audio += len(unpack_audio(message)[2])
+                else:
+                    data = json.loads(message)
+                    received.append(data["type"])
+                    if data["type"] == "audio":
+                        audio += len(base64.b64decode(data["data"]))
+                if audio >= turn_bytes:
+                    audio -= turn_bytes
+                    await websocket.send(json.dumps({"type": "text", "data": "weather"}))
+                    for seq in range(2):
+                        if websocket.subprotocol == SUBPROTOCOL:
+                            await websocket.send(pack_audio(ASSISTANT_AUDIO, seq, bytes(4)))
+                        else:
+                            await websocket.send(json.dumps({"type": "audio", "data": "AAAA"}))
+
+        async def run():
+            async with websockets.serve(handler, "127.0.0.1", 0, subprotocols=[SUBPROTOCOL],
+                                        select_subprotocol=select_subprotocol) as server:
+                port = server.sockets[0].getsockname()[1]
+                return await run_session(f"ws://127.0.0.1:{port}", duration=0.3, turn_seconds=0.1, binary=binary)
+
+        result = asyncio.run(run())
+        self.assertIsNone(result.error)
+        self.assertEqual(result.turns_sent, 3)
+        self.assertEqual(len(result.first_audio_latency), 3)
+        self.assertEqual(result.audio_messages, 6)
+        self.assertLess(max(result.first_audio_latency), 0.5)
+        self.assertEqual(received[0], "start")
+        self.assertEqual(received[-1], "stop")
+        return received
+
+    def test_session_measures_turn_latency(self):
+        self.assertIn("binary", self.run_session_against_stub(binary=True))
+
+    def test_session_with_json_audio(self):
+        self.assertIn("audio", self.run_session_against_stub(binary=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
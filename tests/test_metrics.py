@@ -0,0 +1,111 @@
+import time
+import unittest
+
+from metrics import (Counter, Gauge, Histogram, MetricsRegistry, REGISTRY, TurnTracer, merge_expositions,
+                     FIRST_AUDIO, TOOL_DURATION, TURNS)
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_render_prometheus_text(self):
+        """Test the text exposition of counters, labelled counters and gauges."""
+        sent = Counter("bytes_sent_total", "Bytes sent", labels=("event",), registry=self.registry)
+        sent.labels("audioInput").inc(100)
+        sent.labels("audioInput").inc(28)
+        depth = Gauge("queue_depth", "Queued items", registry=self.registry)
+        depth.set_function(lambda: 3)
+
+        text = self.registry.render()
+        self.assertIn("# TYPE bytes_sent_total counter\n", text)
+        self.assertIn('bytes_sent_total{event="audioInput"} 128\n', text)
+        self.assertIn("# TYPE queue_depth gauge\nqueue_depth 3\n", text)
+        with self.assertRaises(ValueError):
+            Counter("bytes_sent_total", "Duplicate", registry=self.registry)
+
+    def test_counter_read_from_function(self):
+        """Test that a counter can be read at scrape time and keeps the counter type."""
+        cpu = Counter("cpu_seconds_total", "CPU time", registry=self.registry)
+        cpu.set_function(lambda: 1.5)
+        self.assertIn("# TYPE cpu_seconds_total counter\ncpu_seconds_total 1.5\n", self.registry.render())
+
+    def test_process_cpu_is_a_counter(self):
+        """Test that process CPU time is exported with the type its _total name promises."""
+        text = REGISTRY.render()
+        self.assertIn("# TYPE process_cpu_seconds_total counter\n", text)
+        self.assertIn("# TYPE process_resident_memory_bytes gauge\n", text)
+
+    def test_histogram_buckets_and_percentiles(self):
+        """Test cumulative buckets and bucket-interpolated percentiles."""
+        latency = Histogram("latency_seconds", "Latency", buckets=(0.1, 0.2, 0.5), registry=self.registry)
+        for value in [0.05] * 50 + [0.15] * 45 + [0.4] * 4 + [2.0]:
+            latency.observe(value)
+
+        text = self.registry.render()
+        self.assertIn('latency_seconds_bucket{le="0.1"} 50\n', text)
+        self.assertIn('latency_seconds_bucket{le="0.5"} 99\n', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 100\n', text)
+        self.assertIn("latency_seconds_count 100\n", text)
+
+        percentiles = self.registry.percentiles()["latency_seconds"]["latency_seconds"]
+        self.assertAlmostEqual(percentiles["p50"], 0.1)
+        self.assertTrue(0.1 < percentiles["p95"] <= 0.2)
+        self.assertEqual(percentiles["p99"], 0.5)
+
+    def test_stats_collectors_flatten_numbers(self):
+        """Test that stats() dicts are exposed as gauges, skipping non-numeric values."""
+        self.registry.register_stats("pool", lambda: {"ready": 2, "hit_rate": None, "wait": {"max": 0.5}})
+        text = self.registry.render()
+        self.assertIn("pool_ready 2\n", text)
+        self.assertIn("pool_wait_max 0.5\n", text)
+        self.assertNotIn("hit_rate", text)
+
+
+class TestTurnTracer(unittest.TestCase):
+
+    def test_turn_timeline(self):
+        """Test that marks record offsets from the transcript and feed the histograms."""
+        turns = TURNS.labels().value
+        first_audio = FIRST_AUDIO.labels().count
+        tracer = TurnTracer("session")
+        tracer.mic_audio(640)
+        tracer.transcript()
+        tracer.tool_use("tool-1")
+        time.sleep(0.01)
+        tracer.tool_done("tool-1", "weather")
+        tracer.audio_out(100)
+        tracer.audio_out(100)
+
+        self.assertEqual(list(tracer.spans), ["transcript", "tool_use", "tool_done", "first_audio"])
+        self.assertGreaterEqual(tracer.spans["tool_done"], 0.01)
+        self.assertEqual(TURNS.labels().value, turns + 1)
+        self.assertEqual(FIRST_AUDIO.labels().count, first_audio + 1)
+        self.assertGreaterEqual(TOOL_DURATION.labels("weather").count, 1)
+
+        tracer.transcript()
+        self.assertIn("first_audio", tracer.last_turn)
+        self.assertEqual(tracer.spans, {"transcript": 0.0})
+
+    def test_merge_expositions_labels_each_worker(self):
+        """Test that merged worker metrics keep one header per family and a worker label per sample."""
+        registry = MetricsRegistry()
+        sent = Counter("bytes_sent_total", "Bytes sent", labels=("event",), registry=registry)
+        sent.labels("audioInput").inc(5)
+        Histogram("latency_seconds", "Latency", buckets=(0.1,), registry=registry).observe(0.05)
+        registry.register_stats("pool", lambda: {"ready": 2})
+
+        text = merge_expositions({"0": registry.render(), "1": registry.render()})
+        lines = text.splitlines()
+        self.assertEqual(lines.count("# TYPE bytes_sent_total counter"), 1)
+        self.assertEqual(lines[lines.index("# TYPE bytes_sent_total counter") + 1:][:2],
+                         ['bytes_sent_total{worker="0",event="audioInput"} 5',
+                          'bytes_sent_total{worker="1",event="audioInput"} 5'])
+        self.assertIn('latency_seconds_bucket{worker="1",le="+Inf"} 1', lines)
+        self.assertIn('latency_seconds_count{worker="0"} 1', lines)
+        self.assertIn('pool_ready{worker="1"} 2', lines)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+
+import websockets
+
+from web_server.protocol import (SUBPROTOCOL, MIC_AUDIO, ASSISTANT_AUDIO, SequenceTracker, pack_audio,
+                                 select_subprotocol, unpack_audio)
+
+
+class TestProtocol(unittest.TestCase):
+
+    def test_audio_frame_round_trip(self):
+        """Test that a frame carries its kind, wrapped sequence number and PCM unchanged."""
+        pcm = bytes(range(256)) * 2
+        frame = pack_audio(MIC_AUDIO, 65537, pcm)
+        self.assertEqual(len(frame), len(pcm) + 4)
+        self.assertEqual(unpack_audio(frame), (MIC_AUDIO, 1, pcm))
+
+    def test_invalid_frames(self):
+        """Test that short frames and unknown versions are rejected."""
+        with self.assertRaises(ValueError):
+            unpack_audio(b"\x01\x01")
+        with self.assertRaises(ValueError):
+            unpack_audio(b"\x02\x01\x00\x00pcm")
+
+    def test_sequence_tracker_counts_gaps(self):
+        """Test gap counting across the wrap-around, ignoring late frames."""
+        tracker = SequenceTracker()
+        self.assertEqual(tracker.receive(65534), 0)
+        self.assertEqual(tracker.receive(65535), 0)
+        self.assertEqual(tracker.receive(2), 2)
+        self.assertEqual(tracker.receive(1), 0)
+        self.assertEqual(tracker.receive(3), 0)
+        self.assertEqual(tracker.missing, 2)
+
+    def test_negotiation_keeps_json_clients(self):
+        """Test that clients offering the subprotocol get it and clients offering none still connect."""
+        async def handler(websocket):
+            async for message in websocket:
+                if websocket.subprotocol == SUBPROTOCOL:
+                    kind, seq, pcm = unpack_audio(message)
+                    await websocket.send(pack_audio(ASSISTANT_AUDIO, seq, pcm))
+                else:
+                    await websocket.send(message)
+
+        async def run():
+            async with websockets.serve(handler, "127.0.0.1", 0, subprotocols=[SUBPROTOCOL],
+                                        select_subprotocol=select_subprotocol) as server:
+                url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+                async with websockets.connect(url, subprotocols=[SUBPROTOCOL]) as websocket:
+                    await websocket.send(pack_audio(MIC_AUDIO, 7, b"\x01\x02"))
+                    binary = (websocket.subprotocol, unpack_audio(await websocket.recv()))
+                async with websockets.connect(url) as websocket:
+                    await websocket.send('{"type": "start"}')
+                    text = (websocket.subprotocol, await websocket.recv())
+                return binary, text
+
+        binary, text = asyncio.run(run())
+        self.assertEqual(binary, (SUBPROTOCOL, (ASSISTANT_AUDIO, 7, b"\x01\x02")))
+        self.assertEqual(text, (None, '{"type": "start"}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,173 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from result_cache import AsyncSingleFlight, SingleFlight, TieredCache, cache_key, cached, normalize_query
+
+
+class TestNormalizeQuery(unittest.TestCase):
+
+    def test_ignores_case_punctuation_and_fillers(self):
+        """Test that ASR variations of the same question normalize alike."""
+        self.assertEqual(normalize_query("Um, what's the weather in Paris?"),
+                         normalize_query("what's the  WEATHER in paris"))
+        self.assertEqual(normalize_query("Uh please search for cats."), "search for cats")
+
+    def test_keeps_symbols_inside_words(self):
+        """Test that only sentence punctuation is dropped, so distinct terms keep distinct keys."""
+        self.assertEqual(normalize_query("Tutorials for C++?"), "tutorials for c++")
+        self.assertNotEqual(normalize_query("C++ tutorials"), normalize_query("C# tutorials"))
+        self.assertNotEqual(normalize_query("what's new"), normalize_query("what s new"))
+
+    def test_cache_key_normalizes_string_arguments(self):
+        """Test that keys separate namespaces and normalize strings only."""
+        self.assertEqual(cache_key("web_search", "Cats!"), cache_key("web_search", "cats"))
+        self.assertNotEqual(cache_key("web_search", "cats"), cache_key("agent", "cats"))
+        self.assertNotEqual(cache_key("weather", 1.0, 2.0), cache_key("weather", 2.0, 1.0))
+
+
+class TestTieredCache(unittest.TestCase):
+
+    def test_lru_eviction_by_entries_and_bytes(self):
+        """Test that the least recently used entries are evicted first."""
+        cache = TieredCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+        cache = TieredCache(max_bytes=20)
+        cache.set("a", "x" * 10)
+        cache.set("b", "y" * 10)
+        self.assertIsNone(cache.get("a"))
+        self.assertLessEqual(cache.stats()["bytes"], 20)
+
+    def test_entries_expire(self):
+        """Test that entries are not returned after their TTL."""
+        cache = TieredCache()
+        cache.set("a", "value", ttl=0.05)
+        self.assertEqual(cache.get("a"), "value")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("a"))
+        stats = cache.stats()
+        self.assertEqual(stats["expirations"], 1)
+        self.assertEqual(stats["entries"], 0)
+        self.assertEqual(stats["bytes"], 0)
+
+    def test_disk_tier_survives_restart(self):
+        """Test that entries are reloaded from the SQLite tier."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            cache = TieredCache(disk_path=path)
+            cache.set("weather", {"temperature": 21.5}, ttl=60)
+            cache.close()
+
+            cache = TieredCache(disk_path=path)
+            self.assertEqual(cache.get("weather"), {"temperature": 21.5})
+            self.assertEqual(cache.get("weather"), {"temperature": 21.5})
+            stats = cache.stats()
+            self.assertEqual(stats["disk_hits"], 1)
+            self.assertEqual(stats["hit_rate"], 1.0)
+            cache.close()
+
+    def test_cached_decorator(self):
+        """Test that the decorator reuses results and keeps the function's metadata."""
+        cache = TieredCache()
+        calls = []
+
+        @cached("search", ttl=60, cache=cache)
+        def search(query: str) -> str:
+            """Search for query."""
+            calls.append(query)
+            return f"results for {query}"
+
+        self.assertEqual(search("Cats?"), "results for Cats?")
+        self.assertEqual(search("um cats"), "results for Cats?")
+        self.assertEqual(calls, ["Cats?"])
+        self.assertEqual(search.__doc__, "Search for query.")
+        self.assertEqual(search.__annotations__, {"query": str, "return": str})
+
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that identical concurrent calls run once and all get the result."""
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def search(query):
+            calls.append(query)
+            release.wait(1)
+            return f"results for {query}"
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(flight.do, "cats", search, "cats") for _ in range(4)]
+            while flight.stats()["coalesced"] < 3:
+                time.sleep(0.01)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, ["results for cats"] * 4)
+        self.assertEqual(calls, ["cats"])
+        self.assertEqual(flight.stats(), {"executions": 1, "coalesced": 3, "failures": 0, "in_flight": 0})
+
+    def test_failure_is_shared_but_not_remembered(self):
+        """Test that waiters get the leader's exception and the next call runs again."""
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fail():
+            release.wait(1)
+            raise ConnectionError("upstream down")
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            futures = [pool.submit(flight.do, "key", fail) for _ in range(2)]
+            while flight.stats()["coalesced"] < 1:
+                time.sleep(0.01)
+            release.set()
+            for future in futures:
+                with self.assertRaises(ConnectionError):
+                    future.result()
+
+        self.assertEqual(flight.do("key", lambda: "recovered"), "recovered")
+        self.assertEqual(flight.stats()["failures"], 1)
+
+    def test_async_cancellation(self):
+        """Test that a cancelled waiter leaves the shared call running for the others."""
+        flight = AsyncSingleFlight()
+        runs = []
+
+        async def search():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        async def run():
+            first = asyncio.ensure_future(flight.do("key", search))
+            second = asyncio.ensure_future(flight.do("key", search))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            result = await second
+
+            lonely = asyncio.ensure_future(flight.do("other", search))
+            await asyncio.sleep(0.01)
+            lonely.cancel()
+            await asyncio.sleep(0.01)
+            return result, first.cancelled(), flight.stats()["in_flight"]
+
+        self.assertEqual(asyncio.run(run()), ("result", True, 0))
+        self.assertEqual(len(runs), 2)
+        self.assertEqual(flight.stats()["coalesced"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
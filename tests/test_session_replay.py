@@ -0,0 +1,145 @@
+import asyncio
+import base64
+import json
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from session_replay import (FakeBedrockClient, RecordingClient, ReplayAgent, SessionRecorder, load_recording,
+                            replay)
+
+
+def event(name, body):
+    return json.dumps({"event": {name: body}}).encode("utf-8")
+
+
+def chunk(data):
+    return SimpleNamespace(value=SimpleNamespace(bytes_=data))
+
+
+RECORDING = [
+    (0.0, "out", event("sessionStart", {})),
+    (0.05, "in", event("textOutput", {"role": "USER", "content": "weather in Paris"})),
+    (0.1, "in", event("toolUse", {"toolName": "weather", "toolUseId": "t1", "content": "{}"})),
+    (0.2, "out", event("toolResult", {"content": json.dumps({"result": "sunny"})})),
+    (0.3, "in", event("audioOutput", {"content": "AAAA"})),
+]
+
+# A spoken turn: 0.4 s of microphone audio, a weather tool call and a spoken answer
+AUDIO_CHUNK = bytes(1280)
+SESSION = (
+    [(0.0, "out", event("sessionStart", {}))]
+    + [(index * 0.04, "out", event("audioInput", {"content": base64.b64encode(AUDIO_CHUNK).decode()}))
+       for index in range(10)]
+    + [(0.45, "in", event("contentStart", {"type": "TEXT", "role": "USER",
+                                           "additionalModelFields": json.dumps({"generationStage": "FINAL"})})),
+       (0.45, "in", event("textOutput", {"role": "USER", "content": "weather in Paris"})),
+       (0.45, "in", event("contentEnd", {"type": "TEXT", "stopReason": "END_TURN"})),
+       (0.5, "in", event("contentStart", {"type": "TOOL", "role": "TOOL", "contentId": "c1"})),
+       (0.5, "in", event("toolUse", {"toolName": "weather", "toolUseId": "t1", "contentId": "c1",
+                                     "content": json.dumps({"lat": 48.85, "lon": 2.35})})),
+       (0.5, "in", event("contentEnd", {"type": "TOOL", "stopReason": "TOOL_USE", "contentId": "c1"})),
+       (0.6, "out", event("toolResult", {"content": json.dumps({"result": "sunny"})})),
+       (0.65, "in", event("contentStart", {"type": "AUDIO", "role": "ASSISTANT"}))]
+    + [(0.65, "in", event("audioOutput", {"role": "ASSISTANT", "content": "AAAA"})) for _ in range(3)]
+    + [(0.7, "in", event("contentEnd", {"type": "AUDIO", "stopReason": "END_TURN"}))]
+)
+
+
+class TestSessionReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_recording(self, recording=RECORDING):
+        path = os.path.join(self.directory.name, "session.jsonl.gz")
+        recorder = SessionRecorder(path)
+        for offset, direction, data in recording:
+            recorder.record(direction, data)
+        recorder.close()
+        return path
+
+    def test_recording_round_trips(self):
+        """Test that recorded events load back in order with their directions."""
+        recording = load_recording(self.write_recording())
+        self.assertEqual([(direction, data) for offset, direction, data in recording],
+                         [(direction, data) for offset, direction, data in RECORDING])
+
+    def test_fake_stream_plays_back_inbound_events(self):
+        """Test the fake stream's send/await_output/receive interface and end of stream."""
+        client = FakeBedrockClient(RECORDING)
+
+        async def run():
+            stream = await client.invoke_model_with_bidirectional_stream(None)
+            await stream.input_stream.send(chunk(event("sessionStart", {})))
+            received = []
+            while True:
+                output = await stream.await_output()
+                try:
+                    result = await output[1].receive()
+                except StopAsyncIteration:
+                    break
+                received.append(result.value.bytes_)
+                if b"toolUse" in result.value.bytes_:
+                    await stream.input_stream.send(chunk(event("toolResult", {"content": "{}"})))
+            return stream, received
+
+        stream, received = asyncio.run(run())
+        self.assertEqual(received, [data for offset, direction, data in RECORDING if direction == "in"])
+        self.assertEqual(len(stream.input_stream.sent), 2)
+        self.assertEqual(len(stream.handling), 3)
+        self.assertEqual(len(stream.tool_turnaround), 1)
+
+    def test_fake_stream_realtime_pacing(self):
+        """Test that real-time playback keeps the recorded offsets."""
+        client = FakeBedrockClient(RECORDING, realtime=True)
+
+        async def run():
+            stream = await client.invoke_model_with_bidirectional_stream(None)
+            started = time.perf_counter()
+            for _ in range(3):
+                await (await stream.await_output())[1].receive()
+            return time.perf_counter() - started
+
+        self.assertGreaterEqual(asyncio.run(run()), 0.29)
+
+    def test_recording_client_records_both_directions(self):
+        """Test that a wrapped client records what is sent and received."""
+        client = RecordingClient(FakeBedrockClient(RECORDING), self.directory.name)
+
+        async def run():
+            stream = await client.invoke_model_with_bidirectional_stream(None)
+            await stream.input_stream.send(chunk(event("sessionStart", {})))
+            await (await stream.await_output())[1].receive()
+            await stream.input_stream.close()
+            return stream.recorder.path
+
+        recording = load_recording(asyncio.run(run()))
+        self.assertEqual([direction for offset, direction, data in recording], ["out", "in"])
+
+    def test_replay_agent_answers_with_recorded_results(self):
+        """Test that the stand-in agent exposes recorded tools and returns their results."""
+        agent = ReplayAgent(RECORDING)
+        self.assertEqual([spec["name"] for spec in agent.tool_specs()], ["weather"])
+        self.assertEqual(agent.call_tool("weather", "{}"), "sunny")
+        self.assertEqual(agent.query("anything"), "No recorded result.")
+
+    def test_replay_feeds_all_audio_and_answers_tools(self):
+        """Test that a replay, as fast as possible and in real time, sends all audio and every tool result."""
+        path = self.write_recording(SESSION)
+        for realtime in (False, True):
+            with self.subTest(realtime=realtime):
+                report = asyncio.run(replay(path, realtime=realtime, local_audio=False, timeout=10))
+                self.assertEqual(report["audio_chunks_fed"], 10)
+                self.assertEqual(report["audio_bytes_sent"], 10 * len(AUDIO_CHUNK))
+                self.assertEqual(report["inbound_events"], 11)
+                self.assertEqual(report["tool_turnaround_seconds"]["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import http.server
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from http_client import HttpClient
+from result_cache import SpatialWeatherCache, snap_to_grid
+
+
+class StubOpenMeteo(http.server.BaseHTTPRequestHandler):
+    """Answers like open-meteo: an object for one location, a list for several."""
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        lats = query["latitude"][0].split(",")
+        lons = query["longitude"][0].split(",")
+        self.requests.append(list(zip(lats, lons)))
+        locations = [{"latitude": float(lat), "longitude": float(lon),
+                      "current_weather": {"temperature": float(lat) + float(lon)}}
+                     for lat, lon in zip(lats, lons)]
+        body = json.dumps(locations if len(locations) > 1 else locations[0]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestSpatialWeatherCache(unittest.TestCase):
+
+    def setUp(self):
+        StubOpenMeteo.requests = []
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubOpenMeteo)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.http = HttpClient()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/forecast"
+
+    def tearDown(self):
+        self.http.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_snap_to_grid(self):
+        """Test that nearby coordinates share a cell and distant ones do not."""
+        self.assertEqual(snap_to_grid(48.8566, 2.3522, 0.1), snap_to_grid(48.81, 2.39, 0.1))
+        self.assertEqual(snap_to_grid(48.8566, 2.3522, 0.1), (48.85, 2.35))
+        self.assertNotEqual(snap_to_grid(48.8566, 2.3522, 0.1), snap_to_grid(48.91, 2.35, 0.1))
+        self.assertEqual(snap_to_grid(-0.01, -0.01, 1), (-0.5, -0.5))
+
+    def test_nearby_lookups_are_served_from_cache(self):
+        """Test that a lookup in the same cell within the freshness window skips the upstream."""
+        cache = SpatialWeatherCache(url=self.url, grid=0.1, batch_window=0, http=self.http)
+        first = cache.current_weather(48.8566, 2.3522)
+        self.assertEqual(cache.current_weather(48.81, 2.39), first)
+        self.assertEqual(len(StubOpenMeteo.requests), 1)
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+        cache.freshness = 0
+        cache.current_weather(48.81, 2.39)
+        self.assertEqual(len(StubOpenMeteo.requests), 2)
+
+    def test_concurrent_misses_are_batched(self):
+        """Test that concurrent misses for different cells share one upstream request."""
+        cache = SpatialWeatherCache(url=self.url, grid=0.1, batch_window=0.2, http=self.http)
+        coordinates = [(48.85, 2.35), (48.86, 2.36), (51.5, -0.12), (40.71, -74.0)]
+        with ThreadPoolExecutor(max_workers=len(coordinates)) as pool:
+            results = list(pool.map(lambda c: cache.current_weather(*c), coordinates))
+
+        self.assertEqual(len(StubOpenMeteo.requests), 1)
+        self.assertEqual(len(StubOpenMeteo.requests[0]), 3)
+        self.assertEqual(results[0], results[1])
+        self.assertAlmostEqual(results[2]["temperature"], sum(snap_to_grid(51.5, -0.12, 0.1)))
+        stats = cache.stats()
+        self.assertEqual(stats["coalesced"], 1)
+        self.assertEqual(stats["cells_per_request"], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
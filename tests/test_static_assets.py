@@ -0,0 +1,77 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from web_server.static_assets import StaticAssets, accepted_encodings
+
+PAGE = b"<html>" + b"<p>voice search</p>" * 200 + b"</html>"
+
+
+class TestStaticAssets(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        root = self.directory.name
+        os.makedirs(os.path.join(root, "js"))
+        with open(os.path.join(root, "index.html"), "wb") as f:
+            f.write(PAGE)
+        with open(os.path.join(root, "js", "app.js"), "wb") as f:
+            f.write(b"console.log('x');")
+        self.assets = StaticAssets(root, max_age=60)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_accepted_encodings(self):
+        self.assertEqual(accepted_encodings("gzip, deflate;q=0.5, br;q=0"), {"gzip", "deflate"})
+        self.assertEqual(accepted_encodings(None), set())
+
+    def test_serves_compressed_index(self):
+        """Test that / is served gzip-compressed with length, ETag and revalidation headers."""
+        status, headers, body = self.assets.respond("/?v=1", {"Accept-Encoding": "gzip"})
+        headers = dict(headers)
+        self.assertEqual(status, 200)
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(body), PAGE)
+        self.assertEqual(headers["Content-Length"], str(len(body)))
+        self.assertEqual(headers["Cache-Control"], "no-cache")
+        self.assertTrue(headers["Content-Type"].startswith("text/html"))
+
+    def test_small_files_are_not_compressed(self):
+        """Test that a file compression would not shrink is sent as is, with a max-age."""
+        status, headers, body = self.assets.respond("/js/app.js", {"Accept-Encoding": "gzip"})
+        headers = dict(headers)
+        self.assertEqual(body, b"console.log('x');")
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(headers["Cache-Control"], "public, max-age=60")
+
+    def test_if_none_match(self):
+        """Test that a matching ETag is answered with 304 and no body."""
+        etag = dict(self.assets.respond("/index.html", {})[1])["ETag"]
+        status, headers, body = self.assets.respond("/index.html", {"If-None-Match": f'"other", {etag}'})
+        self.assertEqual((status, body), (304, b""))
+        self.assertEqual(self.assets.stats()["not_modified"], 1)
+
+    def test_etag_depends_on_the_encoding(self):
+        """Test that each encoding has its own ETag, so a cached gzip body never validates for identity."""
+        gzip_headers = dict(self.assets.respond("/index.html", {"Accept-Encoding": "gzip"})[1])
+        identity_headers = dict(self.assets.respond("/index.html", {})[1])
+        self.assertEqual(gzip_headers["ETag"], identity_headers["ETag"][:-1] + '-gzip"')
+        self.assertEqual(gzip_headers["Vary"], "Accept-Encoding")
+        status = self.assets.respond("/index.html", {"If-None-Match": gzip_headers["ETag"]})[0]
+        self.assertEqual(status, 200)
+        status = self.assets.respond("/index.html", {"Accept-Encoding": "gzip",
+                                                     "If-None-Match": gzip_headers["ETag"]})[0]
+        self.assertEqual(status, 304)
+
+    def test_paths_cannot_leave_the_directory(self):
+        """Test that traversal, encoded or not, finds nothing outside the preloaded files."""
+        for path in ("/../test_static_assets.py", "/%2e%2e/%2e%2e/etc/passwd", "/js/../../index.html/..",
+                     "/missing.html"):
+            self.assertEqual(self.assets.respond(path, {})[0], 404, path)
+        self.assertEqual(self.assets.respond("/js/../index.html", {})[0], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
-from strands_agent.strands_agent import StrandsAgent, search_images
+from strands_agent.strands_agent import StrandsAgent
 from strands_agent import web_search
+from result_cache import SingleFlight, TieredCache
 from unittest.mock import patch, MagicMock
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 import os
 import shutil
 import tempfile
@@ -11,21 +15,151 @@ from dotenv import load_dotenv
 load_dotenv("../.env")
 
 
+def fake_runtime(answer):
+    """Return a runtime whose agents reply with answer(agent, input) and record the turn in their messages."""
+    runtime = MagicMock()
+
+    def create_agent():
+        agent = MagicMock()
+        agent.messages = []
+
+        def ask(input):
+            output = answer(agent, input)
+            agent.messages.extend([{"role": "user", "content": [{"text": input}]},
+                                   {"role": "assistant", "content": [{"text": output}]}])
+            return output
+        agent.side_effect = ask
+        return agent
+    runtime.create_agent.side_effect = create_agent
+    return runtime
+
+
 class TestStrandsAgent(unittest.TestCase):
 
-    def test_search_images_found(self):
-        """Test that search_images finds an image with a matching keyword."""
-        with patch('PIL.Image.Image.show') as mock_show:
-            result = search_images("icons")
-            print(result)
-            self.assertTrue("Found and opened image" in result)
-            self.assertTrue("AWS icons.png" in result)
-            mock_show.assert_called_once()
-
-    def test_search_images_not_found(self):
-        """Test that search_images returns appropriate message when no images are found."""
-        result = search_images("nonexistent")
-        self.assertTrue("No images found matching keyword" in result)
+    def test_sessions_share_runtime_but_not_conversation(self):
+        """Test that session agents reuse one runtime but get separate Agent instances."""
+        runtime = MagicMock()
+        runtime.create_agent.side_effect = lambda: MagicMock()
+        first = StrandsAgent(runtime=runtime)
+        second = StrandsAgent(runtime=runtime)
+        self.assertIs(first.runtime, second.runtime)
+        self.assertIsNot(first.agent, second.agent)
+        first.close()
+        runtime.close.assert_not_called()
+
+    def test_call_tool_dispatches_directly(self):
+        """Test that call_tool passes the JSON input as arguments and returns the tool's text."""
+        runtime = MagicMock()
+        strands_agent = StrandsAgent(runtime=runtime)
+        weather = strands_agent.agent.tool.weather
+        weather.return_value = {"status": "success", "content": [{"text": "21.5C"}]}
+        self.assertEqual(strands_agent.call_tool("weather", '{"lat": 48.85, "lon": 2.35}'), "21.5C")
+        weather.assert_called_once_with(lat=48.85, lon=2.35)
+
+        weather.return_value = {"status": "error", "content": [{"text": "upstream failed"}]}
+        with self.assertRaises(RuntimeError):
+            strands_agent.call_tool("weather", {"lat": 0, "lon": 0})
+
+    def test_record_tool_call_adds_the_turn(self):
+        """Test that a tool call run by another session is added to the history as a tool use and result."""
+        strands_agent = StrandsAgent(runtime=MagicMock())
+        strands_agent.record_tool_call("weather", '{"lat": 48.85, "lon": 2.35}', "21.5C")
+        messages = strands_agent.messages
+        self.assertEqual([message["role"] for message in messages], ["user", "assistant", "user", "assistant"])
+        tool_use = messages[1]["content"][0]["toolUse"]
+        tool_result = messages[2]["content"][0]["toolResult"]
+        self.assertEqual(tool_use["input"], {"lat": 48.85, "lon": 2.35})
+        self.assertEqual(tool_result["toolUseId"], tool_use["toolUseId"])
+        self.assertEqual(tool_result["content"], [{"text": "21.5C"}])
+
+    def test_agent_answers_are_cached_per_history(self):
+        """Test that the same question after different histories is not answered from the cache."""
+        def answer(agent, input):
+            topic = agent.messages[0]["content"][0]["text"] if agent.messages else "nothing"
+            return f"<response>{input} ({topic})</response>"
+        runtime = fake_runtime(answer)
+
+        with patch.object(TieredCache, "_shared", TieredCache()):
+            paris, tokyo, fresh = (StrandsAgent(runtime=runtime) for _ in range(3))
+            paris.query("Tell me about Paris")
+            tokyo.query("Tell me about Tokyo")
+            self.assertEqual(paris.query("What's the weather there?"), "What's the weather there? (Tell me about Paris)")
+            self.assertEqual(tokyo.query("What's the weather there?"), "What's the weather there? (Tell me about Tokyo)")
+            self.assertEqual(tokyo.agent.call_count, 2)
+            self.assertEqual(len(tokyo.messages), 4)
+
+            # A first-turn question is shared, and the cached answer joins the session's history
+            self.assertEqual(fresh.query("tell me about paris"), "Tell me about Paris (nothing)")
+            fresh.agent.assert_not_called()
+            self.assertEqual(len(fresh.messages), 2)
+
+    def test_concurrent_questions_share_a_run_only_with_the_same_history(self):
+        """Test that sessions coalesce on one agent run only when their histories match."""
+        release = threading.Event()
+        runtime = fake_runtime(lambda agent, input: release.wait(5) and "Sunny")
+
+        with patch.object(TieredCache, "_shared", TieredCache()), patch.object(SingleFlight, "_shared", SingleFlight()):
+            sessions = [StrandsAgent(runtime=runtime) for _ in range(3)]
+            sessions[2].messages.append({"role": "user", "content": [{"text": "Tell me about Tokyo"}]})
+            with ThreadPoolExecutor(3) as pool:
+                futures = [pool.submit(session.query, "What's the weather there?") for session in sessions]
+                time.sleep(0.1)
+                release.set()
+                self.assertEqual([future.result() for future in futures], ["Sunny"] * 3)
+
+            self.assertEqual(sessions[0].agent.call_count + sessions[1].agent.call_count, 1)
+            sessions[2].agent.assert_called_once()
+            # The session that waited for the shared run still records the turn
+            self.assertEqual([len(session.messages) for session in sessions], [2, 2, 3])
+
+    def test_history_is_available_while_the_agent_runs(self):
+        """Test that reading the history does not wait for a running agent call."""
+        started, release = threading.Event(), threading.Event()
+        runtime = fake_runtime(lambda agent, input: started.set() or release.wait(5) and "Sunny")
+        session = StrandsAgent(runtime=runtime)
+
+        with patch.object(TieredCache, "_shared", TieredCache()), ThreadPoolExecutor(1) as pool:
+            future = pool.submit(session.query, "What's the weather in Paris?")
+            self.assertTrue(started.wait(5))
+            began = time.perf_counter()
+            session._history_digest()
+            self.assertLess(time.perf_counter() - began, 0.5)
+            # Turns are committed once the run finishes
+            self.assertEqual(session.messages, [])
+            release.set()
+            self.assertEqual(future.result(), "Sunny")
+        self.assertEqual(len(session.messages), 2)
+
+    def test_fork_and_adopt_do_not_wait_for_a_running_agent(self):
+        """Test that forking and adopting during a run return at once and build no Agent on the caller's thread."""
+        started, release = threading.Event(), threading.Event()
+
+        def answer(agent, input):
+            if "Paris" in input:
+                started.set()
+                release.wait(5)
+            return "Sunny"
+        runtime = fake_runtime(answer)
+        session = StrandsAgent(runtime=runtime)
+
+        with patch.object(TieredCache, "_shared", TieredCache()), ThreadPoolExecutor(2) as pool:
+            running = pool.submit(session.query, "What's the weather in Paris?")
+            self.assertTrue(started.wait(5))
+            began = time.perf_counter()
+            forked = session.fork()
+            self.assertLess(time.perf_counter() - began, 0.5)
+            self.assertEqual(runtime.create_agent.call_count, 1)
+
+            self.assertEqual(pool.submit(forked.query, "And in Tokyo?").result(), "Sunny")
+            self.assertEqual(runtime.create_agent.call_count, 2)
+            began = time.perf_counter()
+            session.adopt(forked)
+            self.assertLess(time.perf_counter() - began, 0.5)
+            release.set()
+            running.result()
+        # The run's turns are committed ahead of the adopted ones
+        self.assertEqual([message["content"][0]["text"] for message in session.messages],
+                         ["What's the weather in Paris?", "Sunny", "And in Tokyo?", "Sunny"])
 
     def test_web_search_empty_query(self):
         """
@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+
+from web_server.stream_pool import StreamPool
+
+
+class FakeStreamManager:
+    def __init__(self, number):
+        self.number = number
+        self.is_active = True
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+        self.is_active = False
+
+
+class FakeFactory:
+    def __init__(self, delay=0):
+        self.made = []
+        self.delay = delay
+
+    async def __call__(self):
+        await asyncio.sleep(self.delay)
+        manager = FakeStreamManager(len(self.made))
+        self.made.append(manager)
+        return manager
+
+
+class TestStreamPool(unittest.TestCase):
+
+    def test_acquire_hits_prewarmed_stream_and_refills(self):
+        """Test that a ready stream is handed out and the pool refills behind it."""
+        async def run():
+            factory = FakeFactory()
+            pool = StreamPool(factory, size=2)
+            await pool.start()
+            await asyncio.sleep(0.01)
+            manager = await pool.acquire()
+            await asyncio.sleep(0.01)
+            stats = pool.stats()
+            await pool.close()
+            return manager, factory, stats
+
+        manager, factory, stats = asyncio.run(run())
+        self.assertEqual(manager.number, 0)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["ready"], 2)
+        self.assertEqual(len(factory.made), 3)
+        # Streams still in the pool are closed on shutdown, the handed-out one is not
+        self.assertEqual([m.closed for m in factory.made], [False, True, True])
+
+    def test_acquire_during_refill_is_refilled(self):
+        """Test that a stream handed out while the pool is refilling is replaced too."""
+        async def run():
+            factory = FakeFactory(delay=0.05)
+            pool = StreamPool(factory, size=2)
+            await pool.start()
+            await asyncio.sleep(0.1)
+            await pool.acquire()
+            await asyncio.sleep(0.02)
+            await pool.acquire()
+            await asyncio.sleep(0.2)
+            stats = pool.stats()
+            await pool.close()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["ready"], 2)
+
+    def test_empty_pool_creates_stream_directly(self):
+        """Test that acquiring from a disabled pool counts a miss."""
+        async def run():
+            pool = StreamPool(FakeFactory(), size=0)
+            await pool.start()
+            manager = await pool.acquire()
+            return manager, pool.stats()
+
+        manager, stats = asyncio.run(run())
+        self.assertTrue(manager.is_active)
+        self.assertEqual((stats["hits"], stats["misses"]), (0, 1))
+
+    def test_idle_and_dead_streams_are_retired(self):
+        """Test that expired streams are closed and replaced."""
+        async def run():
+            factory = FakeFactory()
+            pool = StreamPool(factory, size=1, max_idle=0.05)
+            await pool.start()
+            await asyncio.sleep(0.2)
+            stats = pool.stats()
+            await pool.close()
+            return factory, stats
+
+        factory, stats = asyncio.run(run())
+        self.assertGreaterEqual(stats["retired"], 2)
+        self.assertTrue(all(m.closed for m in factory.made))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import signal
+import sys
+import tempfile
+import time
+import unittest
+import urllib.request
+
+from web_server.supervisor import Supervisor, listen_socket
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Answers every request with its worker index and pid; exits on SIGTERM
+WORKER = """
+import asyncio, os, signal, sys
+sys.path.insert(0, %r)
+from web_server.supervisor import WORKER_INDEX, inherited_sockets, worker_admin_ports
+
+async def main():
+    listeners, admin = inherited_sockets()
+    body = ("%%s %%d %%d" %% (os.environ[WORKER_INDEX], os.getpid(), len(worker_admin_ports()))).encode()
+
+    async def answer(reader, writer):
+        await reader.readuntil(b"\\r\\n\\r\\n")
+        writer.write(b"HTTP/1.0 200 OK\\r\\nContent-Length: %%d\\r\\n\\r\\n" %% len(body) + body)
+        await writer.drain()
+        writer.close()
+
+    # Handle SIGTERM before serving, so a worker that has answered is ready to drain
+    stopping = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+    servers = [await asyncio.start_server(answer, sock=sock) for sock in listeners + [admin]]
+    await stopping.wait()
+
+asyncio.run(main())
+""" % REPO_ROOT
+
+
+@unittest.skipIf(sys.platform == "win32", "workers need fork-style socket inheritance")
+class TestSupervisor(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        script = os.path.join(self.directory.name, "worker.py")
+        with open(script, "w") as f:
+            f.write(WORKER)
+        self.sock = listen_socket("127.0.0.1", 0)
+        self.url = f"http://127.0.0.1:{self.sock.getsockname()[1]}/"
+        self.supervisor = Supervisor([sys.executable, script], 2, [self.sock], drain_timeout=5, min_uptime=0)
+
+    def tearDown(self):
+        self.supervisor.drain()
+        self.directory.cleanup()
+
+    def get(self, url=None):
+        deadline = time.monotonic() + 10
+        while True:
+            try:
+                with urllib.request.urlopen(url or self.url, timeout=2) as response:
+                    return response.read().decode().split()
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.05)
+
+    def test_workers_share_the_socket_and_restart(self):
+        """Test that workers answer on the shared and private sockets and are restarted after exiting."""
+        self.supervisor.check()
+        pids = {process.pid for process in self.supervisor.processes}
+        self.assertEqual(len(pids), 2)
+
+        index, pid, peers = self.get()
+        self.assertIn(int(pid), pids)
+        self.assertEqual(peers, "2")
+        for worker, admin in enumerate(self.supervisor.admin_sockets):
+            self.assertEqual(self.get(f"http://127.0.0.1:{admin.getsockname()[1]}/")[0], str(worker))
+
+        crashed = self.supervisor.processes[0]
+        crashed.send_signal(signal.SIGKILL)
+        crashed.wait()
+        self.supervisor.check()
+        self.supervisor.check()
+        self.assertEqual(self.supervisor.restarts, 1)
+        self.assertNotEqual(self.supervisor.processes[0].pid, crashed.pid)
+        self.assertEqual(self.supervisor.stats()["running"], 2)
+        # The replacement serves the same private port
+        admin = self.supervisor.admin_sockets[0].getsockname()[1]
+        self.assertEqual(self.get(f"http://127.0.0.1:{admin}/")[1], str(self.supervisor.processes[0].pid))
+
+    def test_drain_stops_workers(self):
+        """Test that a drain asks workers to exit and waits for them."""
+        self.supervisor.check()
+        # The shared socket could be answered by one worker while the other is still starting
+        for admin in self.supervisor.admin_sockets:
+            self.get(f"http://127.0.0.1:{admin.getsockname()[1]}/")
+        processes = list(self.supervisor.processes)
+        self.supervisor.drain()
+        self.assertEqual([process.returncode for process in processes], [0, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
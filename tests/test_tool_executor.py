@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from tool_executor import ToolExecutor, ToolTimeoutError, SpeculativeCall, SpeculationStats, SpeculationExecutor
+
+
+class TestToolExecutor(unittest.TestCase):
+
+    def test_calls_run_off_the_event_loop(self):
+        """Test that blocking calls run on worker threads concurrently."""
+        executor = ToolExecutor(max_workers=2)
+
+        async def run():
+            loop_thread = threading.get_ident()
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            tick_task = asyncio.create_task(ticker())
+            threads = await asyncio.gather(
+                executor.run(lambda: (time.sleep(0.1), threading.get_ident())[1]),
+                executor.run(lambda: (time.sleep(0.1), threading.get_ident())[1]),
+            )
+            tick_task.cancel()
+            return loop_thread, threads, ticks
+
+        loop_thread, threads, ticks = asyncio.run(run())
+        self.assertNotIn(loop_thread, threads)
+        self.assertGreater(ticks, 3)
+        stats = executor.stats()
+        self.assertEqual(stats["completed"], 2)
+        self.assertEqual(stats["in_flight"], 0)
+        executor.shutdown()
+
+    def test_timeout_raises_and_is_counted(self):
+        """Test that a slow call raises ToolTimeoutError."""
+        executor = ToolExecutor(max_workers=1)
+
+        async def run():
+            with self.assertRaises(ToolTimeoutError):
+                await executor.run(time.sleep, 0.5, timeout=0.05)
+
+        asyncio.run(run())
+        self.assertEqual(executor.stats()["timed_out"], 1)
+        executor.shutdown()
+
+    def test_queue_wait_is_measured(self):
+        """Test that calls waiting for a busy worker report queue wait."""
+        executor = ToolExecutor(max_workers=1)
+
+        async def run():
+            await asyncio.gather(executor.run(time.sleep, 0.05), executor.run(time.sleep, 0.05))
+
+        asyncio.run(run())
+        self.assertGreaterEqual(executor.stats()["queue_wait_max"], 0.04)
+        executor.shutdown()
+
+    def test_errors_propagate(self):
+        """Test that exceptions from the call reach the caller."""
+        executor = ToolExecutor(max_workers=1)
+
+        async def run():
+            with self.assertRaises(ZeroDivisionError):
+                await executor.run(lambda: 1 / 0)
+
+        asyncio.run(run())
+        self.assertEqual(executor.stats()["failed"], 1)
+        executor.shutdown()
+
+    def test_speculation_executor_is_separate(self):
+        """Test that speculative calls get a process-wide pool of their own."""
+        self.assertIs(SpeculationExecutor.shared(), SpeculationExecutor.shared())
+        self.assertIsNot(SpeculationExecutor.shared(), ToolExecutor.shared())
+        self.assertEqual(SpeculationExecutor.shared().max_workers, 2)
+
+
+class TestSpeculativeCall(unittest.TestCase):
+
+    def test_take_returns_result_and_counts_hit(self):
+        """Test that a matching request reuses the speculative result."""
+        stats = SpeculationStats()
+        executor = ToolExecutor(max_workers=1)
+
+        async def run():
+            call = SpeculativeCall("weather in Paris", executor.run(lambda: "sunny"), stats=stats)
+            await asyncio.sleep(0.05)
+            self.assertTrue(call.matches("weather in Paris"))
+            self.assertFalse(call.matches("weather in Rome"))
+            return await call.take()
+
+        self.assertEqual(asyncio.run(run()), "sunny")
+        executor.shutdown()
+        self.assertEqual(stats.hits, 1)
+        self.assertEqual(stats.wasted, 0)
+        self.assertGreater(stats.saved_seconds, 0)
+
+    def test_discard_cancels_and_counts_waste(self):
+        """Test that a discarded call is cancelled and its time counted as wasted."""
+        stats = SpeculationStats()
+
+        async def run():
+            call = SpeculativeCall("query", asyncio.sleep(10), stats=stats)
+            await asyncio.sleep(0.02)
+            call.discard()
+            with self.assertRaises(asyncio.CancelledError):
+                await call.task
+            return call
+
+        asyncio.run(run())
+        self.assertEqual(stats.started, 1)
+        self.assertEqual(stats.wasted, 1)
+        self.assertGreater(stats.wasted_seconds, 0)
+        self.assertIsNone(stats.stats()["hit_rate"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,333 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from voice_search_agent import BedrockStreamManager
+from tool_executor import ToolExecutor, SpeculationStats
+from result_cache import AsyncSingleFlight
+
+
+def event(name, body):
+    return json.dumps({"event": {name: body}}).encode("utf-8")
+
+
+class ControlledInput:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+
+    async def send(self, chunk):
+        self.sent.append(json.loads(chunk.value.bytes_)["event"])
+
+    async def close(self):
+        self.closed = True
+
+
+class ControlledStream:
+    """Bidirectional stream whose inbound events are pushed by the test."""
+
+    def __init__(self):
+        self.input_stream = ControlledInput()
+        self.inbound = asyncio.Queue()
+        self._output = SimpleNamespace(receive=self._receive)
+
+    async def await_output(self):
+        return None, self._output
+
+    async def _receive(self):
+        data = await self.inbound.get()
+        if data is None:
+            raise StopAsyncIteration
+        return SimpleNamespace(value=SimpleNamespace(bytes_=data))
+
+    def push(self, name, body):
+        self.inbound.put_nowait(event(name, body))
+
+    def push_transcript(self, text):
+        self.push("contentStart", {"type": "TEXT", "role": "USER",
+                                   "additionalModelFields": json.dumps({"generationStage": "FINAL"})})
+        self.push("textOutput", {"role": "USER", "content": text})
+        self.push("contentEnd", {"type": "TEXT", "stopReason": "END_TURN"})
+
+    def push_tool_use(self, tool_use_id, tool_name, content):
+        content_id = f"content-{tool_use_id}"
+        self.push("contentStart", {"type": "TOOL", "role": "TOOL", "contentId": content_id})
+        self.push("toolUse", {"toolName": tool_name, "toolUseId": tool_use_id, "contentId": content_id,
+                              "content": json.dumps(content)})
+        self.push("contentEnd", {"type": "TOOL", "stopReason": "TOOL_USE", "contentId": content_id})
+
+    def tool_results(self):
+        """Return {toolUseId: result} for the tool result blocks sent so far."""
+        sent = self.input_stream.sent
+        results = {}
+        for index, sent_event in enumerate(sent):
+            start = sent_event.get("contentStart", {})
+            if start.get("type") != "TOOL":
+                continue
+            # Each result block must be contentStart, toolResult, contentEnd back to back
+            result, end = sent[index + 1]["toolResult"], sent[index + 2]["contentEnd"]
+            assert result["contentName"] == end["contentName"] == start["contentName"]
+            results[start["toolResultInputConfiguration"]["toolUseId"]] = json.loads(result["content"])["result"]
+        return results
+
+
+class ControlledClient:
+    def __init__(self):
+        self.streams = []
+
+    async def invoke_model_with_bidirectional_stream(self, *args, **kwargs):
+        self.streams.append(ControlledStream())
+        return self.streams[-1]
+
+
+class FakeAgent:
+    """Stands in for StrandsAgent, recording tool calls, queries, adopted forks and tool turns."""
+
+    def __init__(self, tool_names=("weather", "web_search"), delay=0.05, failing=()):
+        self.tool_names = tool_names
+        self.delay = delay
+        self.failing = failing
+        self.calls = []
+        self.queries = []
+        self.forks = []
+        self.adopted = []
+        self.tool_turns = []
+
+    def tool_specs(self):
+        return [{"name": name, "description": "Fake tool", "inputSchema": {"json": {"type": "object"}}}
+                for name in self.tool_names]
+
+    def call_tool(self, tool_name, input):
+        time.sleep(self.delay)
+        self.calls.append((tool_name, json.loads(input)))
+        if tool_name in self.failing:
+            raise RuntimeError(f"{tool_name} is down")
+        self.tool_turns.append((tool_name, json.loads(input), f"{tool_name} result"))
+        return f"{tool_name} result"
+
+    def record_tool_call(self, tool_name, input, output):
+        self.tool_turns.append((tool_name, json.loads(input), output))
+
+    def query(self, input):
+        time.sleep(self.delay)
+        self.queries.append(input)
+        return f"answer to {input}"
+
+    def fork(self):
+        forked = FakeAgent(self.tool_names, self.delay, self.failing)
+        self.forks.append(forked)
+        return forked
+
+    def adopt(self, forked):
+        self.adopted.append(forked)
+
+    def close(self):
+        pass
+
+
+class TestBedrockStreamManager(unittest.TestCase):
+
+    def setUp(self):
+        # Process-wide coalescing and counters would leak between tests
+        patches = [patch.object(AsyncSingleFlight, "_shared", AsyncSingleFlight()),
+                   patch.object(SpeculationStats, "_shared", SpeculationStats())]
+        for patcher in patches:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.executor = ToolExecutor(max_workers=4, timeout=5)
+        self.addCleanup(self.executor.shutdown)
+        self.speculation_executor = ToolExecutor(max_workers=2, timeout=5)
+        self.addCleanup(self.speculation_executor.shutdown)
+
+    async def start(self, agent, **kwargs):
+        client = ControlledClient()
+        manager = BedrockStreamManager(bedrock_client=client, strands_agent=agent, tool_executor=self.executor,
+                                       local_audio=False, forward_output=False, **kwargs)
+        await manager.initialize_stream()
+        return manager, client.streams[-1]
+
+    @staticmethod
+    async def settle(manager, stream):
+        """Wait until every pushed event is handled and every started tool call has answered."""
+        while not stream.inbound.empty():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        await asyncio.wait_for(asyncio.gather(*manager.tool_tasks.values()), 5)
+
+    def test_overlapping_tool_uses_get_separate_result_blocks(self):
+        """Test that tool calls overlapping on one stream are each answered in their own block."""
+        agent = FakeAgent()
+
+        async def run():
+            manager, stream = await self.start(agent)
+            stream.push_tool_use("t1", "weather", {"lat": 48.85, "lon": 2.35})
+            stream.push_tool_use("t2", "web_search", {"query": "louvre opening hours"})
+            await asyncio.sleep(0.01)
+            overlapped = len(manager.tool_tasks) == 2
+            await self.settle(manager, stream)
+            await manager.close()
+            return overlapped, stream.tool_results()
+
+        overlapped, results = asyncio.run(run())
+        self.assertTrue(overlapped)
+        self.assertEqual(results, {"t1": "weather result", "t2": "web_search result"})
+        self.assertEqual(sorted(name for name, _ in agent.calls), ["weather", "web_search"])
+        self.assertEqual(agent.queries, [])
+
+    def test_identical_direct_calls_share_one_execution(self):
+        """Test that the same direct tool call from two sessions runs once."""
+        agents = [FakeAgent(), FakeAgent()]
+
+        async def run():
+            sessions = [await self.start(agent) for agent in agents]
+            for index, (manager, stream) in enumerate(sessions):
+                stream.push_tool_use(f"t{index}", "weather", {"lat": 48.85, "lon": 2.35})
+            for manager, stream in sessions:
+                await self.settle(manager, stream)
+                await manager.close()
+            return [stream.tool_results() for manager, stream in sessions]
+
+        results = asyncio.run(run())
+        self.assertEqual(results, [{"t0": "weather result"}, {"t1": "weather result"}])
+        self.assertEqual(len(agents[0].calls) + len(agents[1].calls), 1)
+        self.assertEqual(AsyncSingleFlight.shared().stats()["coalesced"], 1)
+
+    def test_shared_direct_call_is_recorded_in_every_history(self):
+        """Test that a coalesced direct call adds the tool turn to each session's own agent once."""
+        agents = [FakeAgent(), FakeAgent()]
+
+        async def run():
+            sessions = [await self.start(agent) for agent in agents]
+            for index, (manager, stream) in enumerate(sessions):
+                stream.push_tool_use(f"t{index}", "weather", {"lat": 48.85, "lon": 2.35})
+            for manager, stream in sessions:
+                await self.settle(manager, stream)
+                await manager.close()
+
+        asyncio.run(run())
+        self.assertEqual(AsyncSingleFlight.shared().stats()["coalesced"], 1)
+        turn = ("weather", {"lat": 48.85, "lon": 2.35}, "weather result")
+        self.assertEqual([agent.tool_turns for agent in agents], [[turn], [turn]])
+
+    def test_agent_tool_and_failed_direct_calls_ask_the_agent(self):
+        """Test that ask_agent, and a direct tool that fails, query the agent with the captured transcript."""
+        agent = FakeAgent(failing=("weather",))
+
+        async def run():
+            manager, stream = await self.start(agent)
+            stream.push_transcript("what is the weather in Paris")
+            stream.push_tool_use("t1", "weather", {"lat": 48.85, "lon": 2.35})
+            await self.settle(manager, stream)
+            stream.push_transcript("who painted the Mona Lisa")
+            stream.push_tool_use("t2", manager.AGENT_TOOL, {"query": "Mona Lisa painter"})
+            await self.settle(manager, stream)
+            await manager.close()
+            return stream.tool_results()
+
+        results = asyncio.run(run())
+        self.assertEqual(results, {"t1": "answer to what is the weather in Paris",
+                                   "t2": "answer to who painted the Mona Lisa"})
+        self.assertEqual(agent.queries, ["what is the weather in Paris", "who painted the Mona Lisa"])
+
+    def test_speculative_answer_is_adopted(self):
+        """Test that ask_agent for the speculated transcript uses the forked answer and merges its turns."""
+        agent = FakeAgent()
+
+        async def run():
+            manager, stream = await self.start(agent, speculative_tools=True, speculation_executor=self.speculation_executor)
+            stream.push_transcript("tell me about Paris")
+            stream.push_tool_use("t1", manager.AGENT_TOOL, {"query": "Paris"})
+            await self.settle(manager, stream)
+            await manager.close()
+            return stream.tool_results()
+
+        results = asyncio.run(run())
+        self.assertEqual(results, {"t1": "answer to tell me about Paris"})
+        self.assertEqual(agent.queries, [])
+        self.assertEqual(len(agent.forks), 1)
+        self.assertEqual(agent.forks[0].queries, ["tell me about Paris"])
+        self.assertEqual(agent.adopted, agent.forks)
+        self.assertEqual(SpeculationStats.shared().hits, 1)
+
+    def test_speculative_answer_is_discarded_when_no_tool_is_used(self):
+        """Test that a turn answered without a tool discards the speculation and adopts nothing."""
+        agent = FakeAgent()
+
+        async def run():
+            manager, stream = await self.start(agent, speculative_tools=True, speculation_executor=self.speculation_executor)
+            stream.push_transcript("hello there")
+            stream.push("contentStart", {"type": "TEXT", "role": "ASSISTANT"})
+            stream.push("contentEnd", {"type": "TEXT", "stopReason": "END_TURN"})
+            await self.settle(manager, stream)
+            speculation = manager.speculation
+            await manager.close()
+            return speculation, stream.tool_results()
+
+        speculation, results = asyncio.run(run())
+        self.assertIsNone(speculation)
+        self.assertEqual(results, {})
+        self.assertEqual(agent.adopted, [])
+        self.assertEqual(SpeculationStats.shared().wasted, 1)
+
+    def test_direct_tool_discards_a_queued_speculation(self):
+        """Test that a turn served by a direct tool never runs its speculative agent query."""
+        agent = FakeAgent()
+        speculation_executor = ToolExecutor(max_workers=1, timeout=5)
+        self.addCleanup(speculation_executor.shutdown)
+        release = threading.Event()
+
+        async def run():
+            # Keep the only speculation worker busy so the speculative query waits in the queue
+            blocker = asyncio.ensure_future(speculation_executor.run(release.wait, 5))
+            manager, stream = await self.start(agent, speculative_tools=True,
+                                               speculation_executor=speculation_executor)
+            stream.push_transcript("what is the weather in Paris")
+            stream.push_tool_use("t1", "weather", {"lat": 48.85, "lon": 2.35})
+            await self.settle(manager, stream)
+            release.set()
+            await blocker
+            await asyncio.sleep(0.1)
+            await manager.close()
+            return stream.tool_results()
+
+        results = asyncio.run(run())
+        self.assertEqual(results, {"t1": "weather result"})
+        self.assertEqual(len(agent.forks), 1)
+        self.assertEqual(agent.forks[0].queries, [])
+        self.assertEqual(agent.adopted, [])
+        self.assertEqual(SpeculationStats.shared().wasted, 1)
+        # Speculation never took a worker from the tool calls
+        self.assertEqual(self.executor.stats()["submitted"], 1)
+
+    def test_barge_in_swaps_the_audio_queue_and_notifies_listeners(self):
+        """Test that an interruption discards queued audio and calls barge-in listeners at once."""
+        async def run():
+            client = ControlledClient()
+            manager = BedrockStreamManager(bedrock_client=client, strands_agent=FakeAgent(),
+                                           tool_executor=self.executor, forward_output=False)
+            await manager.initialize_stream()
+            stream = client.streams[-1]
+            detected = []
+            manager.add_barge_in_listener(detected.append)
+            stale = manager.audio_output_queue
+            stale.put_nowait(b"\x00\x00" * 240)
+            stream.push("textOutput", {"role": "ASSISTANT", "content": '{ "interrupted" : true }'})
+            await self.settle(manager, stream)
+            await manager.close()
+            return manager, stale, detected
+
+        manager, stale, detected = asyncio.run(run())
+        self.assertIsNot(manager.audio_output_queue, stale)
+        self.assertTrue(manager.audio_output_queue.empty())
+        self.assertEqual(len(detected), 1)
+        self.assertEqual(manager.barge_in_count, 1)
+        # The marker wakes a player blocked on the discarded queue
+        self.assertEqual(list(stale._queue)[-1], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,2 @@
+from .tool_executor import *
+from .speculation import *
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+from .tool_executor import ToolExecutor
+
+
+class SpeculationStats:
+    """Process-wide counters for speculative tool calls."""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self):
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.wasted_seconds = 0.0
+        self.saved_seconds = 0.0
+
+    @classmethod
+    def shared(cls):
+        """Return the process-wide counters."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def stats(self) -> dict:
+        """Return hit/miss counts and the time saved or wasted, in seconds."""
+        requested = self.hits + self.misses
+        return {
+            "started": self.started,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requested if requested else None,
+            "wasted": self.wasted,
+            "wasted_seconds": self.wasted_seconds,
+            "saved_seconds": self.saved_seconds,
+        }
+
+
+class SpeculativeCall:
+    """A tool call started before the model asked for it, keyed by its input.
+
+    ``take`` hands out the result when the real request arrives with the same key;
+    ``discard`` cancels it otherwise. A call that is already running on a worker
+    thread cannot be interrupted, so its result is simply dropped, and the time it
+    ran is counted as wasted.
+    """
+
+    def __init__(self, key, awaitable, context=None, stats: SpeculationStats = None):
+        """Start the speculative call.
+
+        Args:
+            key: Input the call was started for
+            awaitable: Coroutine or future producing the result
+            context: Caller data kept with the call (e.g. the conversation it ran in)
+            stats: Counters to update; defaults to the process-wide counters
+        """
+        self.key = key
+        self.context = context
+        self.stats = stats or SpeculationStats.shared()
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        self.task = asyncio.ensure_future(awaitable)
+        self.task.add_done_callback(self._finished)
+        self.stats.started += 1
+
+    def _finished(self, task):
+        self.finished_at = time.perf_counter()
+
+    def matches(self, key) -> bool:
+        """Whether this call answers a request for key."""
+        return key == self.key
+
+    async def take(self):
+        """Return the speculative result; raises whatever the call raised."""
+        requested_at = time.perf_counter()
+        result = await self.task
+        self.stats.hits += 1
+        self.stats.saved_seconds += min(self.finished_at or requested_at, requested_at) - self.started_at
+        return result
+
+    def discard(self):
+        """Cancel the call because the model did not ask for it."""
+        self.task.cancel()
+        self.stats.wasted += 1
+        self.stats.wasted_seconds += (self.finished_at or time.perf_counter()) - self.started_at
+
+
+class SpeculationExecutor(ToolExecutor):
+    """ToolExecutor for speculative calls, apart from the workers real tool calls use.
+
+    A speculative call that is already running cannot be interrupted when it is
+    discarded, so it must not hold a worker that a requested tool call is waiting for.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, max_workers: int = 2, timeout: float = 30):
+        """Return the process-wide speculation executor, creating it on first use."""
+        return super().shared(max_workers=max_workers, timeout=timeout)
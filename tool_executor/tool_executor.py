@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ToolTimeoutError(Exception):
+    """Raised when a tool call does not finish within its timeout."""
+
+
+class ToolExecutor:
+    """Runs blocking tool calls on a bounded thread pool, off the event loop.
+
+    Calls wait in the pool's queue when every worker is busy. Each call gets a
+    timeout; a call that times out while still queued never runs, one that is
+    already running is abandoned (Python threads cannot be interrupted) and its
+    result discarded. Queue wait and run time are tracked per call.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = 8, timeout: float = 30):
+        """Initialize the executor.
+
+        Args:
+            max_workers: Maximum number of tool calls running at once
+            timeout: Default timeout in seconds for a call, including queue wait
+        """
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self._lock = threading.Lock()
+
+        # Counters
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.in_flight = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.run_time_total = 0.0
+        self.run_time_max = 0.0
+        self.started = 0
+
+    @classmethod
+    def shared(cls, max_workers: int = 8, timeout: float = 30):
+        """Return the process-wide executor, creating it on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(max_workers=max_workers, timeout=timeout)
+            return cls._shared
+
+    async def run(self, func, *args, timeout: float = None, **kwargs):
+        """Run func(*args, **kwargs) on a worker thread and return its result.
+
+        Raises:
+            ToolTimeoutError: If the call did not finish within the timeout
+        """
+        submitted = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+
+        def call():
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._record(started - submitted, time.perf_counter() - started)
+
+        future = asyncio.get_running_loop().run_in_executor(self._executor, call)
+        try:
+            result = await asyncio.wait_for(future, timeout if timeout is not None else self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise ToolTimeoutError(f"Tool call timed out after {timeout or self.timeout} seconds")
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        with self._lock:
+            self.completed += 1
+        return result
+
+    def _record(self, queue_wait, run_time):
+        with self._lock:
+            self.started += 1
+            self.queue_wait_total += queue_wait
+            self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+            self.run_time_total += run_time
+            self.run_time_max = max(self.run_time_max, run_time)
+
+    def shutdown(self):
+        """Stop accepting calls without waiting for running ones."""
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> dict:
+        """Return call counts and queue-wait/run-time statistics in seconds."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "timed_out": self.timed_out,
+                "in_flight": self.in_flight,
+                "queue_wait_avg": self.queue_wait_total / self.started if self.started else None,
+                "queue_wait_max": self.queue_wait_max,
+                "run_time_avg": self.run_time_total / self.started if self.started else None,
+                "run_time_max": self.run_time_max,
+            }
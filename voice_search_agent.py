@@ -1,15 +1,13 @@
 import os
 import asyncio
-import base64
 import json
 import uuid
 import warnings
 import sounddevice
 import pyaudio
 import pytz
-import datetime
 import time
-import inspect
+import logging
 from aws_sdk_bedrock_runtime.client import BedrockRuntimeClient, InvokeModelWithBidirectionalStreamOperationInput
 from aws_sdk_bedrock_runtime.models import InvokeModelWithBidirectionalStreamInputChunk, BidirectionalInputPayloadPart
 from aws_sdk_bedrock_runtime.config import Config, HTTPAuthSchemeResolver, SigV4AuthScheme
@@ -21,7 +19,16 @@ from strands.models import BedrockModel
 import boto3 
 import requests
 import re
-from strands_agent import StrandsAgent
+from strands_agent import StrandsAgent, StrandsRuntime
+from audio_pipeline import AudioRingBuffer, VoiceActivityGate, AudioCoalescer, PlaybackEngine
+from bedrock_events import EventEncoder, EventDecoder
+from tool_executor import ToolExecutor, ToolTimeoutError, SpeculativeCall, SpeculationStats, SpeculationExecutor
+from result_cache import TieredCache, AsyncSingleFlight, cache_key
+from metrics import TurnTracer, QUEUE_HIGH_WATER, QUEUE_DROPPED
+from bounded_queue import BoundedQueue, QueueOverflow
+from http_client import HttpClient
+from diagnostics import SessionLogger, configure, get_logger, parse_levels
+from session_replay import RecordingClient
 from dotenv import load_dotenv
 
 load_dotenv(".env")
@@ -35,147 +42,56 @@ OUTPUT_SAMPLE_RATE = 24000
 CHANNELS = 1
 FORMAT = pyaudio.paInt16
 CHUNK_SIZE = 1024  # Number of frames per buffer
-
-# Debug mode flag
-DEBUG = False
-
-def debug_print(message):
-    """Print only if debug mode is enabled"""
-    if DEBUG:
-        functionName = inspect.stack()[1].function
-        if functionName == 'time_it' or functionName == 'time_it_async':
-            functionName = inspect.stack()[2].function
-        print('{:%Y-%m-%d %H:%M:%S.%f}'.format(datetime.datetime.now())[:-3] + ' ' + functionName + ' ' + message)
-
-def time_it(label, methodToRun):
-    """Time the execution of a synchronous method"""
+INPUT_BUFFER_SECONDS = 2  # Capacity of the microphone ring buffer
+STREAM_READY_TIMEOUT = 5  # Seconds to wait for Bedrock to answer the stream
+TOOL_WORKERS = 8  # Tool calls running at once across all sessions
+TOOL_TIMEOUT = 30  # Seconds before a tool call is abandoned
+SPECULATION_WORKERS = 2  # Speculative agent runs at once, on workers of their own
+OUTPUT_PREBUFFER_MS = 100  # Audio queued before playback starts
+# Per-session queue limits, so a slow consumer cannot grow a session's memory without bound
+AUDIO_INPUT_QUEUE_SIZE = 500  # Microphone chunks waiting to be sent to Bedrock
+AUDIO_OUTPUT_QUEUE_SIZE = 500  # Decoded audio chunks waiting for local playback
+OUTPUT_QUEUE_SIZE = 256  # Events waiting for the output consumer, e.g. a WebSocket client
+
+logger = get_logger("stream")
+audio_logger = get_logger("audio")
+
+def time_it(label, methodToRun, timings=None):
+    """Time the execution of a synchronous method, recording it in timings if given"""
     start_time = time.perf_counter()
     result = methodToRun()
     end_time = time.perf_counter()
-    debug_print(f"Execution time for {label}: {end_time - start_time:.4f} seconds")
+    if timings is not None:
+        timings[label] = end_time - start_time
+    logger.debug("Execution time for %s: %.4f seconds", label, end_time - start_time)
     return result
 
-async def time_it_async(label, methodToRun):
-    """Time the execution of an asynchronous method"""
+async def time_it_async(label, methodToRun, timings=None):
+    """Time the execution of an asynchronous method, recording it in timings if given"""
     start_time = time.perf_counter()
     result = await methodToRun()
     end_time = time.perf_counter()
-    debug_print(f"Execution time for {label}: {end_time - start_time:.4f} seconds")
+    if timings is not None:
+        timings[label] = end_time - start_time
+    logger.debug("Execution time for %s: %.4f seconds", label, end_time - start_time)
     return result
 
+def create_bedrock_client(region):
+    """Create a Bedrock runtime client; one client can serve many streams."""
+    config = Config(
+        endpoint_uri=f"https://bedrock-runtime.{region}.amazonaws.com",
+        region=region,
+        aws_credentials_identity_resolver=EnvironmentCredentialsResolver(),
+        http_auth_scheme_resolver=HTTPAuthSchemeResolver(),
+        http_auth_schemes={"aws.auth#sigv4": SigV4AuthScheme()}
+    )
+    return BedrockRuntimeClient(config=config)
+
 class BedrockStreamManager:
     """Manages bidirectional streaming with AWS Bedrock using asyncio"""
-    
-    # Event templates
-    START_SESSION_EVENT = '''{
-        "event": {
-            "sessionStart": {
-            "inferenceConfiguration": {
-                "maxTokens": 1024,
-                "topP": 0.9,
-                "temperature": 0.7
-                }
-            }
-        }
-    }'''
-
-    CONTENT_START_EVENT = '''{
-        "event": {
-            "contentStart": {
-            "promptName": "%s",
-            "contentName": "%s",
-            "type": "AUDIO",
-            "interactive": true,
-            "role": "USER",
-            "audioInputConfiguration": {
-                "mediaType": "audio/lpcm",
-                "sampleRateHertz": 16000,
-                "sampleSizeBits": 16,
-                "channelCount": 1,
-                "audioType": "SPEECH",
-                "encoding": "base64"
-                }
-            }
-        }
-    }'''
-
-    AUDIO_EVENT_TEMPLATE = '''{
-        "event": {
-            "audioInput": {
-            "promptName": "%s",
-            "contentName": "%s",
-            "content": "%s"
-            }
-        }
-    }'''
-
-    TEXT_CONTENT_START_EVENT = '''{
-        "event": {
-            "contentStart": {
-            "promptName": "%s",
-            "contentName": "%s",
-            "type": "TEXT",
-            "role": "%s",
-            "interactive": true,
-                "textInputConfiguration": {
-                    "mediaType": "text/plain"
-                }
-            }
-        }
-    }'''
-
-    TEXT_INPUT_EVENT = '''{
-        "event": {
-            "textInput": {
-            "promptName": "%s",
-            "contentName": "%s",
-            "content": "%s"
-            }
-        }
-    }'''
-
-    CONTENT_END_EVENT = '''{
-        "event": {
-            "contentEnd": {
-            "promptName": "%s",
-            "contentName": "%s"
-            }
-        }
-    }'''
-
-    TOOL_CONTENT_START_EVENT = '''{
-        "event": {
-            "contentStart": {
-                "promptName": "%s",
-                "contentName": "%s",
-                "interactive": false,
-                "type": "TOOL",
-                "role": "TOOL",
-                "toolResultInputConfiguration": {
-                    "toolUseId": "%s",
-                    "type": "TEXT",
-                    "textInputConfiguration": {
-                        "mediaType": "text/plain"
-                    }
-                }
-            }
-        }
-    }'''
-
-    PROMPT_END_EVENT = '''{
-        "event": {
-            "promptEnd": {
-            "promptName": "%s"
-            }
-        }
-    }'''
 
-    SESSION_END_EVENT = '''{
-        "event": {
-            "sessionEnd": {}
-        }
-    }'''
-    
+    # Tool that hands the whole question to the Strands agent when no single tool answers it
+    AGENT_TOOL = "ask_agent"
     TOOL_SCHEMA = '''{
         "type": "object",
             "properties": {
@@ -187,21 +103,49 @@ class BedrockStreamManager:
             "required": ["query"]
         }'''
     
-    def __init__(self, model_id='amazon.nova-sonic-v1:0', region='us-east-1'):
-        """Initialize the stream manager."""
+    def __init__(self, model_id='amazon.nova-sonic-v1:0', region='us-east-1', vad_gate=None, audio_coalescer=None,
+                 local_audio=True, bedrock_client=None, strands_agent=None, tool_executor=None,
+                 speculative_tools=False, forward_output=True, output_queue_size=OUTPUT_QUEUE_SIZE,
+                 output_queue_policy="drop_oldest", speculation_executor=None):
+        """Initialize the stream manager.
+
+        Args:
+            model_id: Bedrock model to stream with
+            region: AWS region of the Bedrock endpoint
+            vad_gate: Optional VoiceActivityGate applied to audio before it is queued
+            audio_coalescer: AudioCoalescer that batches queued audio into audioInput events
+            local_audio: Decode audio output to PCM on audio_output_queue for local playback
+            bedrock_client: Optional shared BedrockRuntimeClient; one is created if omitted
+            strands_agent: Optional StrandsAgent; one is created on the shared runtime if omitted
+            tool_executor: ToolExecutor for tool calls; defaults to the process-wide executor
+            speculative_tools: Start the agent on each final user transcript before the model asks for a tool
+            forward_output: Queue events not handled here on output_queue; disable if nothing reads it
+            output_queue_size: Events output_queue holds before output_queue_policy applies
+            output_queue_policy: drop_oldest (audio first), block or disconnect; see BoundedQueue
+            speculation_executor: ToolExecutor for speculative agent runs; defaults to the process-wide SpeculationExecutor
+        """
         self.model_id = model_id
         self.region = region
+        self.vad_gate = vad_gate
+        self.audio_coalescer = audio_coalescer or AudioCoalescer(sample_rate=INPUT_SAMPLE_RATE)
         
-        # Replace RxPy subjects with asyncio queues
-        self.audio_input_queue = asyncio.Queue()
-        self.audio_output_queue = asyncio.Queue()
-        self.output_queue = asyncio.Queue()
+        # Bounded per-session queues; when full, microphone and playback audio drop their oldest chunks
+        self.audio_input_queue = BoundedQueue(AUDIO_INPUT_QUEUE_SIZE)
+        self.audio_output_queue = self._new_audio_output_queue()
+        self.forward_output = forward_output
+        self.output_queue = BoundedQueue(output_queue_size, output_queue_policy, droppable=_is_audio_event)
         
         self.response_task = None
+        self.audio_input_task = None
+        self.stream_ready = asyncio.Event()
         self.stream_response = None
         self.is_active = False
-        self.barge_in = False
-        self.bedrock_client = None
+        self.bedrock_client = bedrock_client
+
+        # Barge-in listeners are called synchronously as soon as an interruption is detected
+        self.barge_in_listeners = []
+        self.barge_in_count = 0
+        self.last_barge_in_time = None
         
         # Audio playback components
         self.audio_player = None
@@ -209,245 +153,339 @@ class BedrockStreamManager:
         # Text response components
         self.display_assistant_text = False
         self.role = None
+        self.generation_stage = None
 
         # Session information
         self.prompt_name = str(uuid.uuid4())
         self.content_name = str(uuid.uuid4())
         self.audio_content_name = str(uuid.uuid4())
         self.user_query = ""
+
+        # Measured latencies (seconds) of this session's setup steps
+        self.timings = {}
+        # Records carry this session's id; its level can be raised for this session alone
+        self.log = SessionLogger(logger, self.prompt_name)
+
+        # Per-turn timeline feeding the process-wide latency histograms
+        self.tracer = TurnTracer(self.prompt_name)
+
+        # Outbound events are built from byte templates precompiled for this session
+        self.encoder = EventEncoder(self.prompt_name, self.audio_content_name, INPUT_SAMPLE_RATE)
+
+        # Inbound events are dispatched by type; audio is only decoded if played locally
+        self.local_audio = local_audio
+        self.decoder = EventDecoder()
+        self.decoder.register('contentStart', self._on_content_start)
+        self.decoder.register('textOutput', self._on_text_output)
+        self.decoder.register('audioOutput', self._on_audio_output)
+        self.decoder.register('toolUse', self._on_tool_use)
+        self.decoder.register('contentEnd', self._on_content_end)
+        self.decoder.register('completionEnd', self._on_completion_end)
         
-        # Initialize Strands Agent for web search
-        self.strands_agent = StrandsAgent()
+        # Per-session Strands Agent on the process-wide runtime
+        self.strands_agent = strands_agent or time_it("strands_agent", StrandsAgent, self.timings)
+
+        # Tool calls run on a worker pool; state is kept per toolUseId so calls can overlap
+        self.tool_executor = tool_executor or ToolExecutor.shared(max_workers=TOOL_WORKERS, timeout=TOOL_TIMEOUT)
+        self.pending_tools = {}
+        self.tool_tasks = {}
+        self._tool_result_lock = asyncio.Lock()
+        # Tools called directly on toolUse; filled in by tool_configuration()
+        self.direct_tools = set()
+
+        # Agent answer started from the last final user transcript, if speculating
+        self.speculative_tools = speculative_tools
+        self.speculation = None
+        self.speculation_executor = speculation_executor
+        if speculative_tools and speculation_executor is None:
+            self.speculation_executor = SpeculationExecutor.shared(max_workers=SPECULATION_WORKERS, timeout=TOOL_TIMEOUT)
 
     def _initialize_client(self):
         """Initialize the Bedrock client."""
-        config = Config(
-            endpoint_uri=f"https://bedrock-runtime.{self.region}.amazonaws.com",
-            region=self.region,
-            aws_credentials_identity_resolver=EnvironmentCredentialsResolver(),
-            http_auth_scheme_resolver=HTTPAuthSchemeResolver(),
-            http_auth_schemes={"aws.auth#sigv4": SigV4AuthScheme()}
-        )
-        self.bedrock_client = BedrockRuntimeClient(config=config)
+        self.bedrock_client = create_bedrock_client(self.region)
     
     async def initialize_stream(self):
         """Initialize the bidirectional stream with Bedrock."""
+        started = time.perf_counter()
         if not self.bedrock_client:
             self._initialize_client()
         
         try:
             self.stream_response = await time_it_async("invoke_model_with_bidirectional_stream", lambda : self.bedrock_client.invoke_model_with_bidirectional_stream(
-                InvokeModelWithBidirectionalStreamOperationInput(model_id=self.model_id)))
+                InvokeModelWithBidirectionalStreamOperationInput(model_id=self.model_id)), self.timings)
             self.is_active = True
-            default_system_prompt = "You are a helpful assistant that can do web searches. You can also search and open local images as new capabilities. Never say I can't search or open images or teach me how to search images."
-            
-            # Send initialization events
-            prompt_event = self.start_prompt()
-            text_content_start = self.TEXT_CONTENT_START_EVENT % (self.prompt_name, self.content_name, "SYSTEM")
-            text_content = self.TEXT_INPUT_EVENT % (self.prompt_name, self.content_name, default_system_prompt)
-            text_content_end = self.CONTENT_END_EVENT % (self.prompt_name, self.content_name)
-            
-            init_events = [self.START_SESSION_EVENT, prompt_event, text_content_start, text_content, text_content_end]
-            
-            for event in init_events:
-                await self.send_raw_event(event)
-                # Small delay between init events
-                await asyncio.sleep(0.1)
-            
-            # Start listening for responses
+
+            # Start listening for responses and processing audio before the prompt is
+            # sent, so nothing the service returns early is missed
             self.response_task = asyncio.create_task(self._process_responses())
-            
-            # Start processing audio input
-            asyncio.create_task(self._process_audio_input())
-            
-            # Wait a bit to ensure everything is set up
-            await asyncio.sleep(0.1)
-            
-            debug_print("Stream initialized successfully")
+            self.audio_input_task = asyncio.create_task(self._process_audio_input())
+
+            # Each send returns once the stream has accepted the event, so the
+            # initialization events are pipelined back to back
+            await time_it_async("send_init_events", self._send_init_events, self.timings)
+            await time_it_async("stream_ready", self._wait_stream_ready, self.timings)
+
+            self.timings["initialize_stream"] = time.perf_counter() - started
+            self.log.debug("Stream initialized successfully in %.4f seconds", self.timings['initialize_stream'])
             return self
         except Exception as e:
             self.is_active = False
             print(f"Failed to initialize stream: {str(e)}")
             raise
+
+    async def _send_init_events(self):
+        """Send the session, prompt and system prompt events."""
+        default_system_prompt = "You are a helpful assistant that can do web searches. You can also search and open local images as new capabilities. Never say I can't search or open images or teach me how to search images."
+        init_events = [
+            ("sessionStart", self.encoder.session_start()),
+            ("promptStart", self.start_prompt()),
+            ("contentStart", self.encoder.text_content_start(self.content_name, "SYSTEM")),
+            ("textInput", self.encoder.text_input(self.content_name, default_system_prompt)),
+            ("contentEnd", self.encoder.content_end(self.content_name)),
+        ]
+        for event_type, event in init_events:
+            await self.send_raw_event(event, event_type)
+
+    async def _wait_stream_ready(self):
+        """Wait until Bedrock has answered the stream, or fail if it closed instead."""
+        ready_task = asyncio.ensure_future(self.stream_ready.wait())
+        try:
+            done, _ = await asyncio.wait(
+                (ready_task, self.response_task),
+                timeout=STREAM_READY_TIMEOUT,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            ready_task.cancel()
+        if self.stream_ready.is_set():
+            return
+        if self.response_task in done:
+            raise RuntimeError("Bedrock stream closed during initialization")
+        self.log.debug("No response from Bedrock within %s seconds, continuing", STREAM_READY_TIMEOUT)
     
     def start_prompt(self):
         """Create a promptStart event"""
         prompt_start_event = {
-            "event": {
-                "promptStart": {
-                    "promptName": self.prompt_name,
-                    "textOutputConfiguration": {
-                        "mediaType": "text/plain"
-                    },
-                    "audioOutputConfiguration": {
-                        "mediaType": "audio/lpcm",
-                        "sampleRateHertz": 24000,
-                        "sampleSizeBits": 16,
-                        "channelCount": 1,
-                        "voiceId": "matthew",
-                        "encoding": "base64",
-                        "audioType": "SPEECH"
-                    },
-                    "toolUseOutputConfiguration": {
-                        "mediaType": "application/json"
-                    },
-                    "toolConfiguration": {
-                        "tools": [
-                            {
-                                "toolSpec": {
-                                    "name": "openimages",
-                                    "description": "open local images",
-                                    "inputSchema": {
-                                        "json": self.TOOL_SCHEMA
-                                    }
-                                }
-                            }
-                        ]
+            "textOutputConfiguration": {
+                "mediaType": "text/plain"
+            },
+            "audioOutputConfiguration": {
+                "mediaType": "audio/lpcm",
+                "sampleRateHertz": 24000,
+                "sampleSizeBits": 16,
+                "channelCount": 1,
+                "voiceId": "matthew",
+                "encoding": "base64",
+                "audioType": "SPEECH"
+            },
+            "toolUseOutputConfiguration": {
+                "mediaType": "application/json"
+            },
+            "toolConfiguration": self.tool_configuration()
+        }
+        return self.encoder.prompt_start(prompt_start_event)
+
+    def tool_configuration(self):
+        """Expose the Strands tools to Nova Sonic, plus the agent as a fallback tool."""
+        tools = []
+        for spec in self.strands_agent.tool_specs():
+            tools.append({
+                "toolSpec": {
+                    "name": spec["name"],
+                    "description": spec["description"],
+                    # Nova Sonic takes the schema as a JSON string
+                    "inputSchema": {
+                        "json": json.dumps(spec["inputSchema"]["json"])
                     }
                 }
+            })
+        self.direct_tools = {tool["toolSpec"]["name"] for tool in tools}
+        tools.append({
+            "toolSpec": {
+                "name": self.AGENT_TOOL,
+                "description": "Answer a question that needs several steps or a capability none of the other tools has",
+                "inputSchema": {
+                    "json": self.TOOL_SCHEMA
+                }
             }
-        }
-        return json.dumps(prompt_start_event)
+        })
+        return {"tools": tools}
     
-    async def send_raw_event(self, event_json):
-        """Send a raw event JSON to the Bedrock stream."""
+    def add_barge_in_listener(self, listener):
+        """Register a callable invoked with the perf_counter() time of each barge-in."""
+        self.barge_in_listeners.append(listener)
+
+    @staticmethod
+    def _new_audio_output_queue():
+        # None marks the end of an audio block and is never dropped
+        return BoundedQueue(AUDIO_OUTPUT_QUEUE_SIZE, droppable=lambda item: item is not None)
+
+    def queues(self) -> dict:
+        """Return this session's queues by name."""
+        return {"audio_input": self.audio_input_queue, "audio_output": self.audio_output_queue,
+                "output": self.output_queue}
+
+    def _handle_barge_in(self):
+        """Discard queued output audio and notify listeners of a barge-in."""
+        detected = time.perf_counter()
+        self.barge_in_count += 1
+        self.last_barge_in_time = detected
+        self.tracer.barge_in()
+
+        # Swap in a fresh queue instead of draining the old one item by item. The
+        # marker wakes a consumer blocked on the old queue so it picks up the new one.
+        stale_queue = self.audio_output_queue
+        self.audio_output_queue = self._new_audio_output_queue()
+        self.audio_output_queue.high_water = stale_queue.high_water
+        self.audio_output_queue.dropped = stale_queue.dropped
+        stale_queue.put_nowait(None)
+
+        for listener in self.barge_in_listeners:
+            try:
+                listener(detected)
+            except Exception as e:
+                self.log.warning("Barge-in listener failed: %s", e)
+
+    async def send_raw_event(self, event_json, event_type=None):
+        """Send a raw event to the Bedrock stream.
+
+        Args:
+            event_json: Event as UTF-8 JSON bytes (or a str, which is encoded)
+            event_type: Event name used for logging instead of re-parsing the event
+        """
         if not self.stream_response or not self.is_active:
-            debug_print("Stream not initialized or closed")
+            self.log.debug("Stream not initialized or closed")
             return
-       
+
+        if isinstance(event_json, str):
+            event_json = event_json.encode('utf-8')
         event = InvokeModelWithBidirectionalStreamInputChunk(
-            value=BidirectionalInputPayloadPart(bytes_=event_json.encode('utf-8'))
+            value=BidirectionalInputPayloadPart(bytes_=event_json)
         )
         
         try:
             await self.stream_response.input_stream.send(event)
-            # For debugging large events, you might want to log just the type
-            if DEBUG:
-                if len(event_json) > 200:
-                    event_type = json.loads(event_json).get("event", {}).keys()
-                    debug_print(f"Sent event type: {list(event_type)}")
-                else:
-                    debug_print(f"Sent event: {event_json}")
+            self.tracer.event_sent(event_type or 'unknown', len(event_json))
+            if self.log.isEnabledFor(logging.DEBUG):
+                self.log.debug("Sent event type: %s", event_type or 'unknown',
+                               extra={"event_type": event_type, "bytes": len(event_json)})
         except Exception as e:
-            debug_print(f"Error sending event: {str(e)}")
-            if DEBUG:
-                import traceback
-                traceback.print_exc()
+            self.log.debug("Error sending event: %s", e, exc_info=True)
     
     async def send_audio_content_start_event(self):
         """Send a content start event to the Bedrock stream."""
-        content_start_event = self.CONTENT_START_EVENT % (self.prompt_name, self.audio_content_name)
-        await self.send_raw_event(content_start_event)
+        await self.send_raw_event(self.encoder.audio_content_start(), "contentStart")
     
-    async def send_tool_start_event(self, content_name):
+    async def send_tool_start_event(self, content_name, tool_use_id):
         """Send a tool content start event to the Bedrock stream."""
-        content_start_event = self.TOOL_CONTENT_START_EVENT % (self.prompt_name, content_name, self.toolUseId)
-        debug_print(f"Sending tool start event: {content_start_event}")  
-        await self.send_raw_event(content_start_event)
+        content_start_event = self.encoder.tool_content_start(content_name, tool_use_id)
+        self.log.debug("Sending tool start event: %s", content_start_event)
+        await self.send_raw_event(content_start_event, "contentStart")
 
     async def send_tool_result_event(self, content_name, tool_result):
         """Send a tool content event to the Bedrock stream."""
         # Use the actual tool result from processToolUse
         tool_result_event = self.tool_result_event(content_name=content_name, content=tool_result, role="TOOL")
-        debug_print(f"Sending tool result event: {tool_result_event}")
-        await self.send_raw_event(tool_result_event)
+        self.log.debug("Sending tool result event: %s", tool_result_event)
+        await self.send_raw_event(tool_result_event, "toolResult")
     
     async def send_tool_content_end_event(self, content_name):
         """Send a tool content end event to the Bedrock stream."""
-        tool_content_end_event = self.CONTENT_END_EVENT % (self.prompt_name, content_name)
-        debug_print(f"Sending tool content event: {tool_content_end_event}")
-        await self.send_raw_event(tool_content_end_event)
+        tool_content_end_event = self.encoder.content_end(content_name)
+        self.log.debug("Sending tool content event: %s", tool_content_end_event)
+        await self.send_raw_event(tool_content_end_event, "contentEnd")
     
         
     async def send_prompt_end_event(self):
         """Close the stream and clean up resources."""
         if not self.is_active:
-            debug_print("Stream is not active")
+            self.log.debug("Stream is not active")
             return
         
-        prompt_end_event = self.PROMPT_END_EVENT % (self.prompt_name)
-        await self.send_raw_event(prompt_end_event)
-        debug_print("Prompt ended")
+        await self.send_raw_event(self.encoder.prompt_end(), "promptEnd")
+        self.log.debug("Prompt ended")
         
     async def send_session_end_event(self):
         """Send a session end event to the Bedrock stream."""
         if not self.is_active:
-            debug_print("Stream is not active")
+            self.log.debug("Stream is not active")
             return
 
-        await self.send_raw_event(self.SESSION_END_EVENT)
+        await self.send_raw_event(self.encoder.session_end(), "sessionEnd")
         self.is_active = False
-        debug_print("Session ended")
+        self.log.debug("Session ended")
 
     async def _process_audio_input(self):
         """Process audio input from the queue and send to Bedrock."""
         while self.is_active:
             try:
-                # Get audio data from the queue
-                data = await self.audio_input_queue.get()
-                
-                audio_bytes = data.get('audio_bytes')
+                # Get the next batch of queued audio
+                audio_bytes = await self.audio_coalescer.next_batch(self.audio_input_queue)
                 if not audio_bytes:
-                    debug_print("No audio bytes received")
+                    self.log.debug("No audio bytes received")
                     continue
                 
-                # Base64 encode the audio data
-                blob = base64.b64encode(audio_bytes)
-                audio_event = self.AUDIO_EVENT_TEMPLATE % (
-                    self.prompt_name, 
-                    self.audio_content_name, 
-                    blob.decode('utf-8')
-                )
-                
-                # Send the event
-                await self.send_raw_event(audio_event)
+                # Base64 encode the audio data and send the event
+                await self.send_raw_event(self.encoder.audio_input(audio_bytes), "audioInput")
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                debug_print(f"Error processing audio: {e}")
-                if DEBUG:
-                    import traceback
-                    traceback.print_exc()
+                self.log.debug("Error processing audio: %s", e, exc_info=True)
     
     def add_audio_chunk(self, audio_bytes):
         """Add an audio chunk to the queue."""
-        self.audio_input_queue.put_nowait({
-            'audio_bytes': audio_bytes,
-            'prompt_name': self.prompt_name,
-            'content_name': self.audio_content_name
-        })
+        self.tracer.mic_audio(len(audio_bytes))
+        if self.vad_gate is None:
+            self.audio_input_queue.put_nowait(audio_bytes)
+            return
+        # Silence is dropped or replaced by keep-alive frames before encoding
+        for segment in self.vad_gate.process(audio_bytes):
+            self.audio_input_queue.put_nowait(segment)
     
     async def send_audio_content_end_event(self):
         """Send a content end event to the Bedrock stream."""
         if not self.is_active:
-            debug_print("Stream is not active")
+            self.log.debug("Stream is not active")
             return
         
-        content_end_event = self.CONTENT_END_EVENT % (self.prompt_name, self.audio_content_name)
-        await self.send_raw_event(content_end_event)
-        debug_print("Audio ended")
+        await self.send_raw_event(self.encoder.audio_content_end(), "contentEnd")
+        self.log.debug("Audio ended")
     
     def tool_result_event(self, content_name, content, role):
         """Create a tool result event"""
-
-        if isinstance(content, dict):
-            content_json_string = json.dumps(content)
-        else:
-            content_json_string = content
-            
-        tool_result_event = {
-            "event": {
-                "toolResult": {
-                    "promptName": self.prompt_name,
-                    "contentName": content_name,
-                    "content": content_json_string
-                }
-            }
-        }
-        return json.dumps(tool_result_event)
+        return self.encoder.tool_result(content_name, content)
     
-    async def processToolUse(self, toolName, toolUseContent):
+    async def processToolUse(self, toolName, toolUseContent, user_query=None):
+        """Run a tool call on the tool executor and return its result.
+
+        Strands tools are called directly; the agent loop only runs for the
+        fallback tool or if a direct call fails.
+        """
+        if user_query is None:
+            user_query = self.user_query
+        if toolName in self.direct_tools:
+            print(f"Calling tool {toolName} directly with: {toolUseContent.get('content')}")
+            content = toolUseContent.get("content") or "{}"
+            try:
+                # Identical calls from concurrent sessions share one worker thread
+                key = cache_key(toolName, **json.loads(content))
+                called = []
+
+                def call_tool():
+                    called.append(True)
+                    return self.tool_executor.run(self.strands_agent.call_tool, toolName, content)
+                response = await AsyncSingleFlight.shared().do(key, call_tool)
+                if not called:
+                    # Another session ran the tool, so only its history has the turn
+                    self.strands_agent.record_tool_call(toolName, content, response)
+                print(f"Tool use response: {response}")
+                return {"result": response}
+            except (asyncio.CancelledError, ToolTimeoutError):
+                raise
+            except Exception as e:
+                print(f"Direct call to {toolName} failed, asking the agent instead: {e}")
+
         query = ""
         if toolUseContent.get("content"):
             # Parse the JSON string in the content field
@@ -455,89 +493,200 @@ class BedrockStreamManager:
             query = query_json.get("query")  # Pass the JSON string directly to the agent
             print(f"Extracted query: {query}")
 
-        print(f"Processing tool use: {toolName} with content: {query} and user query: {self.user_query}")
+        print(f"Processing tool use: {toolName} with content: {query} and user query: {user_query}")
         
-        response = self.strands_agent.query(self.user_query)
+        response = await self._answer(user_query)
         print(f"Tool use response: {response}")
         return {"result": response}
 
+    def _start_speculation(self, user_query):
+        """Start answering a final user transcript on a fork of the conversation."""
+        self._discard_speculation()
+        forked = self.strands_agent.fork()
+        self.speculation = SpeculativeCall(user_query, self.speculation_executor.run(forked.query, user_query),
+                                           context=forked)
+        self.log.debug("Speculatively querying agent with: %s", user_query)
+
+    def _discard_speculation(self):
+        """Drop a speculative answer the model did not ask for."""
+        if self.speculation is not None:
+            self.log.debug("Discarding speculative query: %s", self.speculation.key)
+            self.speculation.discard()
+            self.speculation = None
+
+    async def _answer(self, user_query):
+        """Query the agent, reusing a speculative answer for the same transcript."""
+        speculation, self.speculation = self.speculation, None
+        if speculation is not None and speculation.matches(user_query):
+            try:
+                response = await speculation.take()
+            except (asyncio.CancelledError, ToolTimeoutError):
+                raise
+            except Exception as e:
+                print(f"Speculative query failed, retrying: {e}")
+            else:
+                self.strands_agent.adopt(speculation.context)
+                return response
+        elif speculation is not None:
+            speculation.discard()
+        if self.speculative_tools:
+            SpeculationStats.shared().misses += 1
+        return await self.tool_executor.run(self.strands_agent.query, user_query)
+
+    async def _run_tool(self, tool_use_id):
+        """Run a pending tool use and send its result without blocking the response loop."""
+        pending = self.pending_tools.pop(tool_use_id)
+        try:
+            toolResult = await self.processToolUse(pending['toolName'], pending['toolUse'], pending['userQuery'])
+        except ToolTimeoutError as e:
+            print(f"Tool {pending['toolName']} ({tool_use_id}) timed out: {e}")
+            toolResult = {"result": "The tool did not respond in time."}
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Tool {pending['toolName']} ({tool_use_id}) failed: {e}")
+            toolResult = {"result": f"The tool failed: {e}"}
+
+        toolContent = str(uuid.uuid4())
+        # Keep each tool result's content block contiguous on the stream
+        async with self._tool_result_lock:
+            await self.send_tool_start_event(toolContent, tool_use_id)
+            await self.send_tool_result_event(toolContent, toolResult)
+            await self.send_tool_content_end_event(toolContent)
+        self.tracer.tool_done(tool_use_id, pending['toolName'])
+        self.tool_tasks.pop(tool_use_id, None)
+
+    def _on_content_start(self, content_start):
+        """Track the role and generation stage of the next content block."""
+        self.log.debug("Content start detected")
+        # set role
+        self.role = content_start['role']
+        self.generation_stage = None
+        # Check for speculative content
+        if 'additionalModelFields' in content_start:
+            try:
+                additional_fields = json.loads(content_start['additionalModelFields'])
+                self.generation_stage = additional_fields.get('generationStage')
+                if self.generation_stage == 'SPECULATIVE':
+                    self.log.debug("Speculative content detected")
+                    self.display_assistant_text = True
+                else:
+                    self.display_assistant_text = False
+            except json.JSONDecodeError:
+                self.log.debug("Error parsing additionalModelFields")
+
+    def _on_text_output(self, text_output):
+        """Handle transcripts and barge-in markers. Returns True if the event is consumed."""
+        text_content = text_output['content']
+        role = text_output['role']
+        
+        # Check if there is a barge-in
+        if '{ "interrupted" : true }' in text_content:
+            self.log.debug("Barge-in detected. Stopping audio output.")
+            self._handle_barge_in()
+            return True
+
+        # Process text through Strands agent if it's a user query
+        if role == "USER":
+            print(f"User query: {text_content}")
+            self.user_query = text_content
+            self.tracer.transcript()
+            if self.tracer.last_turn is not None:
+                self.log.debug("Turn spans", extra={"spans": self.tracer.last_turn})
+            if self.speculative_tools and self.generation_stage != 'SPECULATIVE':
+                self._start_speculation(text_content)
+        if (self.role == "ASSISTANT" and self.display_assistant_text):
+            print(f"Assistant: {text_content}")
+        elif (self.role == "USER"):
+            print(f"User: {text_content}")
+
+    async def _on_audio_output(self, audio_output):
+        """Queue decoded audio for local playback."""
+        self.tracer.audio_out(len(audio_output['content']))
+        if self.local_audio:
+            await self.audio_output_queue.put(EventDecoder.audio_pcm(audio_output))
+
+    def _on_tool_use(self, tool_use):
+        """Remember the pending tool use until its content ends."""
+        tool_use_id = tool_use['toolUseId']
+        self.tracer.tool_use(tool_use_id)
+        if tool_use['toolName'] in self.direct_tools:
+            # A single tool answers this turn; a speculative agent run still queued never starts
+            self._discard_speculation()
+        self.pending_tools[tool_use_id] = {
+            'toolName': tool_use['toolName'],
+            'toolUse': tool_use,
+            'contentId': tool_use.get('contentId'),
+            # Captured now; a later transcript must not change what this call answers
+            'userQuery': self.user_query,
+        }
+        self.log.debug("Tool use detected: %s, ID: %s", tool_use['toolName'], tool_use_id)
+
+    def _pending_tool_for(self, content_end):
+        """Find the toolUseId whose content block just ended."""
+        content_id = content_end.get('contentId')
+        waiting = [tool_use_id for tool_use_id in self.pending_tools if tool_use_id not in self.tool_tasks]
+        for tool_use_id in waiting:
+            if content_id and self.pending_tools[tool_use_id]['contentId'] == content_id:
+                return tool_use_id
+        # Fall back to the oldest tool use that has not been started
+        return waiting[0] if waiting else None
+
+    async def _on_content_end(self, content_end):
+        """Finish audio blocks and run tools once their content ends."""
+        content_type = content_end.get('type')
+        if content_type == 'AUDIO':
+            if self.local_audio:
+                # Marks the end of an audio block for the local player
+                await self.audio_output_queue.put(None)
+        elif content_type == 'TOOL':
+            tool_use_id = self._pending_tool_for(content_end)
+            if tool_use_id is None:
+                self.log.debug("Tool content ended without a pending tool use")
+                return
+            self.log.debug("Processing tool use %s and sending result", tool_use_id)
+            self.tool_tasks[tool_use_id] = asyncio.create_task(self._run_tool(tool_use_id))
+        elif self.role == 'ASSISTANT' and content_end.get('stopReason') == 'END_TURN':
+            # The turn was answered without a tool
+            self._discard_speculation()
+
+    def _on_completion_end(self, completion_end):
+        """Handle end of conversation, no more response will be generated."""
+        print("End of response sequence")
+        self._discard_speculation()
+
     async def _process_responses(self):
         """Process incoming responses from Bedrock."""
         try:            
             while self.is_active:
                 try:
                     output = await self.stream_response.await_output()
+                    if not self.stream_ready.is_set():
+                        # The output stream only resolves once Bedrock accepted the request
+                        self.stream_ready.set()
                     result = await output[1].receive()
                     if result.value and result.value.bytes_:
+                        response_data = result.value.bytes_
                         try:
-                            response_data = result.value.bytes_.decode('utf-8')
-                            json_data = json.loads(response_data)
-                            
-                            # Handle different response types
-                            if 'event' in json_data:
-                                if 'contentStart' in json_data['event']:
-                                    debug_print("Content start detected")
-                                    content_start = json_data['event']['contentStart']
-                                    # set role
-                                    self.role = content_start['role']
-                                    # Check for speculative content
-                                    if 'additionalModelFields' in content_start:
-                                        try:
-                                            additional_fields = json.loads(content_start['additionalModelFields'])
-                                            if additional_fields.get('generationStage') == 'SPECULATIVE':
-                                                debug_print("Speculative content detected")
-                                                self.display_assistant_text = True
-                                            else:
-                                                self.display_assistant_text = False
-                                        except json.JSONDecodeError:
-                                            debug_print("Error parsing additionalModelFields")
-                                elif 'textOutput' in json_data['event']:
-                                    text_content = json_data['event']['textOutput']['content']
-                                    role = json_data['event']['textOutput']['role']
-                                    
-                                    # Check if there is a barge-in
-                                    if '{ "interrupted" : true }' in text_content:
-                                        debug_print("Barge-in detected. Stopping audio output.")
-                                        self.barge_in = True
-                                        continue
-
-                                    # Process text through Strands agent if it's a user query
-                                    if role == "USER":
-                                        print(f"User query: {text_content}")
-                                        self.user_query = text_content
-                                    if (self.role == "ASSISTANT" and self.display_assistant_text):
-                                        print(f"Assistant: {text_content}")
-                                    elif (self.role == "USER"):
-                                        print(f"User: {text_content}")
-
-                                elif 'audioOutput' in json_data['event']:
-                                    audio_content = json_data['event']['audioOutput']['content']
-                                    audio_bytes = base64.b64decode(audio_content)
-                                    await self.audio_output_queue.put(audio_bytes)
-                                elif 'toolUse' in json_data['event']:
-                                    self.toolUseContent = json_data['event']['toolUse']
-                                    self.toolName = json_data['event']['toolUse']['toolName']
-                                    self.toolUseId = json_data['event']['toolUse']['toolUseId']
-                                    debug_print(f"Tool use detected: {self.toolName}, ID: {self.toolUseId}")
-                                elif 'contentEnd' in json_data['event'] and json_data['event'].get('contentEnd', {}).get('type') == 'TOOL':
-                                    debug_print("Processing tool use and sending result")
-                                    toolResult = await self.processToolUse(self.toolName, self.toolUseContent)
-                                    toolContent = str(uuid.uuid4())
-                                    await self.send_tool_start_event(toolContent)
-                                    await self.send_tool_result_event(toolContent, toolResult)
-                                    await self.send_tool_content_end_event(toolContent)
-                                elif 'completionEnd' in json_data['event']:
-                                    # Handle end of conversation, no more response will be generated
-                                    print("End of response sequence")
-                                
-                            
-                            # Put the response in the output queue for other components
+                            event_type, body, json_data = self.decoder.decode(response_data)
+                        except ValueError:
+                            if self.forward_output:
+                                await self.output_queue.put({"raw_data": response_data.decode('utf-8', 'replace')})
+                            continue
+
+                        consumed = await self.decoder.handle(event_type, body)
+
+                        # Put the response in the output queue for other components
+                        if not consumed and self.forward_output:
                             await self.output_queue.put(json_data)
-                        except json.JSONDecodeError:
-                            await self.output_queue.put({"raw_data": response_data})
                 except StopAsyncIteration:
                     # Stream has ended
                     break
+                except QueueOverflow:
+                    # The consumer fell too far behind and is told on its next get(); it
+                    # disconnects and closes this session, so stop queueing for it meanwhile
+                    self.log.warning("Output queue overflowed; dropping its consumer")
+                    self.forward_output = False
                 except Exception as e:
                    # Handle ValidationException properly
                     if "ValidationException" in str(e):
@@ -560,6 +709,11 @@ class BedrockStreamManager:
         self.is_active = False
         if self.response_task and not self.response_task.done():
             self.response_task.cancel()
+        if self.audio_input_task and not self.audio_input_task.done():
+            self.audio_input_task.cancel()
+        for task in self.tool_tasks.values():
+            task.cancel()
+        self._discard_speculation()
 
         await self.send_audio_content_end_event()
         await self.send_prompt_end_event()
@@ -567,10 +721,25 @@ class BedrockStreamManager:
 
         if self.stream_response:
             await self.stream_response.input_stream.close()
+
+        for name, queue in self.queues().items():
+            QUEUE_HIGH_WATER.labels(name).observe(queue.high_water)
+            QUEUE_DROPPED.labels(name).inc(queue.dropped)
+        if self.vad_gate:
+            self.log.debug("VAD stats: %s", self.vad_gate.stats())
+        self.log.debug("Audio batching stats: %s", self.audio_coalescer.stats())
+        if self.speculative_tools:
+            self.log.debug("Speculative tool stats: %s", SpeculationStats.shared().stats())
+        self.log.debug("Result cache stats: %s", TieredCache.shared().stats())
+        self.log.debug("HTTP client stats: %s", HttpClient.shared().stats())
         
         # Close the Strands agent
         self.strands_agent.close()
 
+def _is_audio_event(item):
+    """Return True for queued audioOutput events, the ones output_queue drops first."""
+    return 'audioOutput' in item.get('event', ())
+
 class AudioStreamer:
     """Handles continuous microphone input and audio output using separate streams."""
     
@@ -579,14 +748,21 @@ class AudioStreamer:
         self.is_streaming = False
         self.loop = asyncio.get_event_loop()
 
+        # Microphone audio is copied into a preallocated ring buffer by the PortAudio
+        # thread and drained in bulk by a single asyncio task
+        self.input_buffer = AudioRingBuffer(
+            INPUT_SAMPLE_RATE * CHANNELS * 2 * INPUT_BUFFER_SECONDS,
+            frame_bytes=CHANNELS * 2
+        )
+
         # Initialize PyAudio
-        debug_print("AudioStreamer Initializing PyAudio...")
+        audio_logger.debug("AudioStreamer Initializing PyAudio...")
         self.p = time_it("AudioStreamerInitPyAudio", pyaudio.PyAudio)
-        debug_print("AudioStreamer PyAudio initialized")
+        audio_logger.debug("AudioStreamer PyAudio initialized")
 
         # Initialize separate streams for input and output
         # Input stream with callback for microphone
-        debug_print("Opening input audio stream...")
+        audio_logger.debug("Opening input audio stream...")
         self.input_stream = time_it("AudioStreamerOpenAudio", lambda  : self.p.open(
             format=FORMAT,
             channels=CHANNELS,
@@ -595,87 +771,65 @@ class AudioStreamer:
             frames_per_buffer=CHUNK_SIZE,
             stream_callback=self.input_callback
         ))
-        debug_print("input audio stream opened")
+        audio_logger.debug("input audio stream opened")
 
-        # Output stream for direct writing (no callback)
-        debug_print("Opening output audio stream...")
-        self.output_stream = time_it("AudioStreamerOpenAudio", lambda  : self.p.open(
-            format=FORMAT,
+        # Output is played by a callback-driven engine on PortAudio's own thread
+        audio_logger.debug("Opening output audio stream...")
+        self.playback = PlaybackEngine(
+            sample_rate=OUTPUT_SAMPLE_RATE,
             channels=CHANNELS,
-            rate=OUTPUT_SAMPLE_RATE,
-            output=True,
-            frames_per_buffer=CHUNK_SIZE
-        ))
+            blocksize=CHUNK_SIZE,
+            prebuffer_ms=OUTPUT_PREBUFFER_MS
+        )
+        time_it("AudioStreamerOpenAudio", self.playback.start)
+        self.stream_manager.add_barge_in_listener(self.on_barge_in)
 
-        debug_print("output audio stream opened")
+        audio_logger.debug("output audio stream opened")
 
     def input_callback(self, in_data, frame_count, time_info, status):
-        """Callback function that schedules audio processing in the asyncio event loop"""
+        """Callback function that copies captured audio into the ring buffer"""
         if self.is_streaming and in_data:
-            # Schedule the task in the event loop
-            asyncio.run_coroutine_threadsafe(
-                self.process_input_audio(in_data), 
-                self.loop
-            )
+            self.input_buffer.write(in_data)
         return (None, pyaudio.paContinue)
 
-    async def process_input_audio(self, audio_data):
-        """Process a single audio chunk directly"""
-        try:
-            # Send audio to Bedrock immediately
-            self.stream_manager.add_audio_chunk(audio_data)
-        except Exception as e:
-            if self.is_streaming:
-                print(f"Error processing input audio: {e}")
+    async def process_input_audio(self):
+        """Drain the ring buffer in bulk and hand the audio to the stream manager"""
+        while self.is_streaming:
+            try:
+                audio_data = await self.input_buffer.read_async()
+                if audio_data:
+                    self.stream_manager.add_audio_chunk(audio_data)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                if self.is_streaming:
+                    print(f"Error processing input audio: {e}")
     
+    def on_barge_in(self, detected):
+        """Silence playback as soon as the stream manager reports a barge-in"""
+        dropped = self.playback.interrupt(detected)
+        audio_logger.debug("Barge-in dropped %d bytes of queued audio", dropped)
+
     async def play_output_audio(self):
-        """Play audio responses from Nova Sonic"""
+        """Queue audio responses from Nova Sonic on the playback engine"""
         while self.is_streaming:
             try:
-                # Check for barge-in flag
-                if self.stream_manager.barge_in:
-                    # Clear the audio queue
-                    while not self.stream_manager.audio_output_queue.empty():
-                        try:
-                            self.stream_manager.audio_output_queue.get_nowait()
-                        except asyncio.QueueEmpty:
-                            break
-                    self.stream_manager.barge_in = False
-                    # Small sleep after clearing
-                    await asyncio.sleep(0.05)
-                    continue
-                
                 # Get audio data from the stream manager's queue
-                audio_data = await asyncio.wait_for(
-                    self.stream_manager.audio_output_queue.get(),
-                    timeout=0.1
-                )
+                queue = self.stream_manager.audio_output_queue
+                audio_data = await queue.get()
+                if queue is not self.stream_manager.audio_output_queue:
+                    # Queue was discarded by a barge-in
+                    continue
                 
-                if audio_data and self.is_streaming:
-                    # Write directly to the output stream in smaller chunks
-                    chunk_size = CHUNK_SIZE  # Use the same chunk size as the stream
-                    
-                    # Write the audio data in chunks to avoid blocking too long
-                    for i in range(0, len(audio_data), chunk_size):
-                        if not self.is_streaming:
-                            break
-                        
-                        end = min(i + chunk_size, len(audio_data))
-                        chunk = audio_data[i:end]
-                        
-                        # Create a new function that captures the chunk by value
-                        def write_chunk(data):
-                            return self.output_stream.write(data)
-                        
-                        # Pass the chunk to the function
-                        await asyncio.get_event_loop().run_in_executor(None, write_chunk, chunk)
-                        
-                        # Brief yield to allow other tasks to run
-                        await asyncio.sleep(0.001)
+                if audio_data is None:
+                    # End of an audio content block, let its tail play out
+                    self.playback.end_of_content()
+                elif self.is_streaming:
+                    # Waits only when the jitter buffer is full; abandoned on barge-in
+                    await self.playback.write(audio_data)
                     
-            except asyncio.TimeoutError:
-                # No data available within timeout, just continue
-                continue
+            except asyncio.CancelledError:
+                break
             except Exception as e:
                 if self.is_streaming:
                     print(f"Error playing output audio: {str(e)}")
@@ -701,6 +855,7 @@ class AudioStreamer:
             self.input_stream.start_stream()
         
         # Start processing tasks
+        self.input_task = asyncio.create_task(self.process_input_audio())
         self.output_task = asyncio.create_task(self.play_output_audio())
         
         # Wait for user to press Enter to stop
@@ -718,6 +873,8 @@ class AudioStreamer:
 
         # Cancel the tasks
         tasks = []
+        if hasattr(self, 'input_task') and not self.input_task.done():
+            tasks.append(self.input_task)
         if hasattr(self, 'output_task') and not self.output_task.done():
             tasks.append(self.output_task)
         for task in tasks:
@@ -729,22 +886,35 @@ class AudioStreamer:
             if self.input_stream.is_active():
                 self.input_stream.stop_stream()
             self.input_stream.close()
-        if self.output_stream:
-            if self.output_stream.is_active():
-                self.output_stream.stop_stream()
-            self.output_stream.close()
+        if self.playback:
+            self.playback.close()
+            audio_logger.debug("Playback stats: %s", self.playback.stats())
         if self.p:
             self.p.terminate()
+
+        stats = self.input_buffer.stats()
+        audio_logger.debug("Input buffer stats: %s", stats)
+        if stats["overruns"]:
+            print(f"Microphone buffer overruns: {stats['overruns']}, dropped frames: {stats['dropped_frames']}")
         
         await self.stream_manager.close() 
 
-async def main(debug=False):
+async def main(debug=False, vad_mode=None, audio_batch_ms=40, speculative_tools=False, log_levels=None,
+               record_dir=None):
     """Main function to run the application."""
-    global DEBUG
-    DEBUG = debug
+    levels = {"all": "DEBUG"} if debug else {}
+    levels.update(log_levels or {})
+    configure(levels=levels)
 
     # Create stream manager
-    stream_manager = BedrockStreamManager(model_id='amazon.nova-sonic-v1:0', region='us-east-1')
+    vad_gate = VoiceActivityGate(sample_rate=INPUT_SAMPLE_RATE, mode=vad_mode) if vad_mode else None
+    audio_coalescer = AudioCoalescer(target_ms=audio_batch_ms, sample_rate=INPUT_SAMPLE_RATE)
+    # Optionally record the session's events for offline replay with session_replay
+    bedrock_client = RecordingClient(create_bedrock_client('us-east-1'), record_dir) if record_dir else None
+    stream_manager = BedrockStreamManager(model_id='amazon.nova-sonic-v1:0', region='us-east-1',
+                                          vad_gate=vad_gate, audio_coalescer=audio_coalescer,
+                                          bedrock_client=bedrock_client, speculative_tools=speculative_tools,
+                                          forward_output=False)
 
     # Create audio streamer
     audio_streamer = AudioStreamer(stream_manager)
@@ -761,12 +931,19 @@ async def main(debug=False):
     finally:
         # Clean up
         await audio_streamer.stop_streaming()
+        StrandsRuntime.close_shared()
 
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description='Voice Search Agent with Nova Sonic and Strands')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--vad', choices=VoiceActivityGate.MODES, help='Gate silent audio before sending it (drop or keepalive)')
+    parser.add_argument('--audio-batch-ms', type=int, default=40, help='Audio duration to batch into one audioInput event (0 disables batching)')
+    parser.add_argument('--speculative-tools', action='store_true', help='Start the agent on the final user transcript before the model requests a tool')
+    parser.add_argument('--log-levels', default=os.environ.get('LOG_LEVELS', ''),
+                        help='Per-component log levels, e.g. stream=DEBUG,audio=INFO')
+    parser.add_argument('--record', metavar='DIR', help='Record the Bedrock event streams to DIR for replay')
     args = parser.parse_args()
     
     # Set your AWS credentials here or use environment variables
@@ -776,7 +953,9 @@ if __name__ == "__main__":
 
     # Run the main function
     try:
-        asyncio.run(main(debug=args.debug))
+        asyncio.run(main(debug=args.debug, vad_mode=args.vad, audio_batch_ms=args.audio_batch_ms,
+                         speculative_tools=args.speculative_tools, log_levels=parse_levels(args.log_levels),
+                         record_dir=args.record))
     except Exception as e:
         print(f"Application error: {e}")
         if args.debug:
@@ -0,0 +1 @@
+# Makes the web server's helper modules importable as web_server.<module>
@@ -0,0 +1,60 @@
+import struct
+
+# Offered by clients in Sec-WebSocket-Protocol to exchange audio as binary frames.
+# Clients that offer nothing keep the JSON protocol with base64 audio.
+SUBPROTOCOL = "voice-pcm.v1"
+VERSION = 1
+
+# Frame kinds
+MIC_AUDIO = 1        # client to server: 16 kHz 16-bit mono PCM
+ASSISTANT_AUDIO = 2  # server to client: 24 kHz 16-bit mono PCM
+
+# Every binary frame starts with version, kind and a sequence number that wraps at 65536,
+# followed by the raw PCM payload. Control and text messages stay JSON text frames.
+HEADER = struct.Struct("!BBH")
+
+
+def select_subprotocol(connection, subprotocols):
+    """Pick the binary protocol if the client offers it; otherwise continue with JSON.
+
+    Passed to websockets.serve(); unlike the default it accepts clients that offer
+    no subprotocol.
+    """
+    return SUBPROTOCOL if SUBPROTOCOL in subprotocols else None
+
+
+def pack_audio(kind: int, seq: int, pcm: bytes) -> bytes:
+    """Build a binary audio frame."""
+    return HEADER.pack(VERSION, kind, seq & 0xFFFF) + pcm
+
+
+def unpack_audio(frame: bytes):
+    """Split a binary frame into (kind, seq, PCM payload).
+
+    Raises:
+        ValueError: If the frame is too short or of an unknown version
+    """
+    if len(frame) < HEADER.size:
+        raise ValueError(f"Frame of {len(frame)} bytes is shorter than its header")
+    version, kind, seq = HEADER.unpack_from(frame)
+    if version != VERSION:
+        raise ValueError(f"Unsupported frame version {version}")
+    return kind, seq, frame[HEADER.size:]
+
+
+class SequenceTracker:
+    """Counts frames missing from a stream of wrapping sequence numbers."""
+
+    def __init__(self):
+        self.expected = None
+        self.missing = 0
+
+    def receive(self, seq: int) -> int:
+        """Record a frame; returns how many frames were skipped before it."""
+        gap = 0 if self.expected is None else (seq - self.expected) & 0xFFFF
+        # A jump of more than half the range is a late or repeated frame, not a gap
+        if gap >= 0x8000:
+            return 0
+        self.missing += gap
+        self.expected = (seq + 1) & 0xFFFF
+        return gap
@@ -1,96 +1,228 @@
 import asyncio
+import contextlib
+import signal
+import sys
 import websockets
+from websockets.datastructures import Headers
+from websockets.http11 import Response
 import json
 import logging
 import warnings
+import time
 import os
 from http import HTTPStatus
-import http.server
-import threading
 import base64
-from voice_search_agent import BedrockStreamManager
+from urllib.parse import parse_qs, urlparse
+from voice_search_agent import BedrockStreamManager, create_bedrock_client
+from strands_agent import StrandsRuntime
+from tool_executor import ToolExecutor, SpeculationStats, SpeculationExecutor
+from result_cache import TieredCache, SpatialWeatherCache, SingleFlight, AsyncSingleFlight
+from http_client import HttpClient
+from bounded_queue import BoundedQueue, QueueOverflow
+from metrics import REGISTRY, QUEUE_DEPTH, Counter, Gauge, merge_expositions, monitor_event_loop
+from diagnostics import configure, get_logger, parse_levels
+from audio_pipeline import VoiceActivityGate, AudioCoalescer
+from web_server.stream_pool import StreamPool
+from web_server.static_assets import StaticAssets
+from web_server.supervisor import (Supervisor, WORKER_INDEX, inherited_sockets, listen_socket,
+                                   worker_admin_ports)
+from web_server.protocol import (SUBPROTOCOL, MIC_AUDIO, ASSISTANT_AUDIO, SequenceTracker, pack_audio,
+                                 select_subprotocol, unpack_audio)
+from session_replay import RecordingClient
+from load_test import ScriptedBedrockClient, ScriptedAgent
 
-# Configure logging
+# Configure logging; records are written by a background thread
 LOGLEVEL = os.environ.get("LOGLEVEL", "INFO").upper()
-logging.basicConfig(level=LOGLEVEL, format="%(asctime)s %(message)s")
-logger = logging.getLogger(__name__)
+LOG_LEVELS = parse_levels(os.environ.get("LOG_LEVELS", ""))
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+# Lets a client raise its own session's log level with ?log=<level>; debug logs hold transcripts and tool payloads
+ALLOW_SESSION_LOG_LEVEL = os.environ.get("ALLOW_SESSION_LOG_LEVEL", "").lower() in ("1", "true", "yes")
+configure(level=LOGLEVEL, levels=LOG_LEVELS, structured=LOG_FORMAT == "json")
+logger = get_logger("server")
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
-DEBUG = False
+VAD_MODE = os.environ.get("VAD_MODE") or None
+AUDIO_BATCH_MS = int(os.environ.get("AUDIO_BATCH_MS", "40"))
+MODEL_ID = 'amazon.nova-sonic-v1:0'
+REGION = 'us-east-1'
+STREAM_POOL_SIZE = int(os.environ.get("STREAM_POOL_SIZE", "2"))
+STREAM_POOL_MAX_IDLE = float(os.environ.get("STREAM_POOL_MAX_IDLE", "240"))
+SPECULATIVE_TOOLS = os.environ.get("SPECULATIVE_TOOLS", "").lower() in ("1", "true", "yes")
+RECORD_DIR = os.environ.get("RECORD_DIR") or None
+# Events buffered per session for its WebSocket client, and what happens when a slow client fills them
+OUTPUT_QUEUE_SIZE = int(os.environ.get("OUTPUT_QUEUE_SIZE", "256"))
+OUTPUT_QUEUE_POLICY = os.environ.get("OUTPUT_QUEUE_POLICY", "drop_oldest")
+STATIC_MAX_AGE = int(os.environ.get("STATIC_MAX_AGE", "3600"))
+# Worker processes sharing the listening sockets (1 serves from this process alone)
+WORKERS = int(os.environ.get("WORKERS", "1"))
+# Seconds connected sessions get to finish after SIGTERM before they are closed
+DRAIN_TIMEOUT = float(os.environ.get("DRAIN_TIMEOUT", "30"))
+# Offline stand-in for Bedrock and the Strands tools, for load testing
+STUB_BEDROCK = os.environ.get("STUB_BEDROCK", "").lower() in ("1", "true", "yes")
+STUB_TURN_SECONDS = float(os.environ.get("STUB_TURN_SECONDS", "3"))
+STUB_RESPONSE_SECONDS = float(os.environ.get("STUB_RESPONSE_SECONDS", "2"))
+STUB_TOOL_DELAY = float(os.environ.get("STUB_TOOL_DELAY", "0.2"))
 
-def debug_print(message):
-    """Print only if debug mode is enabled"""
-    if DEBUG:
-        print(message)
+# Shared by every connection; created in main()
+bedrock_client = None
+stream_pool = None
+# Stands in for every session's StrandsAgent with --stub-bedrock
+stub_agent = None
+# Stream managers of the connected clients
+active_sessions = set()
+# Set in worker processes started with --workers; /health and /metrics then cover every worker
+worker_index = os.environ.get(WORKER_INDEX)
+peer_client = None
+# Loaded and compressed once; served on the event loop alongside the WebSocket endpoint
+static_assets = StaticAssets(os.path.join(os.path.dirname(__file__), 'static'), max_age=STATIC_MAX_AGE)
 
-class WebServerHandler(http.server.SimpleHTTPRequestHandler):
-    """Handler for serving static files and health check endpoint"""
-    
-    def __init__(self, *args, **kwargs):
-        # Set the directory to serve static files from
-        self.static_dir = os.path.join(os.path.dirname(__file__), 'static')
-        super().__init__(*args, **kwargs)
-
-    def do_GET(self):
-        client_ip = self.client_address[0]
-        logger.info(f"Request received from {client_ip} for path: {self.path}")
-
-        if self.path == "/health":
-            # Handle health check
-            logger.info(f"Responding with 200 OK to health check from {client_ip}")
-            self.send_response(HTTPStatus.OK)
-            self.send_header("Content-Type", "application/json")
-            self.end_headers()
-            response = json.dumps({"status": "healthy"})
-            self.wfile.write(response.encode("utf-8"))
-            logger.info(f"Health check response sent: {response}")
+WEBSOCKET_BYTES = Counter("voice_websocket_bytes_sent_total", "Bytes of messages sent to WebSocket clients",
+                          labels=("type",))
+ACTIVE_SESSIONS = Gauge("voice_active_sessions", "Connected WebSocket clients")
+AUDIO_FRAMES_MISSING = Counter("voice_websocket_audio_frames_missing_total",
+                               "Binary microphone frames skipped in the sequence numbers")
+
+def queue_stats():
+    """Return the highest high-water mark and the dropped items of each queue over connected sessions."""
+    stats = {}
+    for session in list(active_sessions):
+        for name, queue in session.queues().items():
+            entry = stats.setdefault(name, {"high_water": 0, "dropped": 0})
+            entry["high_water"] = max(entry["high_water"], queue.high_water)
+            entry["dropped"] += queue.dropped
+    return stats
+
+def session_log_level(websocket):
+    """Return the level a client asked for with ?log=<level> on the WebSocket URL, if allowed and given."""
+    if not ALLOW_SESSION_LOG_LEVEL:
+        return None
+    request = getattr(websocket, "request", None)
+    path = getattr(request, "path", None) or getattr(websocket, "path", "") or ""
+    values = parse_qs(urlparse(path).query).get("log")
+    return values[0].upper() if values else None
+
+def health():
+    """Return the /health document: component stats and latency percentiles."""
+    health = {"status": "healthy", "active_sessions": len(active_sessions)}
+    if stream_pool:
+        health["stream_pool"] = stream_pool.stats()
+    health["tool_executor"] = ToolExecutor.shared().stats()
+    health["result_cache"] = TieredCache.shared().stats()
+    health["weather_cache"] = SpatialWeatherCache.shared().stats()
+    health["single_flight"] = SingleFlight.shared().stats()
+    health["tool_single_flight"] = AsyncSingleFlight.shared().stats()
+    health["http_client"] = HttpClient.shared().stats()
+    if SPECULATIVE_TOOLS:
+        health["speculative_tools"] = SpeculationStats.shared().stats()
+        health["speculation_executor"] = SpeculationExecutor.shared().stats()
+    health["static_assets"] = static_assets.stats()
+    health["queues"] = queue_stats()
+    health["latency"] = REGISTRY.percentiles()
+    return health
+
+def http_response(status, headers, body=b""):
+    """Build a plain HTTP response for websockets' process_request hook."""
+    return Response(status, HTTPStatus(status).phrase, Headers(headers), body)
+
+def health_response(document):
+    body = json.dumps(document).encode("utf-8")
+    return http_response(HTTPStatus.OK, [("Content-Type", "application/json"),
+                                         ("Content-Length", str(len(body))), ("Cache-Control", "no-store")], body)
+
+def metrics_response(text):
+    # Prometheus text exposition format
+    body = text.encode("utf-8")
+    return http_response(HTTPStatus.OK, [("Content-Type", "text/plain; version=0.0.4; charset=utf-8"),
+                                         ("Content-Length", str(len(body)))], body)
+
+async def from_workers(path, local):
+    """Fetch path from every worker's private endpoint, answering for this worker with local().
+
+    Returns:
+        dict: Response text by worker index, or the exception for workers that did not answer
+    """
+    async def fetch(index, port):
+        if str(index) == worker_index:
+            return local()
+        response = await peer_client.get_async(f"http://127.0.0.1:{port}{path}")
+        response.raise_for_status()
+        return response.text
+
+    ports = worker_admin_ports()
+    results = await asyncio.gather(*(fetch(index, port) for index, port in enumerate(ports)),
+                                   return_exceptions=True)
+    return {str(index): result for index, result in enumerate(results)}
+
+async def aggregated_health():
+    """Return /health for all workers, with the total of their connected sessions."""
+    documents = await from_workers("/health", lambda: json.dumps(health()))
+    workers = {}
+    for index, document in documents.items():
+        if isinstance(document, Exception):
+            workers[index] = {"status": "unreachable", "error": str(document)}
         else:
-            # Serve static files
-            if self.path == "/":
-                self.path = "/index.html"
-            
-            try:
-                file_path = os.path.join(self.static_dir, self.path.lstrip('/'))
-                with open(file_path, 'rb') as f:
-                    self.send_response(HTTPStatus.OK)
-                    if self.path.endswith('.html'):
-                        self.send_header("Content-Type", "text/html")
-                    elif self.path.endswith('.js'):
-                        self.send_header("Content-Type", "application/javascript")
-                    elif self.path.endswith('.css'):
-                        self.send_header("Content-Type", "text/css")
-                    self.end_headers()
-                    self.wfile.write(f.read())
-            except FileNotFoundError:
-                self.send_response(HTTPStatus.NOT_FOUND)
-                self.end_headers()
-                self.wfile.write(b"File not found")
-
-    def log_message(self, format, *args):
-        # Override to use our logger instead
-        pass
+            workers[index] = json.loads(document)
+    healthy = all(worker["status"] == "healthy" for worker in workers.values())
+    return {
+        "status": "healthy" if healthy else "degraded",
+        "active_sessions": sum(worker.get("active_sessions", 0) for worker in workers.values()),
+        "workers": workers,
+    }
 
-def start_web_server(host, port):
-    """Start the HTTP server for static files."""
-    try:
-        # Create the server with a socket timeout to prevent hanging
-        httpd = http.server.HTTPServer((host, port), WebServerHandler)
-        httpd.timeout = 5  # 5 second timeout
+async def aggregated_metrics():
+    """Return the metrics of all reachable workers, each sample labelled with worker="<index>"."""
+    texts = await from_workers("/metrics", REGISTRY.render)
+    return merge_expositions({index: text for index, text in texts.items() if not isinstance(text, Exception)})
 
-        logger.info(f"Starting web server on {host}:{port}")
+async def process_request(connection, request):
+    """Answer plain HTTP requests on the server's ports; WebSocket upgrades continue to the handler."""
+    if request.headers.get("Upgrade", "").lower() == "websocket":
+        return None
+    path = urlparse(request.path).path
+    logger.debug("HTTP request for %s", path)
+    if path == "/health":
+        return health_response(await aggregated_health() if worker_index is not None else health())
+    if path == "/metrics":
+        return metrics_response(await aggregated_metrics() if worker_index is not None else REGISTRY.render())
+    # Static files are served from memory
+    return http_response(*static_assets.respond(request.path, request.headers))
 
-        # Run the server in a separate thread
-        thread = threading.Thread(target=httpd.serve_forever)
-        thread.daemon = True  # This ensures the thread will exit when the main program exits
-        thread.start()
+def process_worker_request(connection, request):
+    """Answer another worker asking for this worker's own /health or /metrics."""
+    path = urlparse(request.path).path
+    if path == "/health":
+        return health_response(health())
+    if path == "/metrics":
+        return metrics_response(REGISTRY.render())
+    return http_response(HTTPStatus.NOT_FOUND, [("Content-Length", "0")])
 
-        logger.info(f"Web server started at http://{host}:{port}")
-        logger.info(f"Web server thread is alive: {thread.is_alive()}")
+def barge_in_notifier(websocket):
+    """Create a barge-in listener that tells the client to stop playback."""
+    async def notify():
+        try:
+            await websocket.send(json.dumps({'type': 'interrupt'}))
+        except websockets.exceptions.ConnectionClosed:
+            pass
 
-    except Exception as e:
-        logger.error(f"Failed to start web server: {e}", exc_info=True)
+    def listener(detected):
+        asyncio.ensure_future(notify())
+    return listener
+
+async def create_stream_manager():
+    """Create a stream manager on the shared client and initialize its stream."""
+    vad_gate = VoiceActivityGate(mode=VAD_MODE) if VAD_MODE else None
+    audio_coalescer = AudioCoalescer(target_ms=AUDIO_BATCH_MS)
+    stream_manager = BedrockStreamManager(model_id=MODEL_ID, region=REGION,
+                                          vad_gate=vad_gate, audio_coalescer=audio_coalescer,
+                                          local_audio=False, bedrock_client=bedrock_client,
+                                          strands_agent=stub_agent, speculative_tools=SPECULATIVE_TOOLS,
+                                          output_queue_size=OUTPUT_QUEUE_SIZE, output_queue_policy=OUTPUT_QUEUE_POLICY)
+    await stream_manager.initialize_stream()
+    logger.info("Bedrock stream initialized in %.3f s (%s)", stream_manager.timings["initialize_stream"],
+                ", ".join(f"{label}={seconds:.3f}s" for label, seconds in stream_manager.timings.items()))
+    return stream_manager
 
 async def websocket_handler(websocket):
     """Handle WebSocket connections from the frontend."""
@@ -98,17 +230,35 @@ async def websocket_handler(websocket):
     forward_task = None
     
     try:
-        # Create a new stream manager for this connection
-        stream_manager = BedrockStreamManager(model_id='amazon.nova-sonic-v1:0', region='us-east-1')
-        
-        # Initialize the Bedrock stream
-        await stream_manager.initialize_stream()
+        # Take an initialized stream from the pool, or create one if none is ready
+        stream_manager = await stream_pool.acquire()
+        stream_manager.add_barge_in_listener(barge_in_notifier(websocket))
+        active_sessions.add(stream_manager)
+        level = session_log_level(websocket)
+        if level:
+            # Trace this session without raising the level of the others
+            try:
+                stream_manager.log.setLevel(level)
+            except (ValueError, TypeError):
+                logger.warning("Ignoring unknown log level %s", level)
         
+        # Clients that negotiated the binary protocol send and receive raw PCM frames
+        binary = websocket.subprotocol == SUBPROTOCOL
+        sequence = SequenceTracker()
+
         # Start a task to forward responses from Bedrock to the WebSocket
-        forward_task = asyncio.create_task(forward_responses(websocket, stream_manager))
+        forward_task = asyncio.create_task(forward_responses(websocket, stream_manager, binary))
 
         async for message in websocket:
             try:
+                if isinstance(message, bytes):
+                    kind, seq, pcm = unpack_audio(message)
+                    if kind == MIC_AUDIO:
+                        missing = sequence.receive(seq)
+                        if missing:
+                            AUDIO_FRAMES_MISSING.inc(missing)
+                        stream_manager.add_audio_chunk(pcm)
+                    continue
                 data = json.loads(message)
                 if 'type' in data:
                     if data['type'] == 'audio':
@@ -126,76 +276,193 @@ async def websocket_handler(websocket):
             except json.JSONDecodeError:
                 logger.error("Invalid JSON received from WebSocket")
             except Exception as e:
-                logger.error(f"Error processing WebSocket message: {e}")
-                if DEBUG:
-                    import traceback
-                    traceback.print_exc()
+                logger.error("Error processing WebSocket message: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
     except websockets.exceptions.ConnectionClosed:
         logger.info("WebSocket connection closed")
     finally:
         # Clean up
         if stream_manager:
+            active_sessions.discard(stream_manager)
+            if stream_manager.vad_gate:
+                logger.info("VAD stats: %s", stream_manager.vad_gate.stats())
             await stream_manager.close()
         if forward_task:
             forward_task.cancel()
         if websocket:
             await websocket.close()
 
-async def forward_responses(websocket, stream_manager):
-    """Forward responses from Bedrock to the WebSocket."""
+async def forward_responses(websocket, stream_manager, binary=False):
+    """Forward responses from Bedrock to the WebSocket, audio as binary frames if binary is set."""
+    seq = 0
     try:
         while True:
             # Get next response from the output queue
             response = await stream_manager.output_queue.get()
             
             # Check if it's an audio response
-            if 'event' in response and 'audioOutput' in response['event']:
-                audio_content = response['event']['audioOutput']['content']
-                # Send audio data to client
-                await websocket.send(json.dumps({
-                    'type': 'audio',
-                    'data': audio_content  # Already base64 encoded
-                }))
-            elif 'event' in response and 'textOutput' in response['event']:
+            event = response.get('event')
+            if event is None:
+                continue
+            if 'audioOutput' in event and binary:
+                message = pack_audio(ASSISTANT_AUDIO, seq, base64.b64decode(event['audioOutput']['content']))
+                seq += 1
+                await websocket.send(message)
+                WEBSOCKET_BYTES.labels("audio").inc(len(message))
+            elif 'audioOutput' in event:
+                # Base64 needs no JSON escaping, so the message is assembled directly
+                # instead of re-serializing the audio string
+                audio_content = event['audioOutput']['content']
+                message = '{"type":"audio","data":"' + audio_content + '"}'
+                await websocket.send(message)
+                WEBSOCKET_BYTES.labels("audio").inc(len(message))
+            elif 'textOutput' in event:
                 # Send text response to client
-                text_content = response['event']['textOutput']['content']
-                await websocket.send(json.dumps({
+                text_content = event['textOutput']['content']
+                message = json.dumps({
                     'type': 'text',
                     'data': text_content
-                }))
+                })
+                await websocket.send(message)
+                WEBSOCKET_BYTES.labels("text").inc(len(message))
             
     except asyncio.CancelledError:
         # Task was cancelled
         pass
+    except QueueOverflow:
+        # With the disconnect policy, a client that cannot keep up is dropped
+        logger.warning("Disconnecting a client that fell %d events behind", OUTPUT_QUEUE_SIZE)
+        await websocket.close(code=1013, reason="Client too slow")
     except Exception as e:
-        logger.error(f"Error forwarding responses: {e}")
-        if DEBUG:
-            import traceback
-            traceback.print_exc()
+        logger.error("Error forwarding responses: %s", e, exc_info=logger.isEnabledFor(logging.DEBUG))
+
+def register_metrics():
+    """Expose queue depths and the shared components' stats on /metrics."""
+    # Read at scrape time by process_request on the event loop, which owns the sessions and their queues
+    QUEUE_DEPTH.labels("audio_input").set_function(
+        lambda: sum(session.audio_input_queue.qsize() for session in list(active_sessions)))
+    QUEUE_DEPTH.labels("output").set_function(
+        lambda: sum(session.output_queue.qsize() for session in list(active_sessions)))
+    ACTIVE_SESSIONS.set_function(lambda: len(active_sessions))
+    REGISTRY.register_stats("voice_stream_pool", stream_pool.stats)
+    REGISTRY.register_stats("voice_tool_executor", ToolExecutor.shared().stats)
+    REGISTRY.register_stats("voice_result_cache", TieredCache.shared().stats)
+    REGISTRY.register_stats("voice_weather_cache", SpatialWeatherCache.shared().stats)
+    REGISTRY.register_stats("voice_single_flight", SingleFlight.shared().stats)
+    REGISTRY.register_stats("voice_http_client", HttpClient.shared().stats)
+    REGISTRY.register_stats("voice_static_assets", static_assets.stats)
+    if SPECULATIVE_TOOLS:
+        REGISTRY.register_stats("voice_speculative_tools", SpeculationStats.shared().stats)
+        REGISTRY.register_stats("voice_speculation_executor", SpeculationExecutor.shared().stats)
+
+async def drain(timeout):
+    """Wait up to timeout seconds for connected sessions to end."""
+    deadline = time.monotonic() + timeout
+    while active_sessions and time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
+    if active_sessions:
+        logger.warning("Closing %d sessions still connected after %.0f s", len(active_sessions), timeout)
 
 async def main(host, port, http_port):
     """Main function to run the WebSocket server."""
+    global bedrock_client, stream_pool, stub_agent, peer_client
+    loop_monitor = asyncio.ensure_future(monitor_event_loop())
     try:
-        # Start HTTP server for static files
-        start_web_server(host, http_port)
+        if STUB_BEDROCK:
+            # Scripted turns and tool results; no network access or credentials needed
+            bedrock_client = ScriptedBedrockClient(turn_audio_seconds=STUB_TURN_SECONDS,
+                                                   response_audio_seconds=STUB_RESPONSE_SECONDS)
+            stub_agent = ScriptedAgent(delay=STUB_TOOL_DELAY)
+            logger.warning("Using the stub Bedrock backend")
+        else:
+            # Start the shared Strands runtime (MCP server, tools, model) once, off the event loop
+            runtime = await asyncio.get_running_loop().run_in_executor(None, StrandsRuntime.shared)
+            logger.info("Strands runtime started in %.3f s", runtime.startup_seconds)
 
-        # Start WebSocket server
-        async with websockets.serve(websocket_handler, host, port):
-            logger.info(f"WebSocket server started at ws://{host}:{port}")
-            
-            # Keep the server running forever
-            await asyncio.Future()
+            # One Bedrock client and a pool of pre-warmed streams shared by all connections
+            bedrock_client = create_bedrock_client(REGION)
+        if RECORD_DIR:
+            # Every stream is written to its own file for offline replay
+            bedrock_client = RecordingClient(bedrock_client, RECORD_DIR)
+        stream_pool = StreamPool(create_stream_manager, size=STREAM_POOL_SIZE, max_idle=STREAM_POOL_MAX_IDLE)
+        await stream_pool.start()
+        register_metrics()
+
+        # SIGTERM stops accepting connections and lets connected sessions finish
+        stopping = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stopping.set)
+        except NotImplementedError:
+            pass  # No signal handlers on Windows event loops
+
+        # Both ports serve the page, /health, /metrics and WebSocket connections from this event loop.
+        # Workers accept from the sockets their supervisor bound instead of binding their own.
+        listeners, admin = inherited_sockets()
+        addresses = [{"sock": sock} for sock in listeners] or \
+            [{"host": host, "port": listen_port} for listen_port in sorted({port, http_port})]
+        async with contextlib.AsyncExitStack() as servers:
+            public = []
+            for address in addresses:
+                public.append(await servers.enter_async_context(websockets.serve(
+                    websocket_handler, process_request=process_request,
+                    subprotocols=[SUBPROTOCOL], select_subprotocol=select_subprotocol, **address)))
+            if admin:
+                # One small pool per peer; scrapes fail fast instead of retrying
+                peer_client = HttpClient(pool_connections=len(worker_admin_ports()), pool_maxsize=2,
+                                         read_timeout=2, retries=0)
+                await servers.enter_async_context(websockets.serve(
+                    websocket_handler, sock=admin, process_request=process_worker_request))
+                logger.info("Worker %s serving on the shared sockets", worker_index)
+            else:
+                logger.info("WebSocket server started at ws://%s:%s, web server at http://%s:%s",
+                            host, port, host, http_port)
+
+            await stopping.wait()
+            logger.info("Draining %d sessions", len(active_sessions))
+            for server in public:
+                server.close(close_connections=False)
+            await drain(DRAIN_TIMEOUT)
     except Exception as ex:
         logger.error("Failed to start servers", exc_info=ex)
+    finally:
+        loop_monitor.cancel()
+        if stream_pool:
+            await stream_pool.close()
+        StrandsRuntime.close_shared()
 
 if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description='Voice Search WebSocket Server')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--vad', choices=VoiceActivityGate.MODES, default=VAD_MODE,
+                        help='Gate silent audio before sending it to Bedrock (drop or keepalive)')
+    parser.add_argument('--audio-batch-ms', type=int, default=AUDIO_BATCH_MS,
+                        help='Audio duration to batch into one audioInput event (0 disables batching)')
+    parser.add_argument('--pool-size', type=int, default=STREAM_POOL_SIZE,
+                        help='Number of pre-initialized Bedrock streams kept ready (0 disables the pool)')
+    parser.add_argument('--speculative-tools', action='store_true', default=SPECULATIVE_TOOLS,
+                        help='Start the agent on the final user transcript before the model requests a tool')
+    parser.add_argument('--output-queue-policy', choices=BoundedQueue.POLICIES, default=OUTPUT_QUEUE_POLICY,
+                        help='When a slow client fills its output queue: drop the oldest audio, block the '
+                             'Bedrock reader, or disconnect the client')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help='Worker processes sharing the listening sockets, restarted if they exit')
+    parser.add_argument('--allow-session-log-level', action='store_true', default=ALLOW_SESSION_LOG_LEVEL,
+                        help='Let clients raise their own session\'s log level with ?log=<level>')
+    parser.add_argument('--stub-bedrock', action='store_true', default=STUB_BEDROCK,
+                        help='Answer with scripted Bedrock events and tool results, offline (for load testing)')
     args = parser.parse_args()
 
-    DEBUG = args.debug
+    if args.debug:
+        LOG_LEVELS["all"] = "DEBUG"
+        configure(level=LOGLEVEL, levels=LOG_LEVELS, structured=LOG_FORMAT == "json")
+    VAD_MODE = args.vad
+    AUDIO_BATCH_MS = args.audio_batch_ms
+    STREAM_POOL_SIZE = args.pool_size
+    SPECULATIVE_TOOLS = args.speculative_tools
+    STUB_BEDROCK = args.stub_bedrock
+    OUTPUT_QUEUE_POLICY = args.output_queue_policy
+    ALLOW_SESSION_LOG_LEVEL = args.allow_session_log_level
 
     host = str(os.getenv("HOST", "localhost"))
     ws_port = int(os.getenv("WS_PORT", "8081"))
@@ -204,8 +471,15 @@ if __name__ == "__main__":
     aws_key_id = os.getenv("AWS_ACCESS_KEY_ID")
     aws_secret = os.getenv("AWS_SECRET_ACCESS_KEY")
 
-    if not aws_key_id or not aws_secret:
+    if not STUB_BEDROCK and (not aws_key_id or not aws_secret):
         logger.error("AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY are required.")
+    elif args.workers > 1 and worker_index is None:
+        # Bind once here; each worker runs this script again on the inherited sockets
+        sockets = [listen_socket(host, listen_port) for listen_port in sorted({ws_port, http_port})]
+        logger.info("Starting %d workers at ws://%s:%s, web server at http://%s:%s",
+                    args.workers, host, ws_port, host, http_port)
+        supervisor = Supervisor([sys.executable] + sys.argv, args.workers, sockets, drain_timeout=DRAIN_TIMEOUT)
+        sys.exit(supervisor.run())
     else:
         try:
             asyncio.run(main(host, ws_port, http_port))
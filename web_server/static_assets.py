@@ -0,0 +1,132 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+from urllib.parse import unquote
+
+try:
+    import brotli
+except ImportError:  # brotli is optional
+    brotli = None
+
+# Types worth compressing; images and audio are already compressed
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+
+class _Asset:
+    def __init__(self, body: bytes, content_type: str, cache_control: str):
+        self.content_type = content_type
+        self.cache_control = cache_control
+        # Encodings by preference; each is kept only if it is smaller than the original
+        self.bodies = {}
+        if content_type.startswith(COMPRESSIBLE_TYPES):
+            if brotli is not None:
+                self.bodies["br"] = brotli.compress(body, quality=11)
+            self.bodies["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            self.bodies = {encoding: data for encoding, data in self.bodies.items() if len(data) < len(body)}
+        self.bodies["identity"] = body
+        # Each encoding is a different representation, so it gets its own strong ETag
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self.etags = {encoding: f'"{digest}"' if encoding == "identity" else f'"{digest}-{encoding}"'
+                      for encoding in self.bodies}
+
+
+def accepted_encodings(header: str) -> set:
+    """Return the content codings a client accepts from its Accept-Encoding header."""
+    accepted = set()
+    for item in filter(None, (part.strip() for part in (header or "").split(","))):
+        coding, _, params = item.partition(";")
+        quality = params.strip()
+        if quality.startswith("q=") and quality[2:].strip() in ("0", "0.0", "0.00", "0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssets:
+    """Static files loaded into memory once and served precompressed.
+
+    Every file under ``directory`` is read at startup and compressed with gzip,
+    and with brotli when it is installed. Requests are answered from memory with
+    Content-Length, ETag and Cache-Control; a matching If-None-Match gets 304.
+    Only preloaded files can be served, so paths cannot reach outside directory.
+    HTML is revalidated on every load so new releases show up at once; other
+    assets are cached for max_age seconds.
+    """
+
+    def __init__(self, directory: str, max_age: int = 3600, index: str = "index.html"):
+        """Load the assets.
+
+        Args:
+            directory: Directory to serve
+            max_age: Seconds browsers may cache assets other than HTML
+            index: File served for "/"
+        """
+        self.directory = directory
+        self.index = index
+        self.assets = {}
+        self.requests = 0
+        self.not_modified = 0
+        self.not_found = 0
+        for root, dirs, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    body = f.read()
+                content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                if content_type.startswith("text/"):
+                    content_type += "; charset=utf-8"
+                cache_control = "no-cache" if name.endswith(".html") else f"public, max-age={max_age}"
+                url = "/" + os.path.relpath(path, directory).replace(os.sep, "/")
+                self.assets[url] = _Asset(body, content_type, cache_control)
+
+    def lookup(self, path: str):
+        """Return the asset for a request path, or None."""
+        path = unquote(path.split("?", 1)[0])
+        if path.endswith("/"):
+            path += self.index
+        # Normalized paths that still climb out of the root match no asset
+        return self.assets.get(posixpath.normpath(path))
+
+    def respond(self, path: str, headers) -> tuple:
+        """Answer a GET request from memory.
+
+        Args:
+            path: Request path, possibly with a query string
+            headers: Request headers, any mapping with get()
+
+        Returns:
+            tuple: (status code, list of (header, value), body bytes)
+        """
+        self.requests += 1
+        asset = self.lookup(path)
+        if asset is None:
+            self.not_found += 1
+            return 404, [("Content-Type", "text/plain; charset=utf-8"), ("Content-Length", "14")], b"File not found"
+
+        accepted = accepted_encodings(headers.get("Accept-Encoding"))
+        encoding = next((encoding for encoding in asset.bodies if encoding in accepted), "identity")
+        etag = asset.etags[encoding]
+        response_headers = [("ETag", etag), ("Cache-Control", asset.cache_control),
+                            ("Vary", "Accept-Encoding")]
+        if etag in (headers.get("If-None-Match") or "").replace(" ", "").split(","):
+            self.not_modified += 1
+            return 304, response_headers, b""
+
+        body = asset.bodies[encoding]
+        response_headers.append(("Content-Type", asset.content_type))
+        if encoding != "identity":
+            response_headers.append(("Content-Encoding", encoding))
+        response_headers.append(("Content-Length", str(len(body))))
+        return 200, response_headers, body
+
+    def stats(self) -> dict:
+        """Return loaded file and request counts."""
+        return {
+            "files": len(self.assets),
+            "bytes": sum(len(asset.bodies["identity"]) for asset in self.assets.values()),
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "not_found": self.not_found,
+        }
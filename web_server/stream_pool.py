@@ -0,0 +1,136 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class StreamPool:
+    """Keeps initialized Bedrock streams ready to hand to new WebSocket connections.
+
+    ``factory`` is a coroutine function returning a stream manager whose session
+    and system prompt have already been sent. The pool keeps ``size`` of them
+    ready, refills in the background after each hand-out, and retires streams
+    that have been idle for ``max_idle`` seconds (Bedrock closes idle sessions on
+    its side, so an old stream is replaced before it goes stale). Streams are
+    single use: a connection owns and closes the stream it acquired.
+    """
+
+    def __init__(self, factory, size: int = 2, max_idle: float = 240, retry_delay: float = 5):
+        """Initialize the pool.
+
+        Args:
+            factory: Coroutine function that creates and initializes a stream manager
+            size: Number of ready streams to keep
+            max_idle: Seconds after which an unused stream is closed and replaced
+            retry_delay: Seconds to wait before refilling again after a failure
+        """
+        self.factory = factory
+        self.size = size
+        self.max_idle = max_idle
+        self.retry_delay = retry_delay
+        self._ready = deque()  # (created_at, stream_manager)
+        self._refill_needed = asyncio.Event()
+        self._task = None
+        self._closed = False
+
+        # Counters
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.retired = 0
+        self.failures = 0
+
+    async def start(self):
+        """Start filling the pool in the background."""
+        if self.size > 0 and self._task is None:
+            self._task = asyncio.create_task(self._maintain())
+
+    async def acquire(self):
+        """Return a ready stream manager, creating one directly if the pool is empty."""
+        while self._ready:
+            _, stream_manager = self._ready.popleft()
+            self._refill_needed.set()
+            if stream_manager.is_active:
+                self.hits += 1
+                return stream_manager
+            # The stream died while waiting in the pool
+            self.retired += 1
+            await self._close(stream_manager)
+        self.misses += 1
+        return await self.factory()
+
+    async def _maintain(self):
+        """Retire idle streams and keep the pool topped up."""
+        while not self._closed:
+            # Cleared before refilling, so a hand-out during the refill wakes the next pass
+            self._refill_needed.clear()
+            await self._retire_idle()
+            missing = self.size - len(self._ready)
+            if missing > 0:
+                results = await asyncio.gather(*(self._create() for _ in range(missing)))
+                if not all(results):
+                    await asyncio.sleep(self.retry_delay)
+                    continue
+
+            # Sleep until the oldest stream expires or a stream is handed out
+            timeout = None
+            if self._ready:
+                timeout = max(0.0, self._ready[0][0] + self.max_idle - time.monotonic())
+            try:
+                await asyncio.wait_for(self._refill_needed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _create(self) -> bool:
+        try:
+            stream_manager = await self.factory()
+        except Exception as e:
+            self.failures += 1
+            logger.error("Failed to pre-warm Bedrock stream: %s", e)
+            return False
+        if self._closed:
+            await self._close(stream_manager)
+            return False
+        self.created += 1
+        self._ready.append((time.monotonic(), stream_manager))
+        return True
+
+    async def _retire_idle(self):
+        now = time.monotonic()
+        while self._ready and (now - self._ready[0][0] >= self.max_idle or not self._ready[0][1].is_active):
+            _, stream_manager = self._ready.popleft()
+            self.retired += 1
+            await self._close(stream_manager)
+
+    @staticmethod
+    async def _close(stream_manager):
+        try:
+            await stream_manager.close()
+        except Exception as e:
+            logger.error("Error closing pooled stream: %s", e)
+
+    async def close(self):
+        """Stop refilling and close every ready stream."""
+        self._closed = True
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        while self._ready:
+            _, stream_manager = self._ready.popleft()
+            await self._close(stream_manager)
+
+    def stats(self) -> dict:
+        """Return pool size and hit rate."""
+        acquired = self.hits + self.misses
+        return {
+            "target_size": self.size,
+            "ready": len(self._ready),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / acquired if acquired else None,
+            "created": self.created,
+            "retired": self.retired,
+            "failures": self.failures,
+        }
@@ -0,0 +1,159 @@
+import os
+import signal
+import socket
+import subprocess
+import time
+
+from diagnostics import get_logger
+
+logger = get_logger("supervisor")
+
+# Environment passed to worker processes
+WORKER_INDEX = "WORKER_INDEX"              # 0-based index of this worker
+WORKER_FDS = "WORKER_FDS"                  # listening sockets shared by all workers, comma-separated
+WORKER_ADMIN_FD = "WORKER_ADMIN_FD"        # this worker's private /health and /metrics socket
+WORKER_ADMIN_PORTS = "WORKER_ADMIN_PORTS"  # every worker's private port, by index
+
+
+def listen_socket(host: str, port: int, backlog: int = 128) -> socket.socket:
+    """Bind a listening TCP socket that child processes can inherit."""
+    sock = socket.create_server((host, port), backlog=backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def inherited_sockets():
+    """Return (shared listening sockets, private admin socket or None) passed by a Supervisor.
+
+    Both are empty when the process was not started as a worker.
+    """
+    fds = [int(fd) for fd in os.environ.get(WORKER_FDS, "").split(",") if fd]
+    admin_fd = os.environ.get(WORKER_ADMIN_FD)
+    listeners = [socket.socket(fileno=fd) for fd in fds]
+    admin = socket.socket(fileno=int(admin_fd)) if admin_fd else None
+    return listeners, admin
+
+
+def worker_admin_ports() -> list:
+    """Return the private ports of all workers, by index; empty outside worker mode."""
+    return [int(port) for port in os.environ.get(WORKER_ADMIN_PORTS, "").split(",") if port]
+
+
+class Supervisor:
+    """Runs worker processes that accept connections from shared listening sockets.
+
+    The supervisor binds the sockets once and every worker inherits them, so the
+    kernel hands each new connection to whichever worker accepts it first and a
+    restarting worker never drops connections waiting in the backlog. Each worker
+    also gets a private localhost socket, kept across restarts, on which it serves
+    its own /health and /metrics for aggregation.
+
+    Workers that exit are restarted; a worker that keeps exiting within
+    min_uptime seconds is restarted with exponential backoff. SIGTERM or SIGINT
+    forwards SIGTERM to the workers, which stop accepting and let their sessions
+    finish, and waits up to drain_timeout seconds before killing them.
+    """
+
+    def __init__(self, command: list, workers: int, sockets: list, drain_timeout: float = 30,
+                 min_uptime: float = 10, max_backoff: float = 30, poll_interval: float = 0.5, env: dict = None):
+        """Initialize the supervisor.
+
+        Args:
+            command: Command that starts one worker
+            workers: Number of workers to keep running
+            sockets: Listening sockets from listen_socket() shared by all workers
+            drain_timeout: Seconds workers get to finish their sessions on shutdown
+            min_uptime: Workers exiting sooner than this count as failing
+            max_backoff: Longest delay before restarting a failing worker
+            poll_interval: Seconds between checks of the workers
+            env: Environment of the workers; defaults to this process's
+        """
+        self.command = command
+        self.workers = workers
+        self.sockets = sockets
+        self.drain_timeout = drain_timeout
+        self.min_uptime = min_uptime
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.env = dict(os.environ if env is None else env)
+        self.admin_sockets = [listen_socket("127.0.0.1", 0) for _ in range(workers)]
+        self.processes = [None] * workers
+        self.started = [0.0] * workers
+        self.failures = [0] * workers
+        self.restart_at = [0.0] * workers
+        self.restarts = 0
+        self.stopping = False
+
+    def _spawn(self, index: int):
+        fds = [sock.fileno() for sock in self.sockets]
+        admin = self.admin_sockets[index]
+        env = dict(self.env)
+        env[WORKER_INDEX] = str(index)
+        env[WORKER_FDS] = ",".join(str(fd) for fd in fds)
+        env[WORKER_ADMIN_FD] = str(admin.fileno())
+        env[WORKER_ADMIN_PORTS] = ",".join(str(sock.getsockname()[1]) for sock in self.admin_sockets)
+        # A new session keeps a terminal's Ctrl+C away from the workers; the supervisor drains them instead
+        self.processes[index] = subprocess.Popen(self.command, env=env, pass_fds=fds + [admin.fileno()],
+                                                 start_new_session=True)
+        self.started[index] = time.monotonic()
+        logger.info("Started worker %d (pid %d)", index, self.processes[index].pid)
+
+    def check(self):
+        """Start missing workers and schedule restarts of exited ones."""
+        now = time.monotonic()
+        for index, process in enumerate(self.processes):
+            if process is None:
+                if now >= self.restart_at[index]:
+                    self._spawn(index)
+                continue
+            code = process.poll()
+            if code is None:
+                continue
+            uptime = now - self.started[index]
+            self.failures[index] = self.failures[index] + 1 if uptime < self.min_uptime else 0
+            delay = min(self.max_backoff, 2 ** self.failures[index] - 1)
+            logger.warning("Worker %d (pid %d) exited with status %s after %.1f s; restarting in %.0f s",
+                           index, process.pid, code, uptime, delay)
+            self.processes[index] = None
+            self.restart_at[index] = now + delay
+            self.restarts += 1
+
+    def stop(self, *args):
+        """Begin a graceful shutdown; safe to call from a signal handler."""
+        self.stopping = True
+
+    def run(self) -> int:
+        """Supervise the workers until SIGTERM or SIGINT, then drain them. Returns an exit status."""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        while not self.stopping:
+            self.check()
+            time.sleep(self.poll_interval)
+        self.drain()
+        return 0
+
+    def drain(self):
+        """Ask every worker to finish its sessions and exit, killing those that outlast the timeout."""
+        running = [process for process in self.processes if process is not None and process.poll() is None]
+        logger.info("Draining %d workers", len(running))
+        for process in running:
+            process.send_signal(signal.SIGTERM)
+        # Workers close their remaining connections after drain_timeout; allow a little more to exit
+        deadline = time.monotonic() + self.drain_timeout + 5
+        for process in running:
+            try:
+                process.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                logger.warning("Killing worker pid %d after the drain timeout", process.pid)
+                process.kill()
+                process.wait()
+        for sock in self.sockets + self.admin_sockets:
+            sock.close()
+
+    def stats(self) -> dict:
+        """Return the number of configured and running workers and restarts so far."""
+        return {
+            "workers": self.workers,
+            "running": sum(1 for process in self.processes if process is not None and process.poll() is None),
+            "restarts": self.restarts,
+        }